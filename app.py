@@ -1,16 +1,22 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import time
+_imports_started = time.perf_counter()
+
 import os
 from flask import Flask
 from config.settings import Config
 from routes import register_routes
-from utils.database import DatabaseManager
+from utils.upload_streams import SpooledUploadRequest
+from services.registry import get_service_registry
 
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
     app.config.from_object(Config)
+    # Uploads are parsed straight from memory (or an anonymous spool file once large)
+    app.request_class = SpooledUploadRequest
     
     # Register all routes
     register_routes(app)
@@ -18,7 +24,11 @@ def create_app():
     return app
 
 def main():
+    registry = get_service_registry()
+    start = time.perf_counter()
+    registry.record('imports', start - _imports_started)
     app = create_app()
+    registry.record('app', time.perf_counter() - start)
     
     # Log configuration
     print("🚀 Starting Enigma AI Bot...")
@@ -29,12 +39,17 @@ def main():
     print(f"🤖 OpenAI API: {'✅ Configured' if Config.OPENAI_API_KEY else '❌ Not configured'}")
     
     try:
-        db_manager = DatabaseManager()
+        db_manager = registry.get('db_manager')
+        start = time.perf_counter()
         db_manager.init_database()
+        registry.record('database_schema', time.perf_counter() - start)
         print("Database initialized successfully!")
     except Exception as e:
         print(f"Database initialization error: {str(e)}")
     
+    # Everything else is built on first use; GET /admin/services reports it later
+    registry.print_report()
+    
     app.run(
         debug=os.getenv('DEBUG', 'true').lower() == 'true',
         host='0.0.0.0',
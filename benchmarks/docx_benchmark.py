@@ -0,0 +1,138 @@
+"""Benchmark of the streaming DOCX extractor against loading the document with python-docx.
+
+Generates a large DOCX of paragraphs and tables, checks that the streaming extractor returns the
+same paragraphs and table cells in document order, then times both paths and measures how far
+each grows peak RSS (in a fresh process per run, since lxml memory is invisible to tracemalloc):
+
+    python -m benchmarks.docx_benchmark
+    python -m benchmarks.docx_benchmark --paragraphs 100000 --file big.docx
+"""
+import os
+import sys
+import time
+import random
+import resource
+import argparse
+import tempfile
+import multiprocessing
+from docx import Document
+from utils.docx_stream import iter_docx_blocks
+
+_WORDS = (
+    "vector index chunk embedding session upload parser stream table cell paragraph document retrieval "
+    "query latency memory throughput batch worker queue manifest archive section heading summary result"
+).split()
+
+def build_docx(path, paragraphs, table_every=50, seed=7):
+    """Write a DOCX of synthetic paragraphs with a small table after every table_every paragraphs"""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = rng.choices(_WORDS, k=rng.randint(6, 18))
+        return ' '.join(words).capitalize() + '.'
+
+    doc = Document()
+    for index in range(paragraphs):
+        if index % table_every == 0:
+            doc.add_heading(f"Section {index // table_every + 1}", level=2)
+        paragraph = doc.add_paragraph(' '.join(sentence() for _ in range(rng.randint(1, 5))))
+        paragraph.add_run(f" ({index})").bold = True
+        if index % table_every == table_every - 1:
+            table = doc.add_table(rows=3, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = sentence()
+    doc.save(path)
+
+def python_docx_blocks(path):
+    """Paragraphs and table cells as python-docx sees them, in document order"""
+    blocks = []
+    for item in Document(path).iter_inner_content():
+        if hasattr(item, 'rows'):
+            for row in item.rows:
+                for cell in row.cells:
+                    text = '\n'.join(para.text.strip() for para in cell.paragraphs if para.text.strip())
+                    if text:
+                        blocks.append(text)
+        elif item.text.strip():
+            blocks.append(item.text.strip())
+    return blocks
+
+def python_docx_paragraphs(path):
+    """The previous extraction path: body paragraphs only"""
+    return [para.text.strip() for para in Document(path).paragraphs if para.text.strip()]
+
+def stream_blocks(path):
+    return sum(1 for _ in iter_docx_blocks(path))
+
+_PATHS = {
+    'python-docx': python_docx_paragraphs,
+    'streaming': stream_blocks
+}
+
+def peak_rss_kb():
+    """Peak RSS of this process in KB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _measure(name, path):
+    try:
+        # Reset the peak so it starts from this process's current RSS
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    _PATHS[name](path)
+    elapsed = time.perf_counter() - start
+    return elapsed, (peak_rss_kb() - baseline) / 1024
+
+def measure(name, path, repeat):
+    """Best time and largest peak RSS growth (MB) over fresh-process runs"""
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            runs.append(pool.apply(_measure, (name, path)))
+    return min(run[0] for run in runs), max(run[1] for run in runs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, default=20000, help='Paragraphs in the generated document')
+    parser.add_argument('--file', help='Benchmark this DOCX instead of generating one')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best time is reported')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp, 'benchmark.docx')
+            build_docx(path, args.paragraphs)
+        print(f"📄 {path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        expected = python_docx_blocks(path)
+        streamed = list(iter_docx_blocks(path))
+        if streamed != expected:
+            mismatch = next((i for i, (a, b) in enumerate(zip(streamed, expected)) if a != b), min(len(streamed), len(expected)))
+            print(f"❌ Streaming extractor differs from python-docx at block {mismatch} "
+                  f"({len(streamed)} vs {len(expected)} blocks)")
+            return 1
+        print(f"✅ Identical paragraphs and table cells ({len(streamed)} blocks)")
+
+        results = {name: measure(name, path, args.repeat) for name in _PATHS}
+
+    for name, (elapsed, peak_mb) in results.items():
+        print(f"{name + ':':<13} {elapsed:.3f}s, peak RSS +{peak_mb:.1f} MB")
+    (docx_time, docx_mb), (stream_time, stream_mb) = results['python-docx'], results['streaming']
+    print(f"Speedup:      {docx_time / stream_time:.1f}x, {docx_mb / max(stream_mb, 0.1):.1f}x less memory")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
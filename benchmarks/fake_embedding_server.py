@@ -0,0 +1,123 @@
+"""Local fake of the Nomic embedding endpoint for exercising the ingestion path offline.
+
+Run it and point the app at it:
+
+    python benchmarks/fake_embedding_server.py --port 8765 --rate-limit-every 5
+    NOMIC_API_URL=http://127.0.0.1:8765/v1/embedding/text NOMIC_API_KEY=fake python app.py
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def fake_embedding(text, dimension=768):
+    """Deterministic pseudo-embedding derived from the text hash"""
+    values = []
+    counter = 0
+    while len(values) < dimension:
+        digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+        values.extend((byte - 127.5) / 127.5 for byte in digest)
+        counter += 1
+    return values[:dimension]
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    """Threaded HTTP server that mimics the Nomic embedding API"""
+
+    daemon_threads = True
+
+    def __init__(self, address, dimension=768, latency=0.0, rate_limit_every=0,
+                 retry_after=1, fail_on=None):
+        super().__init__(address, FakeEmbeddingHandler)
+        self.dimension = dimension
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.requests_seen = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/embedding/text"
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests_seen += 1
+            request_number = server.requests_seen
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            texts = payload.get('texts', [])
+
+            if server.latency:
+                time.sleep(server.latency)
+
+            if server.rate_limit_every and request_number % server.rate_limit_every == 0:
+                self._reply(429, {'detail': 'rate limited'}, {'Retry-After': str(server.retry_after)})
+            elif server.fail_on and any(server.fail_on in text for text in texts):
+                self._reply(400, {'detail': 'invalid text'})
+            else:
+                embeddings = [fake_embedding(text, server.dimension) for text in texts]
+                self._reply(200, {'embeddings': embeddings, 'usage': {'total_tokens': 0}})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_server(port=0, **kwargs):
+    """Start a fake embedding server on a background thread"""
+    server = FakeEmbeddingServer(('127.0.0.1', port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--dimension', type=int, default=768)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait per request')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth request with 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--fail-on', help='Answer 400 for batches containing this substring')
+    args = parser.parse_args(argv)
+
+    server = FakeEmbeddingServer(
+        ('127.0.0.1', args.port),
+        dimension=args.dimension,
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        fail_on=args.fail_on
+    )
+    print(f"🧪 Fake embedding server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Ingestion benchmark over synthetic PDF, DOCX, Markdown and code ZIP corpora, fully offline.
+
+Each corpus runs in a fresh process through parsing and chunking, embedding,
+EnhancedDocumentProcessor.process_document (or CodeProcessor.process_zip_file) end to end, and
+the vector-store insert. Embeddings come from a deterministic in-process fake behind the real
+EmbeddingExecutor and rows go to a temporary NumPy vector store, so no Nomic, Milvus or LLM
+server is needed. Reports seconds and chunks/s per stage and peak RSS growth per corpus (of the
+main process; parse pool workers are separate processes), compared against a stored baseline:
+
+    python -m benchmarks.ingest_benchmark --save-baseline
+    python -m benchmarks.ingest_benchmark --pdf-pages 400 --corpora pdf docx
+"""
+import os
+import sys
+import json
+import time
+import random
+import zipfile
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+from config.settings import Config
+from benchmarks.docx_benchmark import build_docx, peak_rss_kb
+from benchmarks.fake_embedding_server import fake_embedding
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingest_baseline.json')
+
+_WORDS = (
+    "vector index chunk embedding session upload parser stream table cell paragraph document retrieval "
+    "query latency memory throughput batch worker queue manifest archive section heading summary result "
+    "the of and to in is that for it as with be by on not this are or from at which"
+).split()
+
+class FakeEmbeddings:
+    """Deterministic local stand-in for NomicEmbeddings: normalised vectors derived from the text hash"""
+
+    model = 'fake-embedding'
+
+    def __init__(self, dimension=None):
+        self.dimension = dimension or Config.EMBEDDING_DIMENSION
+
+    def request_embeddings(self, texts):
+        vectors = np.array([fake_embedding(text, self.dimension) for text in texts], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors.tolist()
+
+    def embed_documents(self, texts):
+        return self.request_embeddings(texts)
+
+    def embed_query(self, text):
+        return self.request_embeddings([text])[0]
+
+def _sentence(rng):
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(6, 18))).capitalize() + '.'
+
+def _paragraph(rng):
+    return ' '.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+def build_pdf(path, pages, seed=7):
+    """Write a PDF of pages filled with synthetic paragraphs"""
+    import fitz  # PyMuPDF for PDF processing
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        text = '\n\n'.join(_paragraph(rng) for _ in range(4))
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def build_markdown(path, sections, seed=7):
+    """Write a Markdown file of headed sections with paragraphs, lists and code blocks"""
+    rng = random.Random(seed)
+    parts = []
+    for index in range(sections):
+        parts.append(f"## Section {index + 1}")
+        parts.extend(_paragraph(rng) for _ in range(rng.randint(2, 4)))
+        parts.append('\n'.join(f"- {_sentence(rng)}" for _ in range(3)))
+        if index % 5 == 0:
+            parts.append(f"```python\ndef section_{index}(value):\n    return value * {index}\n```")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n\n'.join(parts))
+
+def build_code_zip(path, files, seed=7):
+    """Write a ZIP of synthetic Python and JavaScript modules in nested packages"""
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for index in range(files):
+            package = f"project/pkg{index % 10}/sub{index % 3}"
+            names = [f"{rng.choice(_WORDS)}_{index}_{n}" for n in range(rng.randint(4, 12))]
+            if index % 2:
+                body = '\n\n'.join(
+                    f"function {name}(items) {{\n  // {_sentence(rng)}\n"
+                    f"  return items.map((item) => item + {n}).filter(Boolean);\n}}"
+                    for n, name in enumerate(names)
+                )
+                zip_ref.writestr(f"{package}/module_{index}.js", body + '\n')
+            else:
+                body = '\n\n'.join(
+                    f"def {name}(items):\n    \"\"\"{_sentence(rng)}\"\"\"\n"
+                    f"    return [item + {n} for item in items if item]"
+                    for n, name in enumerate(names)
+                )
+                zip_ref.writestr(f"{package}/module_{index}.py", body + '\n')
+
+CORPORA = {
+    'pdf': ('benchmark.pdf', build_pdf, 'pdf_pages'),
+    'docx': ('benchmark.docx', build_docx, 'docx_paragraphs'),
+    'md': ('benchmark.md', build_markdown, 'md_sections'),
+    'code': ('benchmark.zip', build_code_zip, 'code_files')
+}
+
+def _use_fakes(workdir):
+    """Point embeddings and storage of this process at the fake embedder and a scratch directory"""
+    from utils.embedding_executor import get_embedding_executor
+
+    Config.NOMIC_API_KEY = Config.NOMIC_API_KEY or 'benchmark'
+    Config.EMBEDDING_CACHE_ENABLED = False  # Every run embeds every chunk
+    Config.EMBEDDING_RATE_LIMIT = 1e6
+    Config.BLOB_STORE_PATH = os.path.join(workdir, 'blobs.sqlite3')
+    Config.NUMPY_VECTOR_FOLDER = os.path.join(workdir, 'vectors')
+    fake = FakeEmbeddings()
+    # The executor is process-wide; creating it first keeps the processors on the fake
+    get_embedding_executor(fake)
+    return fake
+
+def _timed(stages, name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    stages[name] = time.perf_counter() - start
+    return result
+
+def run_corpus(corpus, path, workdir):
+    """Run one corpus through every stage in this process; returns chunk count, stage seconds and peak RSS"""
+    # Imported before the peak is reset so module loading is not counted
+    from utils.enhanced_document_processor import EnhancedDocumentProcessor
+    from utils.numpy_vector_store import NumpyVectorStore
+    from services.code_processor import CodeProcessor
+
+    try:
+        # Reset the peak so it starts from this process's current RSS
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    baseline_rss = peak_rss_kb()
+
+    fake = _use_fakes(workdir)
+
+    processor = EnhancedDocumentProcessor()
+    processor.embeddings = fake
+    vector_store = NumpyVectorStore(root=Config.NUMPY_VECTOR_FOLDER)
+    session_id = f"bench_{corpus}"
+    stages = {}
+
+    if corpus == 'code':
+        code_processor = CodeProcessor(doc_processor=processor)
+
+        def parse():
+            code_files, _ = code_processor._read_zip_code_files(path)
+            return [chunk for file_path, relative_path, content in code_files
+                    for chunk in code_processor._process_code_file(file_path, relative_path, content)]
+
+        parsed = _timed(stages, 'parse', parse)
+        _timed(stages, 'embed', processor.embed_chunks, parsed)
+        chunks = _timed(stages, 'process_zip_file', code_processor.process_zip_file, path, session_id)
+        stored = _timed(stages, 'insert', vector_store.add_code_chunks, session_id, chunks)
+    else:
+        file_ext = processor._file_extension(path)
+        parsed = _timed(stages, 'parse', lambda: list(processor._number_chunks(processor._iter_chunk_lists(path, file_ext))))
+        _timed(stages, 'embed', processor.embed_chunks, parsed)
+        chunks = _timed(stages, 'process_document', processor.process_document, path)
+        stored = _timed(stages, 'insert', vector_store.add_documents, session_id, chunks, os.path.basename(path))
+
+    if not chunks or not stored:
+        raise RuntimeError(f"{corpus} corpus produced no stored chunks")
+    return {
+        'chunks': len(chunks),
+        'stages': stages,
+        'peak_rss_mb': (peak_rss_kb() - baseline_rss) / 1024
+    }
+
+def measure(corpus, path, workdir, repeat):
+    """Best time per stage and largest peak RSS growth over fresh-process runs"""
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for run in range(repeat):
+        run_dir = os.path.join(workdir, f"{corpus}-{run}")
+        os.makedirs(run_dir)
+        with context.Pool(1) as pool:
+            runs.append(pool.apply(run_corpus, (corpus, path, run_dir)))
+    return {
+        'chunks': runs[0]['chunks'],
+        'stages': {stage: min(r['stages'][stage] for r in runs) for stage in runs[0]['stages']},
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in runs)
+    }
+
+def compare(results, sizes, baseline, tolerance):
+    """Print results against the baseline; returns the regressions beyond tolerance"""
+    if baseline and baseline.get('sizes') != sizes:
+        print(f"⚠️ Baseline was recorded with sizes {baseline.get('sizes')}; comparison skipped")
+        baseline = None
+    reference = (baseline or {}).get('results', {})
+    regressions = []
+
+    print(f"{'corpus':<7} {'stage':<17} {'seconds':>9} {'chunks/s':>10} {'baseline':>10} {'change':>8}")
+    for corpus, result in results.items():
+        before = reference.get(corpus)
+        if before and before['chunks'] != result['chunks']:
+            print(f"⚠️ {corpus}: {result['chunks']} chunks, baseline had {before['chunks']}")
+
+        for stage, seconds in result['stages'].items():
+            rate = result['chunks'] / seconds if seconds else float('inf')
+            line = f"{corpus:<7} {stage:<17} {seconds:>9.3f} {rate:>10,.0f}"
+            if before and stage in before['stages']:
+                before_rate = before['chunks'] / before['stages'][stage]
+                change = rate / before_rate - 1
+                line += f" {before_rate:>10,.0f} {change:>+8.0%}"
+                if change < -tolerance:
+                    line += " ❌"
+                    regressions.append(f"{corpus} {stage} throughput {change:+.0%}")
+            print(line)
+
+        rss = result['peak_rss_mb']
+        line = f"{corpus:<7} {'peak RSS (MB)':<17} {rss:>9.1f} {'':>10}"
+        if before:
+            line += f" {before['peak_rss_mb']:>10.1f}"
+            # Ignore jitter of a few MB on small corpora
+            if rss > max(before['peak_rss_mb'] * (1 + tolerance), before['peak_rss_mb'] + 5):
+                line += " ❌"
+                regressions.append(f"{corpus} peak RSS {before['peak_rss_mb']:.1f} -> {rss:.1f} MB")
+        print(line)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpora', nargs='*', choices=list(CORPORA), default=list(CORPORA))
+    parser.add_argument('--pdf-pages', type=int, default=200, help='Pages in the synthetic PDF')
+    parser.add_argument('--docx-paragraphs', type=int, default=5000, help='Paragraphs in the synthetic DOCX')
+    parser.add_argument('--md-sections', type=int, default=1000, help='Sections in the synthetic Markdown file')
+    parser.add_argument('--code-files', type=int, default=400, help='Source files in the synthetic ZIP')
+    parser.add_argument('--repeat', type=int, default=1, help='Fresh-process runs per corpus; the best time is reported')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput drop / RSS growth (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    sizes = {option: getattr(args, option) for _, _, option in CORPORA.values()}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for corpus in args.corpora:
+            filename, build, option = CORPORA[corpus]
+            path = os.path.join(workdir, filename)
+            build(path, sizes[option])
+            print(f"📥 {corpus}: {filename}, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+            results[corpus] = measure(corpus, path, workdir, args.repeat)
+            print(f"✅ {corpus}: {results[corpus]['chunks']} chunks")
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline to record one")
+
+    regressions = compare(results, sizes, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'sizes': sizes, 'results': results}, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
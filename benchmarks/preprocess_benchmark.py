@@ -0,0 +1,89 @@
+"""Micro-benchmark of the fast preprocessing path against the NLTK word_tokenize path.
+
+Checks that both produce identical output on a reference corpus, then times them.
+Needs the NLTK stopwords, punkt and wordnet data, like the app itself:
+
+    python -m benchmarks.preprocess_benchmark
+    python -m benchmarks.preprocess_benchmark --paragraphs 20000 --files docs/*.txt
+"""
+import sys
+import time
+import random
+import argparse
+from utils.document_processor import TextProcessor
+
+_SYLLABLES = ['ka', 'lo', 'mi', 'ter', 'sun', 'ra', 'vel', 'on', 'dis', 'ment', 'pro', 'cess', 'ing', 'ex', 'tion']
+_COMMON = (
+    "the of and to in is that for it as was with be by on not he this are or his from at which but have "
+    "an they you were her she there been one all we their has would when if so no will more can out who "
+    "cannot gonna wanna gotta gimme lemme don't it's U.S. e-mail $3.88 (see above) \"quoted\" -- children "
+    "studies running geese analyses documents indices matrices"
+).split()
+
+def build_corpus(paragraphs, seed=7):
+    """Synthetic paragraphs whose vocabulary follows a Zipf distribution"""
+    rng = random.Random(seed)
+    vocabulary = list(_COMMON)
+    while len(vocabulary) < 5000:
+        word = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4)))
+        vocabulary.append(word + rng.choice(['', '', 's', 'es', 'ed']))
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    corpus = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(2, 6)):
+            words = rng.choices(vocabulary, weights, k=rng.randint(6, 24))
+            words[0] = words[0].capitalize()
+            sentences.append(' '.join(words) + rng.choice(['.', '.', '?', '!']))
+        corpus.append(' '.join(sentences))
+    return corpus
+
+def load_files(paths):
+    paragraphs = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            paragraphs.extend(para.strip() for para in f.read().split('\n\n') if para.strip())
+    return paragraphs
+
+def time_path(preprocess, corpus, repeat, before_each=None):
+    best = None
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        for paragraph in corpus:
+            preprocess(paragraph)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, default=5000, help='Synthetic paragraphs to generate')
+    parser.add_argument('--files', nargs='*', default=[], help='Text files to use instead of the synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best is reported')
+    args = parser.parse_args(argv)
+
+    corpus = load_files(args.files) if args.files else build_corpus(args.paragraphs)
+    processor = TextProcessor()
+
+    mismatches = [para for para in corpus if processor._preprocess_fast(para) != processor._preprocess_nltk(para)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} of {len(corpus)} paragraphs differ between paths, e.g.:")
+        print(f"   {mismatches[0][:200]!r}")
+        return 1
+    print(f"✅ Identical output on {len(corpus)} paragraphs")
+
+    nltk_time = time_path(processor._preprocess_nltk, corpus, args.repeat)
+    # Every fast run starts from a cold lemma cache, as after a restart
+    fast_time = time_path(processor._preprocess_fast, corpus, args.repeat, processor._index_word.cache_clear)
+
+    print(f"NLTK path: {nltk_time:.3f}s ({len(corpus) / nltk_time:,.0f} paragraphs/s)")
+    print(f"Fast path: {fast_time:.3f}s ({len(corpus) / fast_time:,.0f} paragraphs/s)")
+    print(f"Speedup:   {nltk_time / fast_time:.1f}x")
+    print(f"Lemma cache: {processor._index_word.cache_info()}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,10 +3,13 @@ import os
 class Config:
     """Application configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key')
+    ADMIN_USERS = [name.strip() for name in os.getenv('ADMIN_USERS', '').split(',') if name.strip()]  # Usernames allowed on /admin endpoints
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))  # 500MB for large repositories
     
     # Folder configurations
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'static/uploads')
+    UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY', 32 * 1024 * 1024))  # Uploads kept in memory up to this size
+    CACHE_FOLDER = os.getenv('CACHE_FOLDER', 'cache')
     IMAGE_OUTPUT_FOLDER = 'static/generated_images'
     
     # API configurations
@@ -19,15 +22,69 @@ class Config:
     # Nomic API configuration
     NOMIC_API_KEY = os.getenv('NOMIC_API_KEY')
     NOMIC_MODEL_NAME = os.getenv('NOMIC_MODEL_NAME', 'nomic-embed-text-v1.5')
+    NOMIC_API_URL = os.getenv('NOMIC_API_URL', 'https://api-atlas.nomic.ai/v1/embedding/text')
     
     # Embedding configuration
     EMBEDDING_DEVICE = os.getenv('EMBEDDING_DEVICE', 'api')  # Using API instead of local
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))  # Max chunks per Nomic request
+    EMBEDDING_BATCH_MAX_CHARS = int(os.getenv('EMBEDDING_BATCH_MAX_CHARS', 60000))  # Max total characters per request
+    EMBEDDING_DIMENSION = int(os.getenv('EMBEDDING_DIMENSION', 768))
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv('EMBEDDING_MAX_CONCURRENCY', 4))  # Requests in flight
+    EMBEDDING_RATE_LIMIT = float(os.getenv('EMBEDDING_RATE_LIMIT', 10))  # Requests per second
+    EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', 5))
+    
+    # Embedding cache configuration
+    EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(CACHE_FOLDER, 'embeddings.sqlite3'))
+    EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv('EMBEDDING_CACHE_MEMORY_ITEMS', 20000))  # In-memory LRU entries
+    EMBEDDING_CACHE_MAX_ROWS = int(os.getenv('EMBEDDING_CACHE_MAX_ROWS', 1000000))  # On-disk rows (~3KB each)
+    BLOB_STORE_PATH = os.getenv('BLOB_STORE_PATH', os.path.join(CACHE_FOLDER, 'blobs.sqlite3'))  # Full source text of chunks
+    BLOB_STORE_MEMORY_MB = int(os.getenv('BLOB_STORE_MEMORY_MB', 64))  # Recently read blobs kept decompressed
+    INGEST_QUEUE_DEPTH = int(os.getenv('INGEST_QUEUE_DEPTH', 4))  # Batches waiting between ingestion stages
+    INGEST_BATCH_CHUNKS = int(os.getenv('INGEST_BATCH_CHUNKS', 256))  # Chunks per embedding/insert batch
+    INGEST_JOB_WORKERS = int(os.getenv('INGEST_JOB_WORKERS', 2))  # Uploads ingested at the same time
+    INGEST_JOB_QUEUE_SIZE = int(os.getenv('INGEST_JOB_QUEUE_SIZE', 20))  # Queued + running jobs before uploads get 429
+    INGEST_JOB_RETENTION = int(os.getenv('INGEST_JOB_RETENTION', 3600))  # Seconds finished jobs stay queryable
+    UPLOAD_DEDUP_ENABLED = os.getenv('UPLOAD_DEDUP_ENABLED', 'true').lower() == 'true'  # Reuse chunks of identical earlier uploads
+    UPLOAD_DEDUP_ACROSS_USERS = os.getenv('UPLOAD_DEDUP_ACROSS_USERS', 'false').lower() == 'true'  # Also reuse other users' uploads
+    PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', min(os.cpu_count() or 1, 4)))  # Parsing processes; 1 keeps parsing in-process
+    PARSE_PARALLEL_MIN_PAGES = int(os.getenv('PARSE_PARALLEL_MIN_PAGES', 64))  # Smaller PDFs are parsed in-process
+    PARSE_PARALLEL_MIN_PARAGRAPHS = int(os.getenv('PARSE_PARALLEL_MIN_PARAGRAPHS', 2000))  # Same for DOCX/TXT/MD
+    PARSE_PAGES_PER_TASK = int(os.getenv('PARSE_PAGES_PER_TASK', 16))
+    PARSE_PARAGRAPHS_PER_TASK = int(os.getenv('PARSE_PARAGRAPHS_PER_TASK', 500))
+    FAST_PREPROCESS = os.getenv('FAST_PREPROCESS', 'true').lower() == 'true'  # Regex tokenizer + memoised lemmas, same output as NLTK
+    LEMMA_CACHE_SIZE = int(os.getenv('LEMMA_CACHE_SIZE', 100000))  # Distinct words with memoised lemmas
+    CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 128))  # Estimated model tokens per document chunk
+    CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', 16))  # Whole sentences carried into the next chunk
+    CODE_CHUNK_MAX_TOKENS = int(os.getenv('CODE_CHUNK_MAX_TOKENS', 256))
+    CODE_CHUNK_OVERLAP_TOKENS = int(os.getenv('CODE_CHUNK_OVERLAP_TOKENS', 32))  # Whole lines carried into the next chunk
+    
+    # Vector store configuration
+    VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'milvus')  # 'milvus' or 'numpy' (embedded, no server)
+    NUMPY_VECTOR_FOLDER = os.getenv('NUMPY_VECTOR_FOLDER', os.path.join(CACHE_FOLDER, 'vectors'))
+    NUMPY_MAX_SEGMENTS = int(os.getenv('NUMPY_MAX_SEGMENTS', 16))  # Segments per collection before compaction
+    VECTOR_STORAGE_MODE = os.getenv('VECTOR_STORAGE_MODE', 'per_session')  # 'per_session' or 'partitioned'
+    SHARED_COLLECTION_SUFFIX = os.getenv('SHARED_COLLECTION_SUFFIX', 'shared')  # documents_shared, code_shared, sess_shared
+    SHARED_COLLECTION_PARTITIONS = int(os.getenv('SHARED_COLLECTION_PARTITIONS', 64))  # Partition-key buckets
+    INSERT_BUFFER_MAX_ROWS = int(os.getenv('INSERT_BUFFER_MAX_ROWS', 1000))  # Rows per Milvus insert
+    INSERT_BUFFER_MAX_AGE = float(os.getenv('INSERT_BUFFER_MAX_AGE', 2.0))  # Seconds before buffered rows are inserted
+    INSERT_BUFFER_MAX_ATTEMPTS = int(os.getenv('INSERT_BUFFER_MAX_ATTEMPTS', 5))  # Failed inserts before rows are dropped
+    INDEX_FLAT_MAX_ROWS = int(os.getenv('INDEX_FLAT_MAX_ROWS', 20000))  # Brute-force search below this size
+    INDEX_HNSW_MIN_ROWS = int(os.getenv('INDEX_HNSW_MIN_ROWS', 1000000))  # IVF_FLAT in between, HNSW above
+    RESIDENCY_IDLE_TTL = int(os.getenv('RESIDENCY_IDLE_TTL', 900))  # Seconds before an idle collection is released
+    RESIDENCY_MAX_COLLECTIONS = int(os.getenv('RESIDENCY_MAX_COLLECTIONS', 64))  # Loaded collections per process
+    RESIDENCY_MEMORY_BUDGET_MB = int(os.getenv('RESIDENCY_MEMORY_BUDGET_MB', 4096))  # Estimated vector memory
+    RESIDENCY_SWEEP_INTERVAL = int(os.getenv('RESIDENCY_SWEEP_INTERVAL', 60))
+    SEARCH_MODE = os.getenv('SEARCH_MODE', 'vector')  # 'vector', 'lexical' (BM25) or 'hybrid'
+    HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv('HYBRID_CANDIDATE_MULTIPLIER', 4))  # Candidates per list = top_k * this
+    HYBRID_RRF_K = int(os.getenv('HYBRID_RRF_K', 60))  # Reciprocal rank fusion constant
     
     @staticmethod
     def ensure_directories():
         """Create necessary directories"""
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         os.makedirs(Config.IMAGE_OUTPUT_FOLDER, exist_ok=True)
+        os.makedirs(Config.CACHE_FOLDER, exist_ok=True)
 
 # Initialize directories
 Config.ensure_directories()
\ No newline at end of file
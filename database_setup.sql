@@ -34,7 +34,23 @@ CREATE TABLE IF NOT EXISTS documents (
     file_type VARCHAR(50) NOT NULL,
     file_size INT NOT NULL,
     upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    content_hash CHAR(64) NULL,
+    collection VARCHAR(20) NOT NULL DEFAULT 'documents',
+    chunk_ids MEDIUMTEXT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_content_hash (content_hash, collection)
+);
+
+-- Indexed files per uploaded code archive, for incremental re-indexing
+CREATE TABLE IF NOT EXISTS code_manifest (
+    session_id VARCHAR(100) NOT NULL,
+    archive VARCHAR(255) NOT NULL,
+    path_hash CHAR(64) NOT NULL,  -- SHA-256 of file_path; the path itself is too long for a utf8mb4 key
+    file_path TEXT NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    chunk_ids MEDIUMTEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (session_id, archive, path_hash)
 );
 
 -- Insert default admin user (password: admin123)
@@ -1,28 +1,24 @@
 import uuid
 from flask import Blueprint, request, jsonify, session, Response
-from services.chat_service import ChatService
-from services.file_service import FileService
-from services.web_search_service import WebSearchService
-from services.code_processor import CodeProcessor
-from utils.enhanced_document_processor import EnhancedDocumentProcessor
-from utils.enhanced_vector_store import EnhancedVectorStore
-from utils.database import DatabaseManager
-from utils.image_processor import ImageProcessor
+from services.registry import lazy_service, get_service_registry
+from utils.ingestion_jobs import get_ingestion_job_manager, JobQueueFull, FINISHED_STATES
+from utils.upload_dedup import file_fingerprint, attach_uploaded_document
+from utils.upload_streams import detach_upload_stream, source_size, spool_file
+from config.settings import Config
 import json
 import time
-import zipfile
-import tempfile
-import os
 
 api_bp = Blueprint('api', __name__)
-chat_service = ChatService()
-file_service = FileService()
-web_search_service = WebSearchService()
-code_processor = CodeProcessor()
-enhanced_doc_processor = EnhancedDocumentProcessor()
-enhanced_vector_store = EnhancedVectorStore()
-db_manager = DatabaseManager()
-image_processor = ImageProcessor()
+# Shared services, built on first use (see services/registry.py)
+chat_service = lazy_service('chat_service')
+file_service = lazy_service('file_service')
+web_search_service = lazy_service('web_search_service')
+code_processor = lazy_service('code_processor')
+enhanced_doc_processor = lazy_service('document_processor')
+enhanced_vector_store = lazy_service('vector_store')
+db_manager = lazy_service('db_manager')
+image_processor = lazy_service('image_processor')
+ingestion_jobs = get_ingestion_job_manager()
 
 @api_bp.route('/send_message', methods=['POST'])
 def send_message():
@@ -61,11 +57,9 @@ def stream_chat_response(user_message, user_id, session_id):
         history = db_manager.get_session_messages(user_id, session_id)
         memory_context = "\n".join([f"{m['role'].capitalize()}: {m['message']}" for m in history[-10:]])
 
-        # Get relevant documents from vector store
-        vector_context = ""
-        if enhanced_vector_store.collection_exists(session_id, "documents"):
-            relevant_docs = enhanced_vector_store.search_documents(session_id, user_message, "documents")
-            vector_context = "\n".join([doc.get('text', '') for doc in relevant_docs])
+        # Get relevant context from every document, code and session collection the session has
+        relevant_docs = chat_service.retrieval_service.retrieve(session_id, user_message)
+        vector_context = chat_service.retrieval_service.format_context(relevant_docs)
 
         # Combine contexts
         full_context = f"Chat History:\n{memory_context.strip()}\n\nRelevant Docs:\n{vector_context.strip()}"
@@ -163,16 +157,9 @@ def upload_file():
 
 def handle_image_upload(file):
     """Handle image file upload and analysis"""
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
     try:
-        # Close the file handle immediately so other processes can access the file path
-        tmp_file.close()
-        
-        # Save the uploaded file to the temporary path
-        file.save(tmp_file.name)
-        
-        # Analyze image with AI
-        description = image_processor.analyze_with_ai(tmp_file.name)
+        # Analyze image with AI, straight from the uploaded stream
+        description = image_processor.analyze_with_ai(file.stream, filename=file.filename)
         
         return jsonify({
             'type': 'image',
@@ -184,52 +171,22 @@ def handle_image_upload(file):
     except Exception as e:
         print(f"[handle_image_upload] Error: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        # Ensure the temporary file is cleaned up
-        if os.path.exists(tmp_file.name):
-            os.unlink(tmp_file.name)
 
 def handle_document_upload(file):
     """Handle document file upload (basic processing)"""
     try:
-        # Save file temporarily with proper cleanup
-        import tempfile
-        import time
+        # Process document straight from the uploaded stream
+        processed_chunks = enhanced_doc_processor.process_document(file.stream, filename=file.filename)
         
-        # Create temporary file
-        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename)[1])
+        if not processed_chunks:
+            return jsonify({'error': 'Failed to process document or no text content found'}), 400
         
-        try:
-            # Close file descriptor and save file
-            os.close(fd)
-            file.save(tmp_path)
-            
-            # Process document
-            processed_chunks = enhanced_doc_processor.process_document(tmp_path)
-            
-            if not processed_chunks:
-                return jsonify({'error': 'Failed to process document or no text content found'}), 400
-            
-            return jsonify({
-                'type': 'document',
-                'filename': file.filename,
-                'chunks': len(processed_chunks),
-                'message': f'Document "{file.filename}" processed successfully!'
-            })
-            
-        finally:
-            # Clean up temporary file with retry mechanism
-            try:
-                if os.path.exists(tmp_path):
-                    time.sleep(0.1)  # Small delay to ensure file is released
-                    os.unlink(tmp_path)
-            except PermissionError:
-                # Retry after a longer delay
-                try:
-                    time.sleep(0.5)
-                    os.unlink(tmp_path)
-                except:
-                    print(f"Warning: Could not delete temporary file {tmp_path}")
+        return jsonify({
+            'type': 'document',
+            'filename': file.filename,
+            'chunks': len(processed_chunks),
+            'message': f'Document "{file.filename}" processed successfully!'
+        })
                 
     except Exception as e:
         print(f"[handle_document_upload] Error: {e}")
@@ -237,7 +194,7 @@ def handle_document_upload(file):
 
 @api_bp.route('/upload_document', methods=['POST'])
 def upload_document():
-    """Upload and process document for RAG"""
+    """Upload a document and ingest it for RAG in a background job"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -246,72 +203,63 @@ def upload_document():
         if not file or not file.filename:
             return jsonify({'error': 'No file uploaded'}), 400
         
-        # Save file temporarily with proper cleanup
         from werkzeug.utils import secure_filename
-        import tempfile
-        import time
         
         filename = secure_filename(file.filename)
-        
-        # Create temporary file
-        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
-        
-        try:
-            # Close file descriptor and save file
-            os.close(fd)
-            file.save(tmp_path)
+        upload = detach_upload_stream(file)
+        file_size = source_size(upload)
+        content_type = file.content_type or 'application/octet-stream'
+        user_id = session['user_id']
+        session_id = session['session_id']
+        
+        def ingest(job):
+            job.progress(files_total=1)
             
-            # Process document
-            processed_chunks = enhanced_doc_processor.process_document(tmp_path)
-            
-            if not processed_chunks:
-                return jsonify({'error': 'Failed to process document or no text content found'}), 400
-            
-            # Store in vector database
-            success = enhanced_vector_store.add_documents(
-                session['session_id'], 
-                processed_chunks, 
-                filename,
-                "documents"
+            # A file with the same bytes uploaded before is attached from its stored chunks
+            fingerprint = file_fingerprint(upload)
+            chunk_ids = attach_uploaded_document(
+                enhanced_vector_store, db_manager, fingerprint, session_id, filename,
+                user_id=user_id, progress=job.progress
             )
+            reused = chunk_ids is not None
             
-            if success:
-                # Get file size before processing
-                file.seek(0, 2)  # Seek to end
-                file_size = file.tell()
-                file.seek(0)  # Reset to beginning
-                
-                # Save document metadata
-                db_manager.save_document(
-                    session['user_id'],
-                    session['session_id'],
-                    filename,
-                    file.content_type or 'application/octet-stream',
-                    file_size
-                )
+            if not reused:
+                # Stream the document into the vector database batch by batch,
+                # skipping chunks this session already stored
+                chunk_ids = []
                 
-                return jsonify({
-                    'message': f'Document "{filename}" processed successfully for RAG!',
-                    'chunks': len(processed_chunks),
-                    'filename': filename,
-                    'type': 'document'
-                })
-            else:
-                return jsonify({'error': 'Failed to store document in vector database'}), 500
+                def store(chunks):
+                    if not enhanced_vector_store.add_documents(session_id, chunks, filename, "documents", user_id=user_id):
+                        return False
+                    chunk_ids.extend(chunk['id'] for chunk in chunks)
+                    return True
                 
-        finally:
-            # Clean up temporary file with retry mechanism
-            try:
-                if os.path.exists(tmp_path):
-                    time.sleep(0.1)  # Small delay to ensure file is released
-                    os.unlink(tmp_path)
-            except PermissionError:
-                # Retry after a longer delay
-                try:
-                    time.sleep(0.5)
-                    os.unlink(tmp_path)
-                except:
-                    print(f"Warning: Could not delete temporary file {tmp_path}")
+                enhanced_doc_processor.ingest_document(
+                    upload,
+                    store=store,
+                    existing=lambda chunks: enhanced_vector_store.existing_chunk_ids(session_id, chunks, "documents", filename),
+                    progress=job.progress,
+                    filename=filename
+                )
+            if not chunk_ids:
+                raise ValueError('Failed to process document or no text content found')
+            # Fails the job if buffered rows could not be inserted
+            enhanced_vector_store.flush(session_id, "documents")
+            
+            # Save document metadata, with the fingerprint and chunk ids for later identical uploads
+            db_manager.save_document(user_id, session_id, filename, content_type, file_size,
+                                     content_hash=fingerprint, chunk_ids=chunk_ids)
+            job.progress(files_done=1)
+            
+            return {
+                'message': f'Document "{filename}" processed successfully for RAG!',
+                'chunks': len(chunk_ids),
+                'reused': reused,
+                'filename': filename,
+                'type': 'document'
+            }
+        
+        return submit_ingestion_job(user_id, session_id, 'document', filename, ingest, cleanup=upload.close)
                 
     except Exception as e:
         print(f"[upload_document] Error: {e}")
@@ -319,7 +267,7 @@ def upload_document():
 
 @api_bp.route('/upload_codebase', methods=['POST'])
 def upload_codebase():
-    """Upload and process codebase ZIP file"""
+    """Upload a codebase ZIP file and index it in a background job"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -331,53 +279,30 @@ def upload_codebase():
         if not file.filename.lower().endswith('.zip'):
             return jsonify({'error': 'Only ZIP files are supported for codebase upload'}), 400
         
-        # Save file temporarily with proper cleanup
         from werkzeug.utils import secure_filename
-        import tempfile
-        import time
         
         filename = secure_filename(file.filename)
-        
-        # Create temporary file
-        fd, tmp_path = tempfile.mkstemp(suffix='.zip')
-        
-        try:
-            # Close file descriptor and save file
-            os.close(fd)
-            file.save(tmp_path)
-            
-            # Process codebase
-            code_chunks = code_processor.process_zip_file(tmp_path, session['session_id'])
-            
-            if not code_chunks:
-                return jsonify({'error': 'No supported code files found in ZIP'}), 400
-            
-            # Store in vector database
-            success = enhanced_vector_store.add_code_chunks(session['session_id'], code_chunks)
+        upload = detach_upload_stream(file)
+        user_id = session['user_id']
+        session_id = session['session_id']
+        
+        def ingest(job):
+            # Only files that are new or changed since the last upload of this archive are embedded
+            report = code_processor.index_zip_file(
+                upload, session_id, filename, enhanced_vector_store, db_manager,
+                user_id=user_id, progress=job.progress
+            )
+            if not (report['added'] or report['changed'] or report['unchanged']):
+                raise ValueError('No supported code files found in ZIP')
             
-            if success:
-                return jsonify({
-                    'message': f'Codebase "{filename}" processed successfully!',
-                    'chunks': len(code_chunks),
-                    'filename': filename,
-                    'type': 'codebase'
-                })
-            else:
-                return jsonify({'error': 'Failed to store codebase in vector database'}), 500
-                
-        finally:
-            # Clean up temporary file with retry mechanism
-            try:
-                if os.path.exists(tmp_path):
-                    time.sleep(0.1)  # Small delay to ensure file is released
-                    os.unlink(tmp_path)
-            except PermissionError:
-                # Retry after a longer delay
-                try:
-                    time.sleep(0.5)
-                    os.unlink(tmp_path)
-                except:
-                    print(f"Warning: Could not delete temporary file {tmp_path}")
+            return {
+                'message': f'Codebase "{filename}" processed successfully!',
+                **report,
+                'filename': filename,
+                'type': 'codebase'
+            }
+        
+        return submit_ingestion_job(user_id, session_id, 'codebase', filename, ingest, cleanup=upload.close)
                 
     except Exception as e:
         print(f"[upload_codebase] Error: {e}")
@@ -396,12 +321,17 @@ def chat_with_documents():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
+        search_mode = data.get('search_mode', Config.SEARCH_MODE)
+        if search_mode not in ('vector', 'lexical', 'hybrid'):
+            return jsonify({'error': 'search_mode must be vector, lexical or hybrid'}), 400
+        
         # Search relevant documents
         relevant_docs = enhanced_vector_store.search_documents(
             session['session_id'], 
             user_message, 
             "documents", 
-            top_k=5
+            top_k=5,
+            search_mode=search_mode
         )
         
         if not relevant_docs:
@@ -450,12 +380,17 @@ def chat_with_code():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
+        search_mode = data.get('search_mode', Config.SEARCH_MODE)
+        if search_mode not in ('vector', 'lexical', 'hybrid'):
+            return jsonify({'error': 'search_mode must be vector, lexical or hybrid'}), 400
+        
         # Search relevant code chunks
         relevant_code = enhanced_vector_store.search_documents(
             session['session_id'], 
             user_message, 
             "code", 
-            top_k=5
+            top_k=5,
+            search_mode=search_mode
         )
         
         if not relevant_code:
@@ -493,7 +428,7 @@ def chat_with_code():
 
 @api_bp.route('/upload_github', methods=['POST'])
 def upload_github():
-    """Upload and process GitHub repository"""
+    """Download a GitHub repository and index it in a background job"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -515,76 +450,126 @@ def upload_github():
         owner, repo = match.groups()
         repo_name = f"{owner}/{repo}"
         
-        # Download and process repository
-        import requests
-        import tempfile
-        import zipfile
-        import time
-        
-        # Download repository as ZIP
-        zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/main.zip"
-        
-        try:
-            # Remove size limits for GitHub downloads
-            response = requests.get(zip_url, timeout=120, stream=True)
-            if response.status_code == 404:
-                # Try master branch
-                zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/master.zip"
+        user_id = session['user_id']
+        session_id = session['session_id']
+        
+        def ingest(job):
+            import requests
+            
+            # Download repository as ZIP
+            zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/main.zip"
+            try:
+                # Remove size limits for GitHub downloads
                 response = requests.get(zip_url, timeout=120, stream=True)
+                if response.status_code == 404:
+                    # Try master branch
+                    zip_url = f"https://github.com/{owner}/{repo}/archive/refs/heads/master.zip"
+                    response = requests.get(zip_url, timeout=120, stream=True)
+                
+                response.raise_for_status()
+            except requests.RequestException:
+                raise ValueError('Failed to download repository. Please check the URL and try again.')
             
-            response.raise_for_status()
-        except requests.RequestException:
-            return jsonify({'error': 'Failed to download repository. Please check the URL and try again.'}), 400
-        
-        # Save and process ZIP file with proper cleanup
-        fd, tmp_path = tempfile.mkstemp(suffix='.zip')
-        
-        try:
-            # Close file descriptor and write content
-            os.close(fd)
-            with open(tmp_path, 'wb') as f:
-                # Write in chunks to handle large repositories
-                for chunk in response.iter_content(chunk_size=8192):
+            with spool_file() as archive_file:
+                # Write in chunks to handle large repositories; small ones stay in memory
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
                     if chunk:
-                        f.write(chunk)
-            
-            # Process codebase
-            code_chunks = code_processor.process_zip_file(tmp_path, session['session_id'])
-            
-            if not code_chunks:
-                return jsonify({'error': 'No supported code files found in repository'}), 400
-            
-            # Store in vector database
-            success = enhanced_vector_store.add_code_chunks(session['session_id'], code_chunks)
-            
-            if success:
-                return jsonify({
-                    'message': f'GitHub repository "{repo_name}" processed successfully!',
-                    'chunks': len(code_chunks),
-                    'repo_name': repo_name,
-                    'type': 'github'
-                })
-            else:
-                return jsonify({'error': 'Failed to store repository in vector database'}), 500
+                        archive_file.write(chunk)
+                job.progress()  # Checks for cancellation before indexing starts
                 
-        finally:
-            # Clean up temporary file with retry mechanism
-            try:
-                if os.path.exists(tmp_path):
-                    time.sleep(0.1)  # Small delay to ensure file is released
-                    os.unlink(tmp_path)
-            except PermissionError:
-                # Retry after a longer delay
-                try:
-                    time.sleep(0.5)
-                    os.unlink(tmp_path)
-                except:
-                    print(f"Warning: Could not delete temporary file {tmp_path}")
+                # Only files that are new or changed since the last upload of this archive are embedded
+                report = code_processor.index_zip_file(
+                    archive_file, session_id, f"github:{repo_name}", enhanced_vector_store, db_manager,
+                    user_id=user_id, progress=job.progress
+                )
+            if not (report['added'] or report['changed'] or report['unchanged']):
+                raise ValueError('No supported code files found in repository')
+            
+            return {
+                'message': f'GitHub repository "{repo_name}" processed successfully!',
+                **report,
+                'repo_name': repo_name,
+                'type': 'github'
+            }
+        
+        return submit_ingestion_job(user_id, session_id, 'github', repo_name, ingest)
             
     except Exception as e:
         print(f"[upload_github] Error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/ingest_jobs')
+def list_ingest_jobs():
+    """List the user's ingestion jobs for the current session"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    jobs = ingestion_jobs.list_jobs(session['user_id'], session.get('session_id'))
+    return jsonify({'jobs': [job.snapshot() for job in jobs]})
+
+@api_bp.route('/ingest_jobs/<job_id>')
+def get_ingest_job(job_id):
+    """Status of an ingestion job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    job = ingestion_jobs.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.snapshot())
+
+@api_bp.route('/ingest_jobs/<job_id>/events')
+def stream_ingest_job(job_id):
+    """Server-sent events with an ingestion job's progress until it finishes"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    job = ingestion_jobs.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return Response(
+        stream_job_events(job),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api_bp.route('/ingest_jobs/<job_id>/cancel', methods=['POST'])
+def cancel_ingest_job(job_id):
+    """Cancel a queued or running ingestion job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    job = ingestion_jobs.cancel(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.snapshot())
+
+def stream_job_events(job):
+    """Generator of progress events for an ingestion job"""
+    version = None
+    while True:
+        # Wake on progress, or send a heartbeat so proxies keep the stream open
+        version = job.wait_for_change(version, timeout=15)
+        snapshot = job.snapshot()
+        yield f"data: {json.dumps(snapshot)}\n\n"
+        if snapshot['status'] in FINISHED_STATES:
+            yield "data: [DONE]\n\n"
+            return
+        time.sleep(0.5)  # Coalesce bursts of batch updates into one event
+
+def submit_ingestion_job(user_id, session_id, job_type, name, work, cleanup=None):
+    """Queue an ingestion job (cleanup releases its upload once it finishes) and reply with its id"""
+    try:
+        job = ingestion_jobs.submit(user_id, session_id, job_type, name, work, cleanup=cleanup)
+    except JobQueueFull as e:
+        if cleanup:
+            cleanup()
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'type': job_type,
+        'name': name,
+        'message': f'Processing "{name}" in the background'
+    }), 202
+
 @api_bp.route('/get_chat_sessions')
 def get_chat_sessions():
     if 'user_id' not in session:
@@ -614,6 +599,39 @@ def new_session():
     session['session_id'] = f"sess_{str(uuid.uuid4()).replace('-', '')}"
     return jsonify({'session_id': session['session_id']})
 
+def admin_error():
+    """Error response unless the signed-in user is listed in ADMIN_USERS"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if session.get('username') not in Config.ADMIN_USERS:
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
+
+@api_bp.route('/admin/vector_residency')
+def vector_residency():
+    """Report which vector collections are loaded in Milvus memory"""
+    error = admin_error()
+    if error:
+        return error
+    try:
+        residency = getattr(enhanced_vector_store, 'residency', None)
+        if residency is None:
+            return jsonify({'backend': Config.VECTOR_BACKEND, 'message': 'Residency is only tracked for Milvus'})
+        if request.args.get('sweep') == '1':
+            residency.sweep()
+        return jsonify(residency.stats())
+    except Exception as e:
+        print(f"[vector_residency] Error: {e}")
+        return jsonify({'error': 'Failed to get residency stats'}), 500
+
+@api_bp.route('/admin/services')
+def service_report():
+    """Report which shared services have been initialised and how long each took"""
+    error = admin_error()
+    if error:
+        return error
+    return jsonify({'services': get_service_registry().report()})
+
 # Error handlers
 @api_bp.errorhandler(404)
 def not_found(error):
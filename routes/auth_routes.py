@@ -1,9 +1,9 @@
 import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from utils.auth import AuthManager
+from services.registry import lazy_service, get_service
 
 auth_bp = Blueprint('auth', __name__)
-auth_manager = AuthManager()
+auth_manager = lazy_service('auth_manager')
 
 @auth_bp.route('/')
 def index():
@@ -40,9 +40,7 @@ def login():
 def logout():
     if 'user_id' in session and 'session_id' in session:
         try:
-            from utils.vector_store import VectorStore
-            vector_store = VectorStore()
-            vector_store.delete_collection(session['session_id'])
+            get_service('session_vector_store').delete_collection(session['session_id'])
         except Exception as e:
             print(f"[logout] Cleanup error: {e}")
         session.clear()
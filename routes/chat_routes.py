@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, session, redirect, url_for
-from services.chat_service import ChatService
+from services.registry import lazy_service
 
 chat_bp = Blueprint('chat', __name__)
-chat_service = ChatService()
+chat_service = lazy_service('chat_service')
 
 @chat_bp.route('/chat')
 def chat_page():
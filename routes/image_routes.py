@@ -1,9 +1,9 @@
 from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, send_from_directory
-from services.image_service import ImageService
+from services.registry import lazy_service
 from config.settings import Config
 
 image_bp = Blueprint('image', __name__)
-image_service = ImageService()
+image_service = lazy_service('image_service')
 
 @image_bp.route('/image_generator')
 def image_generator():
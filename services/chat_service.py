@@ -1,15 +1,17 @@
 from datetime import datetime
 from utils.database import DatabaseManager
-from utils.vector_store import VectorStore
+from utils.vector_store_factory import create_session_vector_store
 from services.llm_service import LLMService
+from services.retrieval_service import RetrievalService
 
 class ChatService:
     """Service for handling chat functionality"""
     
-    def __init__(self):
-        self.db_manager = DatabaseManager()
-        self.vector_store = VectorStore()
-        self.llm_service = LLMService()
+    def __init__(self, db_manager=None, vector_store=None, retrieval_service=None, llm_service=None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.vector_store = vector_store or create_session_vector_store()
+        self.retrieval_service = retrieval_service or RetrievalService(session_store=self.vector_store)
+        self.llm_service = llm_service or LLMService()
 
     def process_message(self, user_message, user_id, session_id):
         """Process user message and generate AI response"""
@@ -20,11 +22,9 @@ class ChatService:
         history = self.db_manager.get_session_messages(user_id, session_id)
         memory_context = "\n".join([f"{m['role'].capitalize()}: {m['message']}" for m in history[-10:]])
 
-        # Get relevant documents from vector store
-        vector_context = ""
-        if self.vector_store.collection_exists(session_id):
-            relevant_docs = self.vector_store.search_documents(session_id, user_message)
-            vector_context = "\n".join([doc.get('text', '') for doc in relevant_docs])
+        # Get relevant context from every document, code and session collection the session has
+        relevant_docs = self.retrieval_service.retrieve(session_id, user_message)
+        vector_context = self.retrieval_service.format_context(relevant_docs)
 
         # Combine contexts
         full_context = f"Chat History:\n{memory_context.strip()}\n\nRelevant Docs:\n{vector_context.strip()}"
@@ -1,125 +1,252 @@
-import os
+import hashlib
+from bisect import bisect_right
 import zipfile
-import tempfile
-import shutil
-from pathlib import Path
+from pathlib import PurePosixPath
 from utils.document_processor import DocumentProcessor
+from utils.chunking import chunk_code_spans
+from utils.ingestion_pipeline import batched
+from utils.upload_dedup import file_fingerprint, copy_stored_chunks, find_reusable_upload
+from utils.upload_streams import open_source, source_size
 from config.settings import Config
 
 class CodeProcessor:
     """Service for processing code files and repositories"""
     
-    def __init__(self):
-        self.doc_processor = DocumentProcessor()
+    def __init__(self, doc_processor=None):
+        self.doc_processor = doc_processor or DocumentProcessor()
         self.supported_extensions = {
             '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h',
             '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala',
             '.html', '.css', '.scss', '.less', '.xml', '.json', '.yaml', '.yml',
             '.md', '.txt', '.sql', '.sh', '.bat', '.dockerfile', '.gitignore'
         }
+        self.skipped_dirs = {
+            'node_modules', '__pycache__', 'venv', 'env', 'dist', 'build',
+            'target', 'bin', 'obj', '.git', '.svn', '.hg', 'vendor',
+            'bower_components', '.next', '.nuxt', 'coverage'
+        }
         
         # Log configuration
         print(f"💻 Code Processor initialized with {len(self.supported_extensions)} supported file types")
         print(f"📊 Using embedding model: {Config.NOMIC_MODEL_NAME}")
     
-    def process_zip_file(self, zip_path, session_id):
-        """Extract and process code files from zip"""
+    def process_zip_file(self, zip_source, session_id, existing=None):
+        """Read and process code files from a zip (path or binary stream)"""
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extract zip file
-                try:
-                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        # Extract with size limit protection for individual files
-                        for member in zip_ref.infolist():
-                            # Skip very large individual files (>50MB)
-                            if member.file_size > 50 * 1024 * 1024:
-                                print(f"Skipping large file: {member.filename} ({member.file_size} bytes)")
-                                continue
-                            zip_ref.extract(member, temp_dir)
-                except zipfile.BadZipFile:
-                    print("Error: Invalid ZIP file")
-                    return []
+            code_files, _ = self._read_zip_code_files(zip_source)
+            
+            code_chunks = []
+            for file_path, relative_path, content in code_files:
+                code_chunks.extend(self._process_code_file(file_path, relative_path, content))
+            processed_files = len(code_files)
+            
+            # Embed chunks from all files together so batches stay full
+            code_chunks = self.doc_processor.embed_chunks(code_chunks, existing)
+            
+            print(f"Processed {processed_files} files, generated {len(code_chunks)} chunks")
+            return code_chunks
                 
-                # Process extracted files
-                code_chunks = []
-                processed_files = 0
+        except Exception as e:
+            print(f"Error processing zip file: {str(e)}")
+            return []
+    
+    def index_zip_file(self, zip_source, session_id, archive, vector_store, db_manager, user_id=None, progress=None):
+        """Re-index an archive (path or binary stream) incrementally against the session's manifest of indexed files"""
+        report_progress = progress or (lambda **counters: None)
+        manifest = db_manager.get_code_manifest(session_id, archive)
+        if manifest and not vector_store.collection_exists(session_id, "code"):
+            # The collection was dropped since the last sync; index everything again
+            manifest = {}
+        
+        fingerprint = file_fingerprint(zip_source)
+        if not manifest:
+            # An identical archive this user indexed before (anyone's, with UPLOAD_DEDUP_ACROSS_USERS) is copied instead of re-embedded
+            report = self._attach_indexed_archive(fingerprint, session_id, archive, vector_store, db_manager, user_id, report_progress)
+            if report:
+                self._register_archive(fingerprint, zip_source, session_id, archive, db_manager, user_id)
+                return report
+        
+        report = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0, 'chunks': 0}
+        new_chunks = []
+        file_hashes = {}
+        stale_ids = set()
+        seen = set()
+        
+        code_files, truncated = self._read_zip_code_files(zip_source)
+        for file_path, relative_path, content in code_files:
+            seen.add(relative_path)
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            previous = manifest.get(relative_path)
+            
+            if previous and previous['content_hash'] == content_hash:
+                report['unchanged'] += 1
+                continue
+            
+            report['changed' if previous else 'added'] += 1
+            if previous:
+                stale_ids.update(previous['chunk_ids'])
+            file_hashes[relative_path] = content_hash
+            for chunk in self._process_code_file(file_path, relative_path, content):
+                chunk['archive'] = archive
+                new_chunks.append(chunk)
+        
+        # Files missing from the archive were deleted, unless we stopped early at the file limit
+        removed_paths = [] if truncated else [path for path in manifest if path not in seen]
+        for path in removed_paths:
+            stale_ids.update(manifest[path]['chunk_ids'])
+        report['removed'] = len(removed_paths)
+        
+        # Chunk count at which each re-indexed file is complete, for progress reporting
+        file_ends = []
+        for chunk_count, chunk in enumerate(new_chunks, 1):
+            if chunk_count == len(new_chunks) or new_chunks[chunk_count]['file_path'] != chunk['file_path']:
+                file_ends.append(chunk_count)
+        report_progress(unit='chunks', total=len(new_chunks), files_total=len(file_hashes))
+        
+        stored_chunks = []
+        processed = 0
+        for batch in batched(new_chunks, Config.INGEST_BATCH_CHUNKS):
+            stored_batch = self.doc_processor.embed_chunks(
+                batch,
+                existing=lambda chunks: vector_store.existing_chunk_ids(session_id, chunks, "code")
+            )
+            if stored_batch and not vector_store.add_code_chunks(session_id, stored_batch, user_id=user_id):
+                raise RuntimeError("Failed to store code chunks in vector database")
+            stored_chunks.extend(stored_batch)
+            processed += len(batch)
+            report_progress(done=processed, chunks_done=len(stored_chunks), files_done=bisect_right(file_ends, processed))
+        
+        # Buffered rows must be in before the manifest records them as indexed
+        vector_store.flush(session_id, "code")
+        
+        entries = {path: {'content_hash': content_hash, 'chunk_ids': []} for path, content_hash in file_hashes.items()}
+        for chunk in stored_chunks:
+            entries[chunk['file_path']]['chunk_ids'].append(chunk['id'])
+        
+        for chunk in new_chunks:
+            if not (chunk.get('duplicate') or 'embedding' in chunk):
+                # Some of the file could not be embedded; leave its hash unset so the next sync retries it
+                entries[chunk['file_path']]['content_hash'] = ''
+        
+        # Chunks kept by a changed file keep their ids; only drop the ones that went away
+        kept_ids = {chunk_id for entry in entries.values() for chunk_id in entry['chunk_ids']}
+        vector_store.delete_chunks(session_id, stale_ids - kept_ids, "code")
+        db_manager.update_code_manifest(session_id, archive, entries, removed_paths)
+        
+        report['chunks'] = len(stored_chunks)
+        if all(entry['content_hash'] for entry in entries.values()):
+            self._register_archive(fingerprint, zip_source, session_id, archive, db_manager, user_id)
+        print(f"🔄 Synced {archive}: {report['added']} added, {report['changed']} changed, "
+              f"{report['removed']} removed, {report['unchanged']} unchanged")
+        return report
+    
+    def _attach_indexed_archive(self, fingerprint, session_id, archive, vector_store, db_manager, user_id, report_progress):
+        """Copy the chunks and manifest of an identical archive indexed in another session; returns a report or None"""
+        source = find_reusable_upload(db_manager, fingerprint, 'code', user_id)
+        if not source:
+            return None
+        
+        # The source session may have re-synced its archive since; only copy it while it still matches
+        source_manifest = db_manager.get_code_manifest(source['session_id'], source['filename'])
+        manifest_ids = {chunk_id for entry in source_manifest.values() for chunk_id in entry['chunk_ids']}
+        if (not source_manifest or manifest_ids != set(source['chunk_ids'])
+                or not all(entry['content_hash'] for entry in source_manifest.values())):
+            return None
+        
+        chunks = copy_stored_chunks(vector_store, source['session_id'], source['chunk_ids'], "code")
+        if chunks is None:
+            return None
+        
+        for chunk in chunks:
+            chunk['archive'] = archive
+        stored_ids = vector_store.existing_chunk_ids(session_id, chunks, "code")
+        for chunk in chunks:
+            if chunk['id'] in stored_ids:
+                chunk['duplicate'] = True
+        report_progress(unit='chunks', total=len(chunks), files_total=len(source_manifest))
+        if not vector_store.add_code_chunks(session_id, chunks, user_id=user_id):
+            raise RuntimeError("Failed to store code chunks in vector database")
+        vector_store.flush(session_id, "code")
+        
+        entries = {path: {'content_hash': entry['content_hash'], 'chunk_ids': []} for path, entry in source_manifest.items()}
+        for chunk in chunks:
+            entries[chunk['file_path']]['chunk_ids'].append(chunk['id'])
+        db_manager.update_code_manifest(session_id, archive, entries, [])
+        report_progress(done=len(chunks), chunks_done=len(chunks), files_done=len(entries))
+        
+        print(f"♻️ Reused {len(chunks)} chunks of {source['filename']} (session {source['session_id']}) for {archive}")
+        return {'added': len(entries), 'changed': 0, 'removed': 0, 'unchanged': 0, 'chunks': len(chunks), 'reused': True}
+    
+    def _register_archive(self, fingerprint, zip_source, session_id, archive, db_manager, user_id):
+        """Record a fully indexed archive so identical uploads can reuse its chunks"""
+        manifest = db_manager.get_code_manifest(session_id, archive)
+        chunk_ids = [chunk_id for entry in manifest.values() for chunk_id in entry['chunk_ids']]
+        try:
+            db_manager.save_document(user_id, session_id, archive, 'application/zip', source_size(zip_source),
+                                     content_hash=fingerprint, collection='code', chunk_ids=chunk_ids)
+        except Exception as e:
+            print(f"⚠️ Could not register {archive} for upload deduplication: {str(e)}")
+    
+    def _read_zip_code_files(self, zip_source):
+        """Read the supported code files of a zip (path or binary stream) straight from the archive;
+        returns ([(path, relative path, content)], truncated)"""
+        try:
+            with open_source(zip_source) as f, zipfile.ZipFile(f, 'r') as zip_ref:
+                code_files = []
                 max_files = 1000  # Limit number of files to process
                 
-                for root, dirs, files in os.walk(temp_dir):
+                for member in zip_ref.infolist():
+                    if member.is_dir():
+                        continue
+                    file_path = PurePosixPath(member.filename.lstrip('/'))
                     # Skip common non-essential directories
-                    dirs[:] = [d for d in dirs if not d.startswith('.') and d not in {
-                        'node_modules', '__pycache__', 'venv', 'env', 'dist', 'build',
-                        'target', 'bin', 'obj', '.git', '.svn', '.hg', 'vendor',
-                        'bower_components', '.next', '.nuxt', 'coverage'
-                    }]
+                    if any(part.startswith('.') or part in self.skipped_dirs for part in file_path.parts[:-1]):
+                        continue
+                    if not self._should_process_member(member, file_path):
+                        continue
                     
-                    for file in files:
-                        if processed_files >= max_files:
-                            print(f"Reached maximum file limit ({max_files}), stopping processing")
-                            break
-                            
-                        file_path = Path(root) / file
-                        if self._should_process_file(file_path):
-                            chunks = self._process_code_file(file_path, temp_dir)
-                            code_chunks.extend(chunks)
-                            processed_files += 1
+                    if len(code_files) >= max_files:
+                        print(f"Reached maximum file limit ({max_files}), stopping processing")
+                        return code_files, True
                     
-                    if processed_files >= max_files:
-                        break
+                    try:
+                        content = zip_ref.read(member).decode('utf-8')
+                    except UnicodeDecodeError:
+                        continue  # Skip binary files
+                    except Exception as e:
+                        print(f"Error reading file {member.filename}: {str(e)}")
+                        continue
+                    code_files.append((file_path, str(file_path), content))
                 
-                print(f"Processed {processed_files} files, generated {len(code_chunks)} chunks")
-                return code_chunks
-                
-        except Exception as e:
-            print(f"Error processing zip file: {str(e)}")
-            return []
+                return code_files, False
+        except zipfile.BadZipFile:
+            print("Error: Invalid ZIP file")
+            return [], False
     
-    def _should_process_file(self, file_path):
-        """Check if file should be processed"""
+    def _should_process_member(self, member, file_path):
+        """Check if an archive member should be processed"""
         # Check extension
         if file_path.suffix.lower() not in self.supported_extensions:
             return False
         
-        # Check file size (skip very large files)
-        try:
-            if file_path.stat().st_size > 1024 * 1024:  # 1MB limit
-                return False
-        except:
-            return False
-        
-        # Skip binary files
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                f.read(1024)  # Try to read first 1KB
-            return True
-        except:
-            return False
+        # Skip very large files
+        return member.file_size <= 1024 * 1024  # 1MB limit
     
-    def _process_code_file(self, file_path, base_dir):
-        """Process individual code file"""
+    def _process_code_file(self, file_path, relative_path, content):
+        """Split an individual code file into chunks (embedded later in batches)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Get relative path from base directory
-            relative_path = os.path.relpath(file_path, base_dir)
-            
-            # Split content into chunks
-            chunks = self._chunk_code(content, file_path.suffix)
-            
+            # Chunks are line-aligned spans of the file, overlapping by a few lines
             processed_chunks = []
-            for i, chunk in enumerate(chunks):
-                # Create embedding
-                embedding = self.doc_processor.get_embedding(chunk)
-                if embedding:
-                    processed_chunks.append({
-                        'text': chunk,
-                        'original_text': content,
-                        'file_path': relative_path,
-                        'file_type': file_path.suffix,
-                        'chunk_index': i,
-                        'embedding': embedding
-                    })
+            for i, (start, end) in enumerate(self._chunk_code(content, file_path.suffix)):
+                processed_chunks.append({
+                    'text': content[start:end],
+                    'source_text': content,
+                    'source_start': start,
+                    'source_end': end,
+                    'file_path': relative_path,
+                    'file_type': file_path.suffix,
+                    'chunk_index': i
+                })
             
             return processed_chunks
             
@@ -127,30 +254,9 @@ class CodeProcessor:
             print(f"Error processing file {file_path}: {str(e)}")
             return []
     
-    def _chunk_code(self, content, file_extension, max_chunk_size=1000):
-        """Split code into meaningful chunks"""
-        lines = content.split('\n')
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        
-        for line in lines:
-            line_size = len(line) + 1  # +1 for newline
-            
-            if current_size + line_size > max_chunk_size and current_chunk:
-                # Save current chunk
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = [line]
-                current_size = line_size
-            else:
-                current_chunk.append(line)
-                current_size += line_size
-        
-        # Add remaining chunk
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
-        
-        return chunks
+    def _chunk_code(self, content, file_extension, max_tokens=None):
+        """Split code into token-bounded chunks of whole lines; returns (start, end) offsets"""
+        return chunk_code_spans(content, max_tokens)
     
     def extract_code_structure(self, content, file_type):
         """Extract code structure (functions, classes, etc.)"""
@@ -3,17 +3,17 @@ import base64
 from werkzeug.utils import secure_filename
 from config.settings import Config
 from utils.document_processor import DocumentProcessor
-from utils.vector_store import VectorStore
+from utils.vector_store_factory import create_session_vector_store
 from services.llm_service import LLMService
 
 class FileService:
     """Service for handling file uploads and processing"""
     
-    def __init__(self):
+    def __init__(self, doc_processor=None, vector_store=None, llm_service=None):
         self.upload_folder = Config.UPLOAD_FOLDER
-        self.doc_processor = DocumentProcessor()
-        self.vector_store = VectorStore()
-        self.llm_service = LLMService()
+        self.doc_processor = doc_processor or DocumentProcessor()
+        self.vector_store = vector_store or create_session_vector_store()
+        self.llm_service = llm_service or LLMService()
 
     def process_uploaded_file(self, file, session_id, user_id):
         """Process uploaded file based on type"""
@@ -26,7 +26,7 @@ class FileService:
 
         try:
             if filename.lower().endswith('.docx'):
-                return self._process_document(file_path, filename, session_id)
+                return self._process_document(file_path, filename, session_id, user_id)
             elif filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
                 return self._process_image(file_path, filename)
             else:
@@ -36,10 +36,13 @@ class FileService:
             if os.path.exists(file_path):
                 os.remove(file_path)
 
-    def _process_document(self, file_path, filename, session_id):
+    def _process_document(self, file_path, filename, session_id, user_id=None):
         """Process document file"""
-        processed_text = self.doc_processor.process_document(file_path)
-        self.vector_store.add_documents(session_id, processed_text, filename)
+        processed_text = self.doc_processor.process_document(
+            file_path,
+            existing=lambda chunks: self.vector_store.existing_chunk_ids(session_id, chunks, filename)
+        )
+        self.vector_store.add_documents(session_id, processed_text, filename, user_id=user_id)
         
         return {
             'type': 'document',
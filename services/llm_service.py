@@ -11,11 +11,13 @@ from config.settings import Config
 class LLMService:
     """Service for handling LLM interactions with streaming support"""
     
-    def __init__(self):
+    def __init__(self, openai_client=None):
         self.llm_server_url = Config.LLM_SERVER_URL
         self.llm_model_path = Config.LLM_MODEL_PATH
         self.openai_api_key = Config.OPENAI_API_KEY
-        self.openai_client = OpenAI(api_key=self.openai_api_key) if self.openai_api_key else None
+        if openai_client is None and self.openai_api_key:
+            openai_client = OpenAI(api_key=self.openai_api_key)
+        self.openai_client = openai_client
 
     def generate_response(self, user_message, context="", image_url=None, max_tokens=10000, temperature=0.1):
         """Generate response using local LLM or OpenAI as fallback"""
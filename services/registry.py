@@ -0,0 +1,227 @@
+import time
+import threading
+from config.settings import Config
+
+_NOT_BUILT = object()
+
+class ServiceRegistry:
+    """Named services built at most once per process, on first use, with how long each took"""
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # name -> {'seconds', 'dependency_seconds', 'started_at'} in the order services were built
+        self._timings = {}
+
+    def register(self, name, factory):
+        """Register factory() -> service under name"""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        """The service, building it (and whatever it depends on) if this is its first use"""
+        instance = self._instances.get(name, _NOT_BUILT)
+        if instance is not _NOT_BUILT:
+            return instance
+
+        stack = self._building()
+        if name in stack:
+            raise RuntimeError(f"Circular service dependency: {' -> '.join(stack + [name])}")
+        if name not in self._factories:
+            raise KeyError(f"Unknown service: {name}")
+
+        with self._locks[name]:
+            instance = self._instances.get(name, _NOT_BUILT)
+            if instance is not _NOT_BUILT:
+                return instance
+            return self._build(name, stack)
+
+    def record(self, name, seconds):
+        """Record a startup step that is not a registry service (e.g. creating the app)"""
+        self._timings[name] = {'seconds': seconds, 'dependency_seconds': 0.0, 'started_at': time.time() - seconds}
+
+    def is_built(self, name):
+        return name in self._instances
+
+    def report(self):
+        """What has been initialised and how long each part took, followed by services not built yet"""
+        timings = sorted(self._timings.items(), key=lambda item: item[1]['started_at'])
+        report = [
+            {
+                'name': name,
+                'status': 'initialised',
+                'seconds': round(timing['seconds'], 3),
+                'dependency_seconds': round(timing['dependency_seconds'], 3)
+            }
+            for name, timing in timings
+        ]
+        report.extend(
+            {'name': name, 'status': 'not initialised', 'seconds': None, 'dependency_seconds': None}
+            for name in self._factories if name not in self._timings
+        )
+        return report
+
+    def print_report(self, title="Startup report"):
+        print(f"⏱️ {title}:")
+        for entry in self.report():
+            if entry['seconds'] is None:
+                print(f"   {entry['name']:<24} not initialised (built on first use)")
+            else:
+                dependencies = f" (+{entry['dependency_seconds']:.2f}s dependencies)" if entry['dependency_seconds'] else ""
+                print(f"   {entry['name']:<24} {entry['seconds']:.2f}s{dependencies}")
+
+    def _building(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+            self._local.nested = []
+        return self._local.stack
+
+    def _build(self, name, stack):
+        # Time spent building dependencies is reported under them, not under this service
+        stack.append(name)
+        self._local.nested.append(0.0)
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            instance = self._factories[name]()
+        except Exception as e:
+            print(f"❌ Failed to initialise {name}: {str(e)}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            dependency_seconds = self._local.nested.pop()
+            if self._local.nested:
+                self._local.nested[-1] += elapsed
+
+        self._instances[name] = instance
+        self._timings[name] = {
+            'seconds': elapsed - dependency_seconds,
+            'dependency_seconds': dependency_seconds,
+            'started_at': started_at
+        }
+        print(f"⚙️ Initialised {name} in {elapsed - dependency_seconds:.2f}s")
+        return instance
+
+class LazyService:
+    """Stand-in for a registry service that builds it on first attribute access"""
+
+    def __init__(self, registry, name):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self):
+        state = 'initialised' if self._registry.is_built(self._name) else 'not initialised'
+        return f"<LazyService {self._name} ({state})>"
+
+_registry = ServiceRegistry()
+
+def get_service_registry():
+    """Get the process-wide service registry"""
+    return _registry
+
+def get_service(name):
+    """Get a shared service, building it on first use"""
+    return _registry.get(name)
+
+def lazy_service(name):
+    """Module-level handle on a shared service that is only built when first used"""
+    return LazyService(_registry, name)
+
+# Factories import their modules when first called, so startup does not pay for
+# NLTK corpora, Milvus connections, API clients or the Gradio handshake
+
+def _database_manager():
+    from utils.database import DatabaseManager
+    return DatabaseManager()
+
+def _vector_store():
+    from utils.vector_store_factory import create_vector_store
+    return create_vector_store()
+
+def _session_vector_store():
+    from utils.vector_store_factory import create_session_vector_store
+    return create_session_vector_store()
+
+def _document_processor():
+    from utils.document_processor import get_shared_document_processor
+    return get_shared_document_processor()
+
+def _openai_client():
+    if not Config.OPENAI_API_KEY:
+        return None
+    from openai import OpenAI
+    return OpenAI(api_key=Config.OPENAI_API_KEY)
+
+def _llm_service():
+    from services.llm_service import LLMService
+    return LLMService(openai_client=get_service('openai_client'))
+
+def _retrieval_service():
+    from services.retrieval_service import RetrievalService
+    return RetrievalService(document_store=get_service('vector_store'), session_store=get_service('session_vector_store'))
+
+def _chat_service():
+    from services.chat_service import ChatService
+    return ChatService(
+        db_manager=get_service('db_manager'),
+        vector_store=get_service('session_vector_store'),
+        retrieval_service=get_service('retrieval_service'),
+        llm_service=get_service('llm_service')
+    )
+
+def _file_service():
+    from services.file_service import FileService
+    return FileService(
+        doc_processor=get_service('document_processor'),
+        vector_store=get_service('session_vector_store'),
+        llm_service=get_service('llm_service')
+    )
+
+def _web_search_service():
+    from services.web_search_service import WebSearchService
+    return WebSearchService()
+
+def _code_processor():
+    from services.code_processor import CodeProcessor
+    return CodeProcessor(doc_processor=get_service('document_processor'))
+
+def _image_processor():
+    from utils.image_processor import ImageProcessor
+    return ImageProcessor(openai_client=get_service('openai_client'))
+
+def _image_service():
+    from services.image_service import ImageService
+    return ImageService()
+
+def _auth_manager():
+    from utils.auth import AuthManager
+    return AuthManager(db=get_service('db_manager'))
+
+for _name, _factory in [
+    ('db_manager', _database_manager),
+    ('vector_store', _vector_store),
+    ('session_vector_store', _session_vector_store),
+    ('document_processor', _document_processor),
+    ('openai_client', _openai_client),
+    ('llm_service', _llm_service),
+    ('retrieval_service', _retrieval_service),
+    ('chat_service', _chat_service),
+    ('file_service', _file_service),
+    ('web_search_service', _web_search_service),
+    ('code_processor', _code_processor),
+    ('image_processor', _image_processor),
+    ('image_service', _image_service),
+    ('auth_manager', _auth_manager)
+]:
+    _registry.register(_name, _factory)
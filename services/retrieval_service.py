@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+from utils.document_processor import get_shared_document_processor
+from utils.lexical_index import reciprocal_rank_fusion
+from utils.vector_store_factory import create_vector_store, create_session_vector_store
+
+# Collections a session can have, by source type
+SOURCE_TYPES = ('documents', 'code', 'session')
+
+_search_pool = ThreadPoolExecutor(max_workers=12, thread_name_prefix="retrieval")
+
+class RetrievalService:
+    """Service for retrieving context from every collection a session has"""
+
+    def __init__(self, document_store=None, session_store=None):
+        self.document_store = document_store or create_vector_store()
+        self.session_store = session_store or create_session_vector_store()
+
+    def retrieve(self, session_id, query_text, top_k=5, source_types=SOURCE_TYPES, search_mode=None):
+        """Embed the query once, search all of the session's collections concurrently and merge the hits"""
+        search_mode = search_mode or Config.SEARCH_MODE
+        query_embedding = None
+        if search_mode != 'lexical':
+            query_embedding = get_shared_document_processor().get_embedding(query_text)
+            if not query_embedding:
+                return []
+
+        futures = {
+            source_type: _search_pool.submit(
+                self._search_source, source_type, session_id, query_text, query_embedding, top_k, search_mode
+            )
+            for source_type in source_types
+        }
+
+        ranked_lists = []
+        for source_type, future in futures.items():
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"❌ Error retrieving from {source_type}: {str(e)}")
+                continue
+
+            for result in results:
+                result['source_type'] = source_type
+                result['source_score'] = result['score']
+            ranked_lists.append(results)
+
+        return self._merge_sources(ranked_lists, top_k, search_mode)
+
+    def format_context(self, results):
+        """Render retrieved hits as LLM context, labelled by where they came from"""
+        sections = []
+        for result in results:
+            if result['source_type'] == 'code':
+                label = f"[code] {result.get('file_path', 'Unknown')}"
+            else:
+                label = f"[{result['source_type']}] {result.get('filename', 'Unknown')}"
+            sections.append(f"{label}\n{result.get('text', '')}")
+        return "\n\n".join(sections)
+
+    def _search_source(self, source_type, session_id, query_text, query_embedding, top_k, search_mode):
+        if source_type == 'session':
+            # The legacy per-session store only does dense search
+            if query_embedding is None:
+                return []
+            return self.session_store.search_documents(session_id, query_text, top_k, query_embedding=query_embedding)
+
+        return self.document_store.search_documents(
+            session_id,
+            query_text,
+            source_type,
+            top_k,
+            search_mode=search_mode,
+            query_embedding=query_embedding
+        )
+
+    def _merge_sources(self, ranked_lists, top_k, search_mode):
+        """One ranking over every source's hits"""
+        if search_mode == 'vector':
+            # Cosine similarity from one embedding model is comparable between collections
+            merged = [result for results in ranked_lists for result in results]
+            merged.sort(key=lambda result: result['score'], reverse=True)
+            return merged[:top_k]
+
+        # BM25 and fused scores only mean something within their own list, so fuse the lists by rank
+        return reciprocal_rank_fusion(ranked_lists, top_k, k=Config.HYBRID_RRF_K)
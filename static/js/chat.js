@@ -720,7 +720,14 @@ class ChatInterface {
             if (data.error) {
                 this.addMessage('assistant', `📄 Upload failed: ${data.error}`);
             } else {
-                this.addMessage('assistant', `📄 ${data.message}\n\nProcessed ${data.chunks} chunks from "${data.filename}". You can now ask questions about this document!`);
+                this.hideTypingIndicator();
+                const job = await this.trackIngestionJob(data.job_id, '📄');
+                if (job.status === 'succeeded') {
+                    const result = job.result;
+                    this.addMessage('assistant', `📄 ${result.message}\n\n${result.reused ? 'Reused' : 'Processed'} ${result.chunks} chunks from "${result.filename}"${result.reused ? ' (identical to an earlier upload)' : ''}. You can now ask questions about this document!`);
+                } else {
+                    this.addMessage('assistant', `📄 Upload ${job.status}${job.error ? `: ${job.error}` : ''}`);
+                }
             }
         } catch (error) {
             console.error('RAG upload error:', error);
@@ -755,7 +762,14 @@ class ChatInterface {
             if (data.error) {
                 this.addMessage('assistant', `💻 Upload failed: ${data.error}`);
             } else {
-                this.addMessage('assistant', `💻 ${data.message}\n\nProcessed ${data.chunks} code chunks from "${data.filename}". You can now ask questions about your codebase!`);
+                this.hideTypingIndicator();
+                const job = await this.trackIngestionJob(data.job_id, '💻');
+                if (job.status === 'succeeded') {
+                    const result = job.result;
+                    this.addMessage('assistant', `💻 ${result.message}\n\n${this.formatIndexReport(result)} from "${result.filename}". You can now ask questions about your codebase!`);
+                } else {
+                    this.addMessage('assistant', `💻 Upload ${job.status}${job.error ? `: ${job.error}` : ''}`);
+                }
             }
         } catch (error) {
             console.error('Codebase upload error:', error);
@@ -791,8 +805,15 @@ class ChatInterface {
             if (data.error) {
                 this.addMessage('assistant', `💻 GitHub upload failed: ${data.error}`);
             } else {
-                this.addMessage('assistant', `💻 ${data.message}\n\nProcessed ${data.chunks} code chunks from "${data.repo_name}". You can now ask questions about this codebase!`);
                 githubUrlInput.value = '';
+                this.hideTypingIndicator();
+                const job = await this.trackIngestionJob(data.job_id, '💻');
+                if (job.status === 'succeeded') {
+                    const result = job.result;
+                    this.addMessage('assistant', `💻 ${result.message}\n\n${this.formatIndexReport(result)} from "${result.repo_name}". You can now ask questions about this codebase!`);
+                } else {
+                    this.addMessage('assistant', `💻 GitHub upload ${job.status}${job.error ? `: ${job.error}` : ''}`);
+                }
             }
         } catch (error) {
             console.error('GitHub upload error:', error);
@@ -802,6 +823,91 @@ class ChatInterface {
         }
     }
 
+    // Follow a background ingestion job until it finishes; resolves with its final status
+    trackIngestionJob(jobId, icon) {
+        const progressMessage = this.addMessage('assistant', `${icon} Queued...`);
+        const progressText = progressMessage.querySelector('.message-text');
+        const cancelButton = document.createElement('button');
+        cancelButton.className = 'cancel-job-btn';
+        cancelButton.textContent = 'Cancel';
+        cancelButton.addEventListener('click', () => {
+            cancelButton.disabled = true;
+            fetch(`/ingest_jobs/${jobId}/cancel`, { method: 'POST' });
+        });
+        progressMessage.querySelector('.message-content').appendChild(cancelButton);
+
+        return new Promise((resolve) => {
+            let lastJob = null;
+            let events = null;
+
+            const finish = (job) => {
+                events.close();
+                cancelButton.remove();
+                progressText.textContent = this.formatJobProgress(job, icon);
+                resolve(job);
+            };
+
+            // The stream was closed for good; ask for the job's status and reconnect unless it has finished
+            const checkJob = async () => {
+                try {
+                    const response = await fetch(`/ingest_jobs/${jobId}`);
+                    const job = await response.json();
+                    if (!response.ok || ['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+                        finish(job);
+                        return;
+                    }
+                    lastJob = job;
+                    progressText.textContent = this.formatJobProgress(job, icon);
+                } catch (error) {
+                    console.error('Ingestion job status error:', error);
+                }
+                setTimeout(connect, 2000);
+            };
+
+            const connect = () => {
+                events = new EventSource(`/ingest_jobs/${jobId}/events`);
+                events.onmessage = (event) => {
+                    if (event.data === '[DONE]') {
+                        finish(lastJob);
+                        return;
+                    }
+                    lastJob = JSON.parse(event.data);
+                    progressText.textContent = this.formatJobProgress(lastJob, icon);
+                };
+                events.onerror = () => {
+                    // While the stream is reconnecting the browser retries on its own
+                    if (events.readyState === EventSource.CLOSED) {
+                        checkJob();
+                    }
+                };
+            };
+
+            connect();
+        });
+    }
+
+    formatJobProgress(job, icon) {
+        if (job.error && !job.status) return `${icon} ${job.error}`;
+        if (job.status === 'queued') return `${icon} Queued...`;
+
+        const percent = Math.round((job.progress || 0) * 100);
+        let text = `${icon} ${job.status === 'running' ? 'Processing' : job.status}: ${percent}%`;
+        if (job.total) text += ` (${job.done}/${job.total} ${job.unit})`;
+        if (job.files_total) text += `, ${job.files_done}/${job.files_total} files`;
+        text += `, ${job.chunks_done} chunks`;
+        if (job.chunks_per_second) text += ` at ${job.chunks_per_second}/s`;
+        if (job.eta_seconds !== null && job.eta_seconds !== undefined) text += `, about ${Math.ceil(job.eta_seconds)}s left`;
+        return text;
+    }
+
+    formatIndexReport(result) {
+        if (result.reused) {
+            return `Reused ${result.chunks} code chunks of ${result.added} files from an identical earlier upload`;
+        }
+        return `Indexed ${result.added} new and ${result.changed} changed files (${result.chunks} code chunks), ` +
+            `removed ${result.removed} and kept ${result.unchanged} unchanged`;
+    }
+
     // Navigation functions
     newChat() {
         fetch('/new_session')
@@ -0,0 +1,32 @@
+import sys
+from utils.blob_store import BlobStore
+
+def test_memory_tier_is_bounded_by_bytes(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.sqlite3"), memory_budget_mb=1)
+    small = [f"small blob {i}" for i in range(3)]
+    large = "x" * (600 * 1024)
+    small_ids = store.put_many(small)
+    large_id = store.put(large)
+
+    store.get_many(small_ids)
+    assert set(store._memory) == set(small_ids)
+
+    # A second large blob pushes out the least recently read ones until it fits
+    other_large = "y" * (600 * 1024)
+    other_large_id = store.put(other_large)
+    store.get(large_id)
+    store.get(other_large_id)
+    assert large_id not in store._memory
+    assert other_large_id in store._memory
+    assert store._memory_bytes == sum(sys.getsizeof(text) for text in store._memory.values())
+    assert store._memory_bytes <= store.memory_budget
+
+    assert store.get(large_id, 0, 3) == "xxx"
+
+def test_blobs_larger_than_the_budget_are_read_but_not_kept(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs.sqlite3"), memory_budget_mb=0)
+    blob_id = store.put("some source text")
+
+    assert store.get(blob_id) == "some source text"
+    assert store._memory_bytes == 0
+    assert not store._memory
@@ -0,0 +1,86 @@
+import random
+from utils.chunking import (
+    token_spans, count_tokens, sentence_spans, line_spans, chunk_spans, chunk_text_spans, chunk_code_spans
+)
+
+def prose(sentences=60, seed=3):
+    rng = random.Random(seed)
+    words = "the index stores chunk embeddings for every uploaded document and answers queries quickly".split()
+    return " ".join(
+        " ".join(rng.choices(words, k=rng.randint(3, 25))).capitalize() + rng.choice(".!?")
+        for _ in range(sentences)
+    )
+
+def covered_tokens(text, chunks):
+    tokens = set()
+    for start, end in chunks:
+        tokens.update(span for span in token_spans(text) if start <= span[0] and span[1] <= end)
+    return tokens
+
+def test_tokens_split_long_words_and_punctuation():
+    assert count_tokens("Hello, world!") == 4
+    assert count_tokens("internationalization") == 3
+    assert token_spans("a-b") == [(0, 1), (1, 2), (2, 3)]
+
+def test_sentence_and_line_spans_cover_their_units():
+    text = "First one. Second (really)! Third"
+    assert [text[start:end] for start, end in sentence_spans(text)] == ["First one.", " Second (really)!", " Third"]
+    assert line_spans("a\n\n  b\n") == [(0, 1), (3, 6)]
+
+def test_chunks_respect_the_token_limit_and_cover_every_token():
+    text = prose()
+    chunks = chunk_text_spans(text, max_tokens=40, overlap_tokens=0)
+    assert len(chunks) > 1
+    for start, end in chunks:
+        assert count_tokens(text[start:end]) <= 40
+    assert covered_tokens(text, chunks) == set(token_spans(text))
+
+def test_chunks_without_overlap_are_ordered_and_disjoint():
+    text = prose()
+    chunks = chunk_text_spans(text, max_tokens=40, overlap_tokens=0)
+    for (_, previous_end), (start, _) in zip(chunks, chunks[1:]):
+        assert previous_end <= start
+
+def test_chunks_start_and_end_on_sentence_boundaries():
+    text = prose()
+    sentence_ends = {end for _, end in sentence_spans(text)}
+    for start, end in chunk_text_spans(text, max_tokens=60, overlap_tokens=0):
+        assert end in sentence_ends
+        assert start == 0 or text[start - 1] == " "
+
+def test_overlap_carries_whole_sentences_within_budget():
+    text = prose()
+    chunks = chunk_text_spans(text, max_tokens=60, overlap_tokens=15)
+    sentence_starts = {start for start, _ in sentence_spans(text)}
+    overlapping = 0
+    for (_, previous_end), (start, end) in zip(chunks, chunks[1:]):
+        assert count_tokens(text[start:end]) <= 60
+        if start < previous_end:
+            overlapping += 1
+            assert count_tokens(text[start:previous_end]) <= 15
+            # The carried text begins at a sentence (after its leading space)
+            assert any(boundary <= start and not text[boundary:start].strip() for boundary in sentence_starts)
+    assert overlapping > 0
+
+def test_overlong_sentences_are_hard_split():
+    text = " ".join(["word"] * 100) + "."
+    chunks = chunk_text_spans(text, max_tokens=30, overlap_tokens=0)
+    assert [count_tokens(text[start:end]) for start, end in chunks] == [30, 30, 30, 11]
+
+def test_empty_text_has_no_chunks():
+    assert chunk_spans("", [], 10) == []
+    assert chunk_text_spans("   ", max_tokens=10) == []
+
+def test_code_chunks_are_line_aligned_and_keep_indentation():
+    text = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(30))
+    chunks = chunk_code_spans(text, max_tokens=24, overlap_tokens=0)
+    assert len(chunks) > 1
+    for start, end in chunks:
+        assert start == 0 or text[start - 1] == "\n"
+        assert text[end - 1] != "\n" and (end == len(text) or text[end] == "\n")
+        assert count_tokens(text[start:end]) <= 24
+    assert covered_tokens(text, chunks) == set(token_spans(text))
+
+    indented = "class A:\n" + "".join(f"    x{i} = {i}\n" for i in range(20))
+    chunks = chunk_code_spans(indented, max_tokens=12, overlap_tokens=0)
+    assert indented[chunks[1][0]:chunks[1][1]].startswith("    x")
@@ -0,0 +1,62 @@
+import io
+import pytest
+from docx import Document
+from docx.enum.text import WD_BREAK
+from utils.docx_stream import DocxBlocks, iter_docx_blocks
+from benchmarks.docx_benchmark import build_docx, python_docx_blocks
+
+@pytest.fixture
+def sample_docx(tmp_path):
+    doc = Document()
+    doc.add_heading("Quarterly report", level=1)
+    paragraph = doc.add_paragraph("Revenue ")
+    paragraph.add_run("grew").bold = True
+    paragraph.add_run("\tstrongly")
+    doc.add_paragraph("   ")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Region"
+    table.cell(0, 1).text = "Total"
+    table.cell(1, 0).text = "North"
+    table.cell(1, 1).paragraphs[0].text = "12"
+    table.cell(1, 1).add_paragraph("up 3%")
+    breaks = doc.add_paragraph("Line one")
+    breaks.add_run().add_break()
+    breaks.add_run("line two")
+    breaks.add_run().add_break(WD_BREAK.PAGE)
+    doc.add_paragraph("Closing remarks")
+
+    path = tmp_path / "sample.docx"
+    doc.save(path)
+    return path
+
+def test_matches_python_docx_paragraphs_and_table_cells(sample_docx):
+    assert list(iter_docx_blocks(str(sample_docx))) == python_docx_blocks(str(sample_docx))
+
+def test_keeps_document_order_and_drops_empty_paragraphs(sample_docx):
+    assert list(iter_docx_blocks(str(sample_docx))) == [
+        "Quarterly report",
+        "Revenue grew\tstrongly",
+        "Region", "Total", "North", "12\nup 3%",
+        "Line one\nline two",
+        "Closing remarks"
+    ]
+
+def test_reads_bytes_and_streams(sample_docx):
+    data = sample_docx.read_bytes()
+    expected = list(iter_docx_blocks(str(sample_docx)))
+    assert list(iter_docx_blocks(data)) == expected
+    assert list(iter_docx_blocks(io.BytesIO(data))) == expected
+
+def test_reports_progress_through_the_document_xml(sample_docx):
+    blocks = DocxBlocks(str(sample_docx))
+    iterator = iter(blocks)
+    next(iterator)
+    assert 0 < blocks.total_bytes
+    assert 0 < blocks.bytes_read <= blocks.total_bytes
+    list(iterator)
+    assert blocks.bytes_read == blocks.total_bytes
+
+def test_matches_python_docx_on_a_generated_document(tmp_path):
+    path = str(tmp_path / "generated.docx")
+    build_docx(path, paragraphs=300, table_every=40)
+    assert list(iter_docx_blocks(path)) == python_docx_blocks(path)
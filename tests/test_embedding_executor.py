@@ -0,0 +1,120 @@
+import time
+import pytest
+from utils import embedding_executor
+from utils.embedding_executor import TokenBucket, EmbeddingExecutor
+from utils.nomic_embeddings import EmbeddingAPIError
+
+class FakeEmbeddings:
+    """Fails with the queued errors, then returns one embedding per text"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def request_embeddings(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(len(text))] for text in texts]
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting"""
+    recorded = []
+    monkeypatch.setattr(embedding_executor.time, 'sleep', recorded.append)
+    return recorded
+
+@pytest.fixture
+def executor():
+    created = []
+
+    def build(embeddings, **kwargs):
+        kwargs.setdefault('max_workers', 2)
+        kwargs.setdefault('rate', 1000)
+        created.append(EmbeddingExecutor(embeddings, **kwargs))
+        return created[-1]
+
+    yield build
+    for pool in created:
+        pool.shutdown()
+
+def test_bucket_allows_a_burst_up_to_capacity():
+    bucket = TokenBucket(rate=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.1
+    assert bucket.tokens < 1
+
+def test_bucket_waits_for_tokens_to_refill():
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+def test_throttle_halves_rate_down_to_the_minimum():
+    bucket = TokenBucket(rate=8, min_rate=1)
+    bucket.throttle()
+    assert bucket.rate == 4
+    assert bucket.tokens == 0
+    for _ in range(5):
+        bucket.throttle()
+    assert bucket.rate == 1
+
+def test_throttle_honours_retry_after():
+    bucket = TokenBucket(rate=100)
+    bucket.throttle(retry_after=30)
+    assert bucket.blocked_until - time.monotonic() > 29
+
+def test_reward_creeps_back_to_the_configured_rate():
+    bucket = TokenBucket(rate=10)
+    bucket.throttle()
+    bucket.reward()
+    assert bucket.rate == pytest.approx(5.5)
+    for _ in range(20):
+        bucket.reward()
+    assert bucket.rate == 10
+
+def test_backoff_delay_is_bounded_and_respects_retry_after(executor):
+    pool = executor(FakeEmbeddings(), base_delay=0.5, max_delay=4.0)
+    for attempt in range(10):
+        assert 0 <= pool._backoff_delay(attempt) <= min(4.0, 0.5 * 2 ** attempt)
+    assert pool._backoff_delay(0, retry_after=7) >= 7
+
+def test_transient_errors_are_retried(executor, sleeps):
+    embeddings = FakeEmbeddings(EmbeddingAPIError("unavailable", status_code=503), EmbeddingAPIError("timeout"))
+    pool = executor(embeddings, max_retries=3)
+    assert pool.embed(["ab", "c"]) == [[2.0], [1.0]]
+    assert embeddings.calls == 3
+    assert len(sleeps) == 2
+
+def test_rate_limit_throttles_and_waits_for_retry_after(executor, sleeps):
+    embeddings = FakeEmbeddings(EmbeddingAPIError("slow down", status_code=429, retry_after=0.05))
+    pool = executor(embeddings, rate=10)
+    pool.embed(["a"])
+    assert pool.bucket.rate < 10
+    assert max(sleeps) >= 0.05
+
+def test_retries_stop_at_max_retries(executor, sleeps):
+    errors = [EmbeddingAPIError("unavailable", status_code=503) for _ in range(5)]
+    embeddings = FakeEmbeddings(*errors)
+    pool = executor(embeddings, max_retries=2)
+    with pytest.raises(EmbeddingAPIError):
+        pool.embed(["a"])
+    assert embeddings.calls == 3
+
+def test_client_errors_are_not_retried(executor, sleeps):
+    embeddings = FakeEmbeddings(EmbeddingAPIError("bad input", status_code=400))
+    pool = executor(embeddings)
+    with pytest.raises(EmbeddingAPIError):
+        pool.embed(["a"])
+    assert embeddings.calls == 1
+    assert sleeps == []
+
+def test_map_keeps_order_and_returns_errors_in_place(executor, sleeps):
+    embeddings = FakeEmbeddings(EmbeddingAPIError("bad input", status_code=400))
+    pool = executor(embeddings, max_workers=1)
+    results = pool.map([["a"], ["bb"], ["ccc"]])
+    assert isinstance(results[0], EmbeddingAPIError)
+    assert results[1:] == [[[2.0]], [[3.0]]]
@@ -0,0 +1,207 @@
+import time
+import threading
+import pytest
+from utils import index_policy
+from utils.collection_registry import CollectionRegistry
+from utils.index_policy import IndexPolicy, IndexManager
+from utils.insert_buffer import InsertBuffer
+
+class FakeCollection:
+    """Collection whose num_entities, like Milvus's, only counts rows in sealed segments"""
+
+    def __init__(self, name="documents_test", sealed=0):
+        self.name = name
+        self.sealed = sealed
+        self.growing = 0
+        self.indexes = []
+        self.index_params = None
+        self.loaded = False
+        self.events = []
+
+    @property
+    def num_entities(self):
+        return self.sealed
+
+    def upsert(self, data):
+        self.growing += len(data[0])
+
+    def flush(self):
+        self.sealed += self.growing
+        self.growing = 0
+
+    def load(self):
+        self.loaded = True
+
+    def release(self):
+        self.events.append('release')
+        self.loaded = False
+
+    def drop_index(self):
+        self.events.append('drop_index')
+
+    def create_index(self, field_name, index_params):
+        self.events.append('create_index')
+        self.index_params = index_params
+
+@pytest.fixture
+def buffer():
+    insert_buffer = InsertBuffer(max_rows=10000, max_age=3600)
+    yield insert_buffer
+    insert_buffer.discard("documents_test")
+    insert_buffer.close()
+
+@pytest.fixture
+def registry():
+    collection_registry = CollectionRegistry()
+    collection_registry.residency = None
+    return collection_registry
+
+@pytest.fixture(autouse=True)
+def no_index_wait(monkeypatch):
+    monkeypatch.setattr(index_policy.utility, 'wait_for_index_building_complete', lambda name: None)
+
+def wait_for_rebuild(manager, name, timeout=5):
+    deadline = time.monotonic() + timeout
+    while name in manager._rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert name not in manager._rebuilding
+
+@pytest.mark.parametrize("rows, expected", [
+    (0, "FLAT"),
+    (999, "FLAT"),
+    (1000, "IVF_FLAT"),
+    (99999, "IVF_FLAT"),
+    (100000, "HNSW"),
+    (5000000, "HNSW")
+])
+def test_index_type_follows_row_count(rows, expected):
+    assert IndexPolicy(flat_max_rows=1000, hnsw_min_rows=100000).index_type(rows) == expected
+
+def test_ivf_lists_scale_with_sqrt_of_rows_within_bounds():
+    policy = IndexPolicy(flat_max_rows=10, hnsw_min_rows=10 ** 12)
+    assert policy.index_params(100)["params"]["nlist"] == 64
+    assert policy.index_params(40000)["params"]["nlist"] == 800
+    assert policy.index_params(10 ** 11)["params"]["nlist"] == 65536
+
+def test_hnsw_uses_more_links_for_very_large_collections():
+    policy = IndexPolicy(flat_max_rows=10, hnsw_min_rows=100)
+    assert policy.index_params(1000)["params"]["M"] == 16
+    assert policy.index_params(3000000)["params"]["M"] == 32
+
+def test_search_params_match_the_index():
+    policy = IndexPolicy()
+    assert policy.search_params({"index_type": "FLAT", "params": {}}, 5)["params"] == {}
+    assert policy.search_params({"index_type": "IVF_FLAT", "params": {"nlist": 1024}}, 5)["params"] == {"nprobe": 64}
+    assert policy.search_params({"index_type": "IVF_FLAT", "params": {"nlist": 64}}, 5)["params"] == {"nprobe": 8}
+    assert policy.search_params({"index_type": "HNSW", "params": {}}, 5)["params"] == {"ef": 64}
+    assert policy.search_params({"index_type": "HNSW", "params": {}}, 50)["params"] == {"ef": 200}
+
+def test_first_count_includes_buffered_rows_without_sealing(registry, buffer):
+    collection = FakeCollection(sealed=100)
+    collection.growing = 20
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=10 ** 6, hnsw_min_rows=10 ** 7))
+    buffer.add(collection, [[f"id{i}" for i in range(30)], [None] * 30])
+
+    manager.note_insert(collection, 30)
+    assert manager._rows["documents_test"] == 130
+    assert collection.growing == 20
+    assert buffer.pending_rows("documents_test") == 30
+
+    manager.note_insert(collection, 5)
+    assert manager._rows["documents_test"] == 135
+
+def test_crossing_a_threshold_rebuilds_the_index(registry, buffer):
+    collection = FakeCollection()
+    registry.register("documents_test", collection)
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=100, hnsw_min_rows=10 ** 6))
+    manager.create_index(collection)
+
+    manager.note_insert(collection, 50)
+    assert manager.current_index(collection)["index_type"] == "FLAT"
+
+    manager.note_insert(collection, 60)
+    wait_for_rebuild(manager, "documents_test")
+    assert collection.events[-3:] == ['release', 'drop_index', 'create_index']
+    assert manager.current_index(collection)["index_type"] == "IVF_FLAT"
+    assert collection.index_params["params"]["nlist"] == 64
+
+def test_rebuild_waits_for_searches_holding_the_collection(registry, buffer):
+    collection = FakeCollection()
+    registry.register("documents_test", collection)
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=100, hnsw_min_rows=10 ** 6))
+    manager.create_index(collection)
+
+    searching = threading.Event()
+    finish_search = threading.Event()
+    seen = []
+
+    def search():
+        with registry.using("documents_test") as loaded:
+            searching.set()
+            finish_search.wait(5)
+            seen.append((loaded.loaded, list(loaded.events)))
+
+    thread = threading.Thread(target=search)
+    thread.start()
+    searching.wait(5)
+    manager.note_insert(collection, 200)
+    time.sleep(0.1)
+    finish_search.set()
+    thread.join()
+    wait_for_rebuild(manager, "documents_test")
+
+    # The index was neither released nor dropped under the running search
+    assert seen == [(True, ['create_index'])]
+    assert collection.events[1:] == ['release', 'drop_index', 'create_index']
+
+def test_release_skips_collections_in_use(registry):
+    collection = FakeCollection()
+    registry.register("documents_test", collection)
+    with registry.using("documents_test"):
+        assert registry.release("documents_test") is False
+        assert collection.loaded
+    assert registry.release("documents_test") is True
+    assert not collection.loaded
+
+def ivf_collection(registry, manager, nlist, sealed):
+    collection = FakeCollection(sealed=sealed)
+    registry.register("documents_test", collection)
+    manager._indexes["documents_test"] = {"index_type": "IVF_FLAT", "metric_type": "COSINE", "params": {"nlist": nlist}}
+    return collection
+
+def test_oversized_legacy_ivf_on_a_small_collection_is_rebuilt_as_flat(registry, buffer):
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=1000, hnsw_min_rows=10 ** 6))
+    collection = ivf_collection(registry, manager, 1024, sealed=300)
+
+    manager.note_insert(collection, 10)
+    wait_for_rebuild(manager, "documents_test")
+    assert manager.current_index(collection)["index_type"] == "FLAT"
+
+def test_ivf_close_to_the_right_size_is_kept_below_the_flat_threshold(registry, buffer):
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=1000, hnsw_min_rows=10 ** 6))
+    collection = ivf_collection(registry, manager, 100, sealed=900)
+
+    manager.note_insert(collection, 10)
+    assert manager.current_index(collection)["params"] == {"nlist": 100}
+    assert collection.events == []
+
+def test_ivf_lists_are_rederived_once_the_collection_has_grown_well_past_them(registry, buffer):
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=100, hnsw_min_rows=10 ** 8))
+    collection = ivf_collection(registry, manager, 400, sealed=10000)
+
+    manager.note_insert(collection, 10)
+    manager.note_insert(collection, 20000)
+    assert collection.events == []
+
+    manager.note_insert(collection, 30000)
+    wait_for_rebuild(manager, "documents_test")
+    assert manager.current_index(collection)["params"] == {"nlist": 979}
+
+def test_hnsw_is_never_downgraded(registry, buffer):
+    manager = IndexManager(registry, buffer, IndexPolicy(flat_max_rows=1000, hnsw_min_rows=10 ** 6))
+    collection = FakeCollection(sealed=10)
+    registry.register("documents_test", collection)
+    manager._indexes["documents_test"] = {"index_type": "HNSW", "metric_type": "COSINE", "params": {"M": 16, "efConstruction": 200}}
+
+    manager.note_insert(collection, 10)
+    assert collection.events == []
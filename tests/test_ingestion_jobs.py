@@ -0,0 +1,145 @@
+import time
+import threading
+import pytest
+from utils.ingestion_jobs import IngestionJob, IngestionJobManager, JobCancelled, JobQueueFull
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        job.wait_for_change(job.version, 0.05)
+    assert job.finished
+    job.future.result(timeout)
+
+@pytest.fixture
+def manager():
+    return IngestionJobManager(max_workers=1, max_jobs=3, retention=3600)
+
+def test_snapshot_reports_throughput_and_eta():
+    job = IngestionJob(1, "sess", "document", "report.pdf")
+    job._start()
+    job.started_at = time.time() - 10
+    job.progress(unit='pages', done=25, total=100, chunks_done=50)
+
+    snapshot = job.snapshot()
+    assert snapshot['status'] == 'running'
+    assert snapshot['unit'] == 'pages'
+    assert snapshot['progress'] == 0.25
+    assert snapshot['chunks_per_second'] == pytest.approx(5, abs=0.1)
+    assert snapshot['eta_seconds'] == pytest.approx(30, abs=0.5)
+
+def test_no_eta_before_progress_or_after_finishing():
+    job = IngestionJob(1, "sess", "document", "report.pdf")
+    assert job.snapshot()['eta_seconds'] is None
+    job._start()
+    job.progress(total=10)
+    assert job.snapshot()['eta_seconds'] is None
+
+    job._finish('succeeded', result={'chunks': 3})
+    snapshot = job.snapshot()
+    assert snapshot['eta_seconds'] is None
+    assert snapshot['progress'] == 0.0
+    assert snapshot['result'] == {'chunks': 3}
+
+def test_finished_job_without_a_total_reports_full_progress():
+    job = IngestionJob(1, "sess", "github", "repo")
+    job._start()
+    job._finish('succeeded')
+    assert job.snapshot()['progress'] == 1.0
+
+def test_cancelling_a_queued_job_finishes_it():
+    job = IngestionJob(1, "sess", "document", "report.pdf")
+    assert job.cancel()
+    assert job.status == 'cancelled'
+    assert not job._start()
+    with pytest.raises(JobCancelled):
+        job.progress(done=1)
+    assert not job.cancel()
+
+def test_wait_for_change_wakes_on_progress():
+    job = IngestionJob(1, "sess", "document", "report.pdf")
+    version = job.version
+    threading.Timer(0.05, lambda: job.progress(done=1)).start()
+    assert job.wait_for_change(version, timeout=5) != version
+
+def test_job_runs_and_cleans_up(manager):
+    cleaned = []
+    job = manager.submit(1, "sess", "document", "a.txt", lambda job: {'chunks': 2}, cleanup=lambda: cleaned.append(1))
+    wait_until_finished(job)
+    assert job.status == 'succeeded'
+    assert job.result == {'chunks': 2}
+    assert cleaned == [1]
+
+def test_failing_job_records_its_error(manager):
+    def work(job):
+        raise ValueError("unreadable file")
+
+    job = manager.submit(1, "sess", "document", "a.txt", work)
+    wait_until_finished(job)
+    assert job.status == 'failed'
+    assert job.error == "unreadable file"
+
+def test_running_job_stops_at_its_next_progress_update(manager):
+    started = threading.Event()
+    updates = []
+    cleaned = []
+
+    def work(job):
+        started.set()
+        for done in range(1000):
+            job.progress(done=done, total=1000)
+            updates.append(done)
+            time.sleep(0.01)
+        return {}
+
+    job = manager.submit(1, "sess", "zip", "code.zip", work, cleanup=lambda: cleaned.append(1))
+    started.wait(5)
+    assert manager.cancel(job.id, 1) is job
+    wait_until_finished(job)
+    assert job.status == 'cancelled'
+    assert len(updates) < 1000
+    assert cleaned == [1]
+
+def test_cancelling_a_queued_job_skips_its_work(manager):
+    release = threading.Event()
+    ran = []
+    cleaned = []
+    blocker = manager.submit(1, "sess", "document", "first.pdf", lambda job: release.wait(5))
+    queued = manager.submit(1, "sess", "document", "second.pdf", lambda job: ran.append(1),
+                            cleanup=lambda: cleaned.append(1))
+
+    manager.cancel(queued.id, 1)
+    assert queued.status == 'cancelled'
+    assert cleaned == [1]
+    release.set()
+    wait_until_finished(blocker)
+    assert ran == []
+
+def test_queue_limit(manager):
+    release = threading.Event()
+    jobs = [manager.submit(1, "sess", "document", f"{i}.pdf", lambda job: release.wait(5)) for i in range(3)]
+    with pytest.raises(JobQueueFull):
+        manager.submit(1, "sess", "document", "one-too-many.pdf", lambda job: {})
+    release.set()
+    for job in jobs:
+        wait_until_finished(job)
+    manager.submit(1, "sess", "document", "after.pdf", lambda job: {})
+
+def test_jobs_are_only_visible_to_their_user(manager):
+    job = manager.submit(1, "sess", "document", "a.txt", lambda job: {})
+    other = manager.submit(1, "other", "document", "b.txt", lambda job: {})
+    wait_until_finished(job)
+    wait_until_finished(other)
+
+    assert manager.get(job.id, 2) is None
+    assert manager.cancel(job.id, 2) is None
+    assert manager.get(job.id, 1) is job
+    assert manager.list_jobs(1, "sess") == [job]
+    assert manager.list_jobs(1) == [other, job]
+
+def test_finished_jobs_are_pruned_after_retention():
+    manager = IngestionJobManager(max_workers=1, max_jobs=3, retention=0)
+    job = manager.submit(1, "sess", "document", "a.txt", lambda job: {})
+    wait_until_finished(job)
+    time.sleep(0.01)
+    manager.submit(1, "sess", "document", "b.txt", lambda job: {})
+    assert manager.get(job.id, 1) is None
@@ -0,0 +1,188 @@
+import time
+import threading
+import pytest
+from utils.insert_buffer import InsertBuffer, InsertFailedError
+
+class FakeCollection:
+    """Collection whose upserts fail during an outage or when they contain a bad id"""
+
+    def __init__(self, name="documents_test", bad_ids=(), outage=0):
+        self.name = name
+        self.bad_ids = set(bad_ids)
+        self.outage = outage
+        self.rows = {}
+        self.upserts = 0
+        self.flushes = 0
+
+    def upsert(self, data):
+        self.upserts += 1
+        if self.outage:
+            self.outage -= 1
+            raise RuntimeError("milvus unavailable")
+        if self.bad_ids.intersection(data[0]):
+            raise ValueError("bad row")
+        self.rows.update(zip(data[0], data[1]))
+
+    def flush(self):
+        self.flushes += 1
+
+def columns(*ids):
+    return [list(ids), [f"text {row_id}" for row_id in ids]]
+
+@pytest.fixture
+def buffer():
+    # A long max_age keeps the background flusher out of the way
+    insert_buffer = InsertBuffer(max_rows=100, max_age=3600, max_attempts=3)
+    yield insert_buffer
+    insert_buffer.discard("documents_test")
+    insert_buffer.close()
+
+def test_rows_wait_until_flush(buffer):
+    collection = FakeCollection()
+    assert buffer.add(collection, columns("a", "b")) == 2
+    assert buffer.pending_rows("documents_test") == 2
+    assert collection.upserts == 0
+
+    buffer.flush("documents_test")
+    assert collection.rows == {"a": "text a", "b": "text b"}
+    assert buffer.pending_rows() == 0
+
+def test_ids_already_buffered_are_skipped(buffer):
+    collection = FakeCollection()
+    buffer.add(collection, columns("a", "b"))
+    assert buffer.add(collection, columns("b", "c")) == 1
+    assert buffer.pending_rows("documents_test") == 3
+
+def test_full_buffer_flushes_on_add(buffer):
+    collection = FakeCollection()
+    buffer.add(collection, columns(*range(100)))
+    assert len(collection.rows) == 100
+    assert buffer.pending_rows() == 0
+
+def test_failed_insert_is_requeued_with_backoff(buffer):
+    collection = FakeCollection(outage=1)
+    buffer.add(collection, columns("a", "b"))
+    with pytest.raises(RuntimeError):
+        buffer.flush("documents_test")
+
+    entry = buffer._pending["documents_test"]
+    assert entry['attempts'] == 1
+    assert entry['retry_at'] > time.monotonic()
+    assert buffer.pending_rows("documents_test") == 2
+
+    buffer.flush("documents_test")
+    assert set(collection.rows) == {"a", "b"}
+    buffer.raise_failures("documents_test")
+
+def test_requeued_rows_keep_their_place_ahead_of_new_rows(buffer):
+    collection = FakeCollection(outage=1)
+    buffer.add(collection, columns("a"))
+    with pytest.raises(RuntimeError):
+        buffer.flush("documents_test")
+    buffer.add(collection, columns("b"))
+    assert buffer._pending["documents_test"]['columns'][0] == ["a", "b"]
+
+def test_bad_rows_are_dropped_after_max_attempts(buffer):
+    collection = FakeCollection(bad_ids={"c"})
+    buffer.add(collection, columns("a", "b", "c", "d"))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            buffer.flush("documents_test")
+
+    # The last attempt isolates the bad row and inserts the rest
+    buffer.flush("documents_test")
+    assert set(collection.rows) == {"a", "b", "d"}
+    assert buffer.pending_rows() == 0
+    assert buffer.failed_rows("documents_test") == 1
+
+    with pytest.raises(InsertFailedError, match="1 rows could not be inserted into documents_test"):
+        buffer.raise_failures("documents_test")
+    # Failures are reported once
+    buffer.raise_failures("documents_test")
+    assert buffer.failed_rows("documents_test") == 0
+
+def test_sync_persists_and_reports_dropped_rows(buffer):
+    collection = FakeCollection(bad_ids={"b"})
+    buffer.max_attempts = 1
+    buffer.add(collection, columns("a", "b"))
+    with pytest.raises(InsertFailedError):
+        buffer.sync("documents_test")
+    assert collection.flushes == 1
+    assert set(collection.rows) == {"a"}
+
+class SlowCollection(FakeCollection):
+    """Collection whose upserts block until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.upserting = threading.Event()
+        self.release = threading.Event()
+
+    def upsert(self, data):
+        self.upserting.set()
+        self.release.wait(5)
+        super().upsert(data)
+
+def test_flush_waits_for_an_insert_in_flight_on_another_thread(buffer):
+    collection = SlowCollection()
+    buffer.add(collection, columns("a"))
+    background = threading.Thread(target=buffer.flush, args=("documents_test",))
+    background.start()
+    collection.upserting.wait(5)
+
+    flushed = threading.Event()
+    waiter = threading.Thread(target=lambda: (buffer.sync("documents_test"), flushed.set()))
+    waiter.start()
+    assert not flushed.wait(0.2)
+    assert collection.rows == {}
+
+    collection.release.set()
+    waiter.join(5)
+    background.join(5)
+    assert flushed.is_set()
+    assert collection.rows == {"a": "text a"}
+    # The in-flight rows were sealed by sync even though it found nothing pending itself
+    assert collection.flushes == 1
+
+def test_flush_retries_rows_an_in_flight_insert_failed_to_write(buffer):
+    collection = SlowCollection()
+    collection.outage = 1
+    buffer.add(collection, columns("a"))
+    background = threading.Thread(target=lambda: pytest.raises(RuntimeError, buffer.flush, "documents_test"))
+    background.start()
+    collection.upserting.wait(5)
+
+    waiter = threading.Thread(target=buffer.flush, args=("documents_test",))
+    waiter.start()
+    collection.release.set()
+    waiter.join(5)
+    background.join(5)
+    assert collection.rows == {"a": "text a"}
+    assert buffer.pending_rows() == 0
+
+def test_rows_of_other_collections_are_requeued_after_a_failure(buffer):
+    broken = FakeCollection(name="documents_broken", outage=1)
+    healthy = FakeCollection(name="documents_test")
+    buffer.add(broken, columns("a"))
+    buffer.add(healthy, columns("b"))
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    # The healthy collection's rows were taken after the broken one's and go back untried
+    assert healthy.rows == {}
+    assert buffer.pending_rows("documents_test") == 1
+    buffer.flush()
+    assert broken.rows == {"a": "text a"}
+    assert healthy.rows == {"b": "text b"}
+    buffer.discard("documents_broken")
+
+def test_discard_drops_pending_rows_and_failures(buffer):
+    collection = FakeCollection(bad_ids={"a"})
+    buffer.max_attempts = 1
+    buffer.add(collection, columns("a"))
+    buffer.flush("documents_test")
+    buffer.add(collection, columns("b"))
+
+    buffer.discard("documents_test")
+    assert buffer.pending_rows() == 0
+    assert buffer.failed_rows("documents_test") == 0
+    buffer.raise_failures()
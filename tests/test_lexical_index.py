@@ -0,0 +1,103 @@
+import pytest
+from utils.lexical_index import (
+    tokenize, BM25Index, LexicalIndexRegistry, reciprocal_rank_fusion, merge_query_results, hybrid_search
+)
+
+def row(doc_id, text):
+    return {'id': doc_id, 'text': text}
+
+def build_index(*texts):
+    index = BM25Index()
+    for i, text in enumerate(texts):
+        index.add(f"d{i}", text, row(f"d{i}", text))
+    return index
+
+def test_tokenize_keeps_identifiers_and_adds_their_parts():
+    assert tokenize("parseHTTPResponse(raw_bytes)") == [
+        "parsehttpresponse", "parse", "http", "response", "raw_bytes", "raw", "bytes"
+    ]
+    assert tokenize("Version 42") == ["version", "42"]
+    assert tokenize(None) == []
+
+def test_bm25_ranks_rarer_terms_higher():
+    index = build_index("vector index vector search", "vector database", "lexical search engine")
+    ranked = [metadata['id'] for _, metadata in index.search("lexical vector", top_k=3)]
+    assert ranked[0] == "d2"
+    assert set(ranked) == {"d0", "d1", "d2"}
+
+def test_bm25_prefers_shorter_documents_for_the_same_term_frequency():
+    index = build_index("milvus " + "filler " * 50, "milvus collection")
+    assert index.search("milvus", top_k=1)[0][1]['id'] == "d1"
+
+def test_re_adding_a_document_replaces_it():
+    index = build_index("alpha beta")
+    index.add("d0", "gamma", row("d0", "gamma"))
+    assert index.search("alpha") == []
+    assert index.search("gamma")[0][1]['text'] == "gamma"
+    assert len(index) == 1
+    assert index.total_length == 1
+
+def test_removed_documents_leave_no_postings():
+    index = build_index("alpha beta", "beta")
+    index.remove("d0")
+    assert "alpha" not in index.postings
+    assert [metadata['id'] for _, metadata in index.search("beta")] == ["d1"]
+    assert index.total_length == 1
+
+def test_empty_index_returns_nothing():
+    assert BM25Index().search("anything") == []
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{'id': "a", 'score': 0.9, 'text': "A"}, {'id': "b", 'score': 0.8}]
+    lexical = [{'id': "b", 'score': 12.0}, {'id': "c", 'score': 3.0}]
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=3, k=60)
+
+    assert [result['id'] for result in fused] == ["b", "a", "c"]
+    assert fused[0]['score'] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[1]['text'] == "A"
+
+def test_reciprocal_rank_fusion_truncates_to_top_k():
+    results = [{'id': str(i), 'score': 1.0} for i in range(10)]
+    assert len(reciprocal_rank_fusion([results], top_k=4)) == 4
+
+def test_merge_query_results_keeps_best_score_and_matching_queries():
+    merged = merge_query_results([
+        [{'id': "a", 'score': 0.5}, {'id': "b", 'score': 0.4}],
+        [{'id': "a", 'score': 0.7}]
+    ])
+    assert merged[0] == {'id': "a", 'score': 0.7, 'matched_queries': [0, 1]}
+    assert merged[1]['matched_queries'] == [0]
+
+def test_hybrid_search_fuses_both_searches_with_their_own_scores():
+    fused = hybrid_search(
+        lambda k: [{'id': "a", 'score': 0.9}, {'id': "b", 'score': 0.1}],
+        lambda k: [{'id': "b", 'score': 7.0}],
+        top_k=2
+    )
+    assert fused[0]['id'] == "b"
+    assert fused[0]['vector_score'] == 0.1
+    assert fused[0]['lexical_score'] == 7.0
+
+def test_registry_builds_once_and_tracks_inserts():
+    registry = LexicalIndexRegistry()
+    builds = []
+
+    def loader():
+        builds.append(1)
+        return [row("a", "stored chunk")]
+
+    index = registry.get("documents_test", loader)
+    assert registry.get("documents_test", loader) is index
+    assert len(builds) == 1
+
+    registry.add_rows("documents_test", [row("b", "new chunk")])
+    registry.remove_ids("documents_test", ["a"])
+    assert [metadata['id'] for _, metadata in index.search("chunk")] == ["b"]
+
+def test_registry_evicts_every_session_index_of_a_collection():
+    registry = LexicalIndexRegistry()
+    for key in ("documents_shared/s1", "documents_shared/s2", "documents_shared2/s1", "code_shared/s1"):
+        registry.get(key, list)
+
+    registry.evict("documents_shared")
+    assert sorted(registry._indexes) == ["code_shared/s1", "documents_shared2/s1"]
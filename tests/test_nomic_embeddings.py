@@ -0,0 +1,16 @@
+import threading
+from config.settings import Config
+from utils.nomic_embeddings import NomicEmbeddings
+
+def test_each_thread_gets_its_own_session(monkeypatch):
+    monkeypatch.setattr(Config, 'NOMIC_API_KEY', 'test-key')
+    embeddings = NomicEmbeddings()
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(embeddings.session)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert embeddings.session is embeddings.session
+    assert len({id(session) for session in sessions + [embeddings.session]}) == 4
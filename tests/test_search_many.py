@@ -0,0 +1,100 @@
+import pytest
+from utils import numpy_vector_store
+from utils.blob_store import BlobStore
+from utils.numpy_vector_store import NumpyVectorStore, NumpySessionVectorStore
+
+# Each topic word points the embedding along its own axis
+TOPICS = ["milvus", "docx", "bm25", "upload"]
+
+def embed(text):
+    words = text.lower().split()
+    vector = [float(words.count(topic)) for topic in TOPICS]
+    return vector if any(vector) else None
+
+class FakeProcessor:
+    def get_embedding(self, text):
+        return embed(text)
+
+    def get_embeddings(self, texts):
+        return [embed(text) for text in texts]
+
+@pytest.fixture(autouse=True)
+def fakes(monkeypatch, tmp_path):
+    monkeypatch.setattr(numpy_vector_store, 'get_shared_document_processor', FakeProcessor)
+    monkeypatch.setattr(numpy_vector_store, 'get_blob_store', lambda: BlobStore(str(tmp_path / "blobs.sqlite3")))
+
+CHUNKS = [
+    "milvus collection loading",
+    "milvus milvus index",
+    "docx tables and paragraphs",
+    "bm25 and milvus hybrid",
+    "upload deduplication"
+]
+
+# The two chunks whose embeddings point purely along the milvus axis
+MILVUS_ONLY = {"milvus collection loading", "milvus milvus index"}
+
+def documents():
+    return [{'text': text, 'embedding': embed(text)} for text in CHUNKS]
+
+@pytest.fixture
+def store(tmp_path):
+    vector_store = NumpyVectorStore(root=str(tmp_path / "vectors"), dimension=len(TOPICS))
+    assert vector_store.add_documents("s1", documents(), "notes.md")
+    return vector_store
+
+@pytest.fixture
+def session_store(tmp_path):
+    vector_store = NumpySessionVectorStore(root=str(tmp_path / "vectors"), dimension=len(TOPICS))
+    assert vector_store.add_documents("s1", documents(), "notes.md")
+    return vector_store
+
+def texts(results):
+    return [result['text'] for result in results]
+
+def test_results_per_query_match_single_searches(store):
+    queries = ["milvus", "docx", "upload"]
+    per_query = store.search_many("s1", queries, top_k=2)
+    assert len(per_query) == 3
+    for query, results in zip(queries, per_query):
+        assert texts(results) == texts(store.search_documents("s1", query, top_k=2, search_mode="vector"))
+    assert set(texts(per_query[0])) == MILVUS_ONLY
+    assert texts(per_query[1])[0] == "docx tables and paragraphs"
+
+def test_queries_without_an_embedding_get_no_results(store):
+    assert store.search_many("s1", ["milvus", "unrelated words"], top_k=2)[1] == []
+    assert store.search_many("s1", [], top_k=2) == []
+
+def test_merge_deduplicates_and_records_matching_queries(store):
+    merged = store.search_many("s1", ["milvus", "bm25 milvus"], top_k=10, merge=True)
+    ids = [result['id'] for result in merged]
+    assert len(ids) == len(set(ids))
+
+    hybrid = next(result for result in merged if result['text'] == "bm25 and milvus hybrid")
+    assert hybrid['matched_queries'] == [0, 1]
+    # A chunk found by several queries keeps its best score
+    single = store.search_many("s1", ["milvus", "bm25 milvus"], top_k=10)
+    assert hybrid['score'] == max(
+        result['score'] for results in single for result in results if result['text'] == "bm25 and milvus hybrid"
+    )
+    assert [result['score'] for result in merged] == sorted((result['score'] for result in merged), reverse=True)
+
+def test_merge_truncates_to_top_k(store):
+    assert len(store.search_many("s1", ["milvus", "docx", "upload"], top_k=2, merge=True)) == 2
+
+def test_missing_collection_returns_empty_lists(store):
+    assert store.search_many("other", ["milvus", "docx"], top_k=2) == [[], []]
+
+def test_session_store_searches_its_own_collection(session_store):
+    per_query = session_store.search_many("s1", ["milvus", "docx"], 2)
+    assert set(texts(per_query[0])) == MILVUS_ONLY
+    assert texts(per_query[1])[0] == "docx tables and paragraphs"
+    assert session_store.search_many("s1", ["milvus", "docx"], 1, merge=True)[0]['text'] in MILVUS_ONLY
+
+def test_session_store_reads_and_deletes_its_own_chunks(session_store):
+    found = session_store.search_many("s1", ["upload"], 1)[0]
+    chunk_id = found[0]['id']
+    assert session_store.get_chunks("s1", [chunk_id])[chunk_id]['text'] == "upload deduplication"
+
+    assert session_store.delete_chunks("s1", [chunk_id])
+    assert session_store.get_chunks("s1", [chunk_id]) == {}
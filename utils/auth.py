@@ -5,8 +5,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from .database import DatabaseManager
 
 class AuthManager:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
     
     def create_user(self, username, password, email=None):
         """Create a new user account"""
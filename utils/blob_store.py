@@ -0,0 +1,164 @@
+import os
+import sys
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config.settings import Config
+
+class BlobStore:
+    """Content-addressed store for full source text, referenced from vector rows by id and offsets"""
+
+    def __init__(self, db_path=None, memory_budget_mb=None):
+        self.db_path = db_path or Config.BLOB_STORE_PATH
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else Config.BLOB_STORE_MEMORY_MB
+        self.memory_budget = budget_mb * 1024 * 1024
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                blob_id TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_id(text):
+        """Blob id for a text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def put_many(self, texts):
+        """Store texts (once per distinct content) and return their blob ids"""
+        blob_ids = [self.make_id(text) for text in texts]
+        rows = {}
+        for blob_id, text in zip(blob_ids, texts):
+            if blob_id not in rows:
+                rows[blob_id] = (blob_id, zlib.compress(text.encode('utf-8')), len(text))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs (blob_id, content, size) VALUES (?, ?, ?)",
+                list(rows.values())
+            )
+            self._conn.commit()
+        return blob_ids
+
+    def put(self, text):
+        """Store one text and return its blob id"""
+        return self.put_many([text])[0]
+
+    def get_many(self, blob_ids):
+        """Full texts for blob ids as a dict; unknown ids are left out"""
+        found = {}
+        with self._lock:
+            missing = []
+            for blob_id in set(blob_ids):
+                if blob_id in self._memory:
+                    self._memory.move_to_end(blob_id)
+                    found[blob_id] = self._memory[blob_id]
+                else:
+                    missing.append(blob_id)
+
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT blob_id, content FROM blobs WHERE blob_id IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for blob_id, content in rows:
+                    text = zlib.decompress(content).decode('utf-8')
+                    found[blob_id] = text
+                    self._remember(blob_id, text)
+
+        return found
+
+    def get(self, blob_id, start=None, end=None):
+        """Text of a blob, or of the [start:end) span of it"""
+        text = self.get_many([blob_id]).get(blob_id)
+        if text is None:
+            return None
+        return text[start:end]
+
+    def _remember(self, blob_id, text):
+        # Source files vary from a few lines to megabytes, so the budget is in bytes rather than entries
+        size = sys.getsizeof(text)
+        if size > self.memory_budget or blob_id in self._memory:
+            return
+        self._memory[blob_id] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sys.getsizeof(evicted)
+
+def chunk_original_text(chunk):
+    """The original text a chunk was cut from, for stores that keep it inline"""
+    if 'original_text' in chunk:
+        return chunk['original_text']
+    if 'source_text' in chunk:
+        return chunk['source_text'][chunk.get('source_start', 0):chunk.get('source_end')]
+    return chunk['text']
+
+def store_chunk_sources(blob_store, chunks):
+    """Store each chunk's source text and return (blob_id, start, end) references"""
+    texts = []
+    spans = []
+    for chunk in chunks:
+        if chunk.get('blob_id'):
+            # Copied from another session; the source is already stored
+            texts.append(None)
+            spans.append((chunk['blob_start'], chunk['blob_end']))
+            continue
+        if 'source_text' in chunk:
+            text = chunk['source_text']
+            spans.append((chunk.get('source_start', 0), chunk.get('source_end', len(text))))
+        else:
+            text = chunk.get('original_text') or chunk['text']
+            spans.append((0, len(text)))
+        texts.append(text)
+
+    # Chunks of one file share the same source string; hash it once
+    distinct = {}
+    for text in texts:
+        if text is not None:
+            distinct.setdefault(id(text), text)
+    blob_ids = dict(zip(distinct, blob_store.put_many(list(distinct.values())))) if distinct else {}
+
+    return [
+        (blob_ids[id(text)] if text is not None else chunk['blob_id'], start, end)
+        for chunk, text, (start, end) in zip(chunks, texts, spans)
+    ]
+
+def attach_original_text(blob_store, results):
+    """Fill 'original_text' on search results from their blob references"""
+    pending = [result for result in results if result.get('original_text') is None and result.get('blob_id')]
+    if not pending:
+        return results
+
+    texts = blob_store.get_many([result['blob_id'] for result in pending])
+    for result in pending:
+        text = texts.get(result['blob_id'])
+        if text is not None:
+            result['original_text'] = text[result.get('blob_start', 0):result.get('blob_end')]
+    return results
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_blob_store():
+    """Get the process-wide blob store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore()
+            print(f"✅ Blob store ready at {_store.db_path}")
+        return _store
@@ -0,0 +1,92 @@
+import re
+from config.settings import Config
+
+# Approximates the embedding model's WordPiece tokens: punctuation marks count as one token,
+# words as one token per 8 characters (long and rare words split into several pieces)
+_TOKEN = re.compile(r"\w{1,8}|[^\w\s]")
+_SENTENCE_END = re.compile(r"[.!?]+['\")\]]*(?=\s)")
+_LINE = re.compile(r"[^\n]+")
+
+def token_spans(text):
+    """(start, end) of each estimated model token in text"""
+    return [match.span() for match in _TOKEN.finditer(text)]
+
+def count_tokens(text):
+    """Estimated number of model tokens in text"""
+    return sum(1 for _ in _TOKEN.finditer(text))
+
+def sentence_spans(text):
+    """(start, end) of each sentence, breaking after . ! or ? followed by whitespace"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+def line_spans(text):
+    """(start, end) of each non-empty line"""
+    return [match.span() for match in _LINE.finditer(text)]
+
+def chunk_spans(text, unit_spans, max_tokens, overlap_tokens=0):
+    """Pack units (sentences, lines) into chunks of at most max_tokens; returns (start, end) offsets into text"""
+    tokens = token_spans(text)
+
+    # Map each unit onto the token range it covers; units over the limit are hard-split by tokens
+    pieces = []
+    t = 0
+    for start, end in unit_spans:
+        while t < len(tokens) and tokens[t][0] < start:
+            t += 1
+        first = t
+        while t < len(tokens) and tokens[t][1] <= end:
+            t += 1
+        for piece_start in range(first, t, max_tokens):
+            pieces.append((piece_start, min(piece_start + max_tokens, t)))
+
+    chunks = []
+    first = 0
+    while first < len(pieces):
+        last = first
+        while last + 1 < len(pieces) and pieces[last + 1][1] - pieces[first][0] <= max_tokens:
+            last += 1
+        chunks.append((tokens[pieces[first][0]][0], tokens[pieces[last][1] - 1][1]))
+        if last + 1 == len(pieces):
+            break
+
+        # Carry whole trailing units into the next chunk, as long as they fit the overlap
+        # and still leave room for the unit that did not fit
+        next_first = last + 1
+        while (next_first - 1 > first
+               and pieces[last][1] - pieces[next_first - 1][0] <= overlap_tokens
+               and pieces[last + 1][1] - pieces[next_first - 1][0] <= max_tokens):
+            next_first -= 1
+        first = next_first
+
+    return chunks
+
+def chunk_text_spans(text, max_tokens=None, overlap_tokens=None):
+    """Sentence-aligned chunk offsets for prose"""
+    return chunk_spans(
+        text,
+        sentence_spans(text),
+        max_tokens or Config.CHUNK_MAX_TOKENS,
+        Config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    )
+
+def chunk_code_spans(text, max_tokens=None, overlap_tokens=None):
+    """Line-aligned chunk offsets for source code"""
+    spans = chunk_spans(
+        text,
+        line_spans(text),
+        max_tokens or Config.CODE_CHUNK_MAX_TOKENS,
+        Config.CODE_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    )
+    # Keep the first line's indentation (but not the head of a hard-split line)
+    chunks = []
+    for start, end in spans:
+        line_start = text.rfind('\n', 0, start) + 1
+        chunks.append((line_start if text[line_start:start].isspace() else start, end))
+    return chunks
@@ -0,0 +1,123 @@
+"""Move per-session Milvus collections into the shared partitioned layout.
+
+Usage:
+    python -m utils.collection_migration [--dry-run] [--drop-source] [--batch-size N]
+"""
+import re
+import sys
+import argparse
+from dotenv import load_dotenv
+load_dotenv()
+
+from pymilvus import Collection, utility
+from config.settings import Config
+from utils.enhanced_vector_store import EnhancedVectorStore
+from utils.vector_store import VectorStore
+from utils.database import DatabaseManager
+from utils.blob_store import get_blob_store, store_chunk_sources
+
+PER_SESSION_COLLECTION = re.compile(r'^(documents|code|sess)_([a-zA-Z0-9_]+)$')
+
+def find_per_session_collections():
+    """List (collection_name, content_type, session_id) for every per-session collection"""
+    found = []
+    for name in utility.list_collections():
+        match = PER_SESSION_COLLECTION.match(name)
+        if not match or match.group(2) == Config.SHARED_COLLECTION_SUFFIX:
+            continue
+        found.append((name, match.group(1), match.group(2)))
+    return sorted(found)
+
+def migrate_collection(source_name, target, session_id, user_id, insert_buffer, batch_size=1000):
+    """Copy every row of a per-session collection into a shared collection"""
+    source = Collection(source_name)
+    source.load()
+
+    target_fields = [field.name for field in target.schema.fields]
+    source_fields = [field.name for field in source.schema.fields]
+    defaults = {'file_type': '', 'filename': '', 'file_path': '', 'chunk_index': 0, 'original_text': '',
+                'blob_id': '', 'blob_start': 0, 'blob_end': 0}
+    tenant = {'session_id': session_id, 'user_id': str(user_id or '')}
+
+    copied = 0
+    iterator = source.query_iterator(batch_size=batch_size, expr="", output_fields=source_fields)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+
+            if 'blob_id' in target_fields and 'blob_id' not in source_fields:
+                # Move inline original text into the blob store
+                references = store_chunk_sources(get_blob_store(), rows)
+                for row, (blob_id, start, end) in zip(rows, references):
+                    row.update({'blob_id': blob_id, 'blob_start': start, 'blob_end': end})
+
+            columns = []
+            for field in target_fields:
+                if field in tenant:
+                    columns.append([tenant[field]] * len(rows))
+                else:
+                    columns.append([row.get(field, defaults.get(field, '')) for row in rows])
+
+            insert_buffer.add(target, columns)
+            copied += len(rows)
+    finally:
+        iterator.close()
+
+    return copied
+
+def migrate_collections(dry_run=False, drop_source=False, batch_size=1000):
+    """Migrate all per-session collections; returns a summary per source collection"""
+    document_store = EnhancedVectorStore(storage_mode='partitioned')
+    session_store = VectorStore(storage_mode='partitioned')
+    db_manager = DatabaseManager()
+
+    summary = []
+    for source_name, content_type, session_id in find_per_session_collections():
+        user_id = db_manager.get_session_user_id(session_id)
+
+        if dry_run:
+            rows = Collection(source_name).num_entities
+            print(f"🔎 Would migrate {source_name} ({rows} rows) -> {content_type}_{Config.SHARED_COLLECTION_SUFFIX}")
+            summary.append({'collection': source_name, 'rows': rows, 'migrated': False})
+            continue
+
+        try:
+            if content_type == 'sess':
+                target = session_store.create_collection(session_id)
+            else:
+                target = document_store.create_collection(session_id, content_type)
+
+            copied = migrate_collection(
+                source_name, target, session_id, user_id, document_store.insert_buffer, batch_size
+            )
+            document_store.insert_buffer.sync(target.name)
+            document_store.index_manager.note_insert(target, copied)
+
+            if drop_source:
+                utility.drop_collection(source_name)
+                document_store.registry.invalidate(source_name)
+
+            print(f"✅ Migrated {copied} rows from {source_name} to {target.name}")
+            summary.append({'collection': source_name, 'rows': copied, 'migrated': True})
+        except Exception as e:
+            print(f"❌ Error migrating {source_name}: {str(e)}")
+            summary.append({'collection': source_name, 'rows': 0, 'migrated': False, 'error': str(e)})
+
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move per-session collections into shared partitioned collections")
+    parser.add_argument('--dry-run', action='store_true', help="List what would be migrated without copying")
+    parser.add_argument('--drop-source', action='store_true', help="Drop each per-session collection after copying it")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    summary = migrate_collections(args.dry_run, args.drop_source, args.batch_size)
+    failed = [item for item in summary if item.get('error')]
+    print(f"Done: {len(summary) - len(failed)} collections processed, {len(failed)} failed")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
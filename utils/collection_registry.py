@@ -0,0 +1,189 @@
+import threading
+from contextlib import contextmanager
+from pymilvus import Collection, utility
+from utils.lexical_index import get_lexical_index_registry
+
+class SharedLock:
+    """Many holders of the shared side or one of the exclusive side; a waiting exclusive holder blocks new shared ones"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    def acquire_shared(self):
+        with self._condition:
+            while self._exclusive or self._waiting:
+                self._condition.wait()
+            self._shared += 1
+
+    def release_shared(self):
+        with self._condition:
+            self._shared -= 1
+            if not self._shared:
+                self._condition.notify_all()
+
+    def acquire_exclusive(self, blocking=True):
+        with self._condition:
+            if not blocking and (self._exclusive or self._shared):
+                return False
+            self._waiting += 1
+            try:
+                while self._exclusive or self._shared:
+                    self._condition.wait()
+            finally:
+                self._waiting -= 1
+            self._exclusive = True
+            return True
+
+    def release_exclusive(self):
+        with self._condition:
+            self._exclusive = False
+            self._condition.notify_all()
+
+class CollectionRegistry:
+    """Process-wide cache of Milvus collection handles and their load state"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.RLock()
+        self.residency = None
+
+    def get(self, collection_name):
+        """Get a cached collection handle, or None if the collection doesn't exist"""
+        with self._lock:
+            entry = self._entries.get(collection_name)
+            if entry:
+                return entry['collection']
+
+        if not utility.has_collection(collection_name):
+            return None
+
+        return self.register(collection_name, Collection(collection_name))
+
+    def register(self, collection_name, collection, loaded=False):
+        """Remember a collection handle, keeping any handle registered concurrently"""
+        with self._lock:
+            entry = self._entries.setdefault(collection_name, {
+                'collection': collection,
+                'loaded': loaded,
+                'load_lock': threading.Lock(),
+                # Shared while a handle is in use, exclusive while the collection is released or re-indexed
+                'usage': SharedLock()
+            })
+            return entry['collection']
+
+    def get_loaded(self, collection_name):
+        """Get a collection handle, loading it into memory on first use or after a release or rebuild"""
+        collection = self.get(collection_name)
+        if collection is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(collection_name)
+        if entry is None:
+            return collection
+
+        # Load outside the registry lock so other collections aren't blocked
+        loaded_now = False
+        with entry['load_lock']:
+            if not entry['loaded']:
+                collection.load()
+                entry['loaded'] = True
+                loaded_now = True
+
+        if self.residency:
+            if loaded_now:
+                self.residency.record_load(collection_name, collection)
+            else:
+                self.residency.record_access(collection_name)
+
+        return collection
+
+    @contextmanager
+    def using(self, collection_name):
+        """Loaded collection handle (None if it doesn't exist) that stays loaded and indexed until the block exits"""
+        if self.get(collection_name) is None:
+            yield None
+            return
+        with self._lock:
+            entry = self._entries.get(collection_name)
+        if entry is None:
+            yield self.get_loaded(collection_name)
+            return
+
+        entry['usage'].acquire_shared()
+        try:
+            yield self.get_loaded(collection_name)
+        finally:
+            entry['usage'].release_shared()
+
+    @contextmanager
+    def exclusive(self, collection_name):
+        """Wait for handles in use, then block use and loads of a collection while it is being changed;
+        it reloads on next use"""
+        self.get(collection_name)
+        with self._lock:
+            entry = self._entries.get(collection_name)
+        if entry is None:
+            yield
+            return
+
+        entry['usage'].acquire_exclusive()
+        try:
+            with entry['load_lock']:
+                try:
+                    yield
+                finally:
+                    entry['loaded'] = False
+                    if self.residency:
+                        self.residency.forget(collection_name)
+        finally:
+            entry['usage'].release_exclusive()
+
+    def release(self, collection_name):
+        """Release a loaded collection from Milvus memory unless a handle is in use; it reloads on next use"""
+        with self._lock:
+            entry = self._entries.get(collection_name)
+        if entry is None:
+            return False
+
+        # Never wait here: eviction runs inside other collections' loads
+        if not entry['usage'].acquire_exclusive(blocking=False):
+            return False
+        try:
+            with entry['load_lock']:
+                if not entry['loaded']:
+                    return False
+                try:
+                    entry['collection'].release()
+                except Exception as e:
+                    print(f"❌ Error releasing collection {collection_name}: {str(e)}")
+                    return False
+                entry['loaded'] = False
+            # BM25 indexes of a released collection would otherwise stay in memory for good
+            get_lexical_index_registry().evict(collection_name)
+            return True
+        finally:
+            entry['usage'].release_exclusive()
+
+    def invalidate(self, collection_name):
+        """Forget a collection handle (after a drop or a failed call)"""
+        with self._lock:
+            self._entries.pop(collection_name, None)
+        get_lexical_index_registry().evict(collection_name)
+        if self.residency:
+            self.residency.forget(collection_name)
+
+    def is_loaded(self, collection_name):
+        """Check whether this process has loaded the collection"""
+        with self._lock:
+            entry = self._entries.get(collection_name)
+            return bool(entry and entry['loaded'])
+
+_registry = CollectionRegistry()
+
+def get_collection_registry():
+    """Get the process-wide collection registry"""
+    return _registry
@@ -0,0 +1,146 @@
+import time
+import threading
+from collections import OrderedDict
+from config.settings import Config
+from utils.collection_registry import get_collection_registry
+
+class ResidencyManager:
+    """Release idle or least recently used collections from Milvus query-node memory"""
+
+    def __init__(self, registry, idle_ttl=None, max_resident=None, memory_budget_mb=None, sweep_interval=None):
+        self.registry = registry
+        self.idle_ttl = idle_ttl if idle_ttl is not None else Config.RESIDENCY_IDLE_TTL
+        self.max_resident = max_resident if max_resident is not None else Config.RESIDENCY_MAX_COLLECTIONS
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else Config.RESIDENCY_MEMORY_BUDGET_MB
+        self.memory_budget = budget_mb * 1024 * 1024
+        self.sweep_interval = sweep_interval or Config.RESIDENCY_SWEEP_INTERVAL
+
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            'loads': 0,
+            'idle_releases': 0,
+            'lru_releases': 0
+        }
+
+        self._worker = threading.Thread(target=self._sweep_loop, name="collection-residency", daemon=True)
+        self._worker.start()
+
+    def record_load(self, collection_name, collection):
+        """Track a freshly loaded collection and release others if over budget"""
+        try:
+            row_count = collection.num_entities
+        except Exception:
+            row_count = 0
+
+        now = time.time()
+        with self._lock:
+            self._resident[collection_name] = {
+                'loaded_at': now,
+                'last_access': now,
+                'rows': row_count,
+                'estimated_bytes': row_count * (Config.EMBEDDING_DIMENSION * 4 + 512)
+            }
+            self._resident.move_to_end(collection_name)
+            self.counters['loads'] += 1
+
+        self._enforce_budget(keep=collection_name)
+
+    def record_access(self, collection_name):
+        """Mark a resident collection as recently used"""
+        with self._lock:
+            entry = self._resident.get(collection_name)
+            if entry:
+                entry['last_access'] = time.time()
+                self._resident.move_to_end(collection_name)
+
+    def forget(self, collection_name):
+        """Stop tracking a collection that was released or dropped elsewhere"""
+        with self._lock:
+            self._resident.pop(collection_name, None)
+
+    def sweep(self):
+        """Release collections idle longer than the TTL; returns the released names"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            idle = [name for name, entry in self._resident.items() if entry['last_access'] < cutoff]
+
+        released = [name for name in idle if self._release(name, 'idle')]
+        return released
+
+    def stats(self):
+        """Residency counters and the currently resident collections"""
+        now = time.time()
+        with self._lock:
+            resident = [
+                {
+                    'name': name,
+                    'rows': entry['rows'],
+                    'estimated_mb': round(entry['estimated_bytes'] / (1024 * 1024), 2),
+                    'idle_seconds': round(now - entry['last_access'], 1),
+                    'resident_seconds': round(now - entry['loaded_at'], 1)
+                }
+                for name, entry in reversed(self._resident.items())
+            ]
+            estimated_bytes = sum(entry['estimated_bytes'] for entry in self._resident.values())
+            return {
+                **self.counters,
+                'resident_count': len(resident),
+                'max_resident': self.max_resident,
+                'estimated_mb': round(estimated_bytes / (1024 * 1024), 2),
+                'memory_budget_mb': round(self.memory_budget / (1024 * 1024), 2),
+                'idle_ttl': self.idle_ttl,
+                'collections': resident
+            }
+
+    def _enforce_budget(self, keep=None):
+        """Release least recently used collections until count and memory fit the budget"""
+        skipped = set()
+        while True:
+            with self._lock:
+                total_bytes = sum(entry['estimated_bytes'] for entry in self._resident.values())
+                over_budget = len(self._resident) > self.max_resident or total_bytes > self.memory_budget
+                victim = next((name for name in self._resident if name != keep and name not in skipped), None)
+            if not over_budget or victim is None:
+                return
+            if not self._release(victim, 'lru'):
+                skipped.add(victim)
+
+    def _release(self, collection_name, reason):
+        with self._lock:
+            entry = self._resident.pop(collection_name, None)
+            if entry is None:
+                return False
+        if not self.registry.release(collection_name):
+            if self.registry.is_loaded(collection_name):
+                # In use by a search; keep tracking it so a later sweep can release it
+                with self._lock:
+                    self._resident.setdefault(collection_name, entry)
+                    self._resident.move_to_end(collection_name, last=False)
+            return False
+
+        with self._lock:
+            self.counters[f'{reason}_releases'] += 1
+        print(f"💤 Released {reason} collection {collection_name}")
+        return True
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Error sweeping idle collections: {str(e)}")
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_residency_manager():
+    """Get the process-wide residency manager, attached to the collection registry"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            registry = get_collection_registry()
+            _manager = ResidencyManager(registry)
+            registry.residency = _manager
+        return _manager
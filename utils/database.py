@@ -1,8 +1,14 @@
 
 import os
+import json
+import hashlib
 import pymysql
 from datetime import datetime
 
+def path_hash(file_path):
+    """Fixed-width key for a file path (paths are too long to be part of an InnoDB key)"""
+    return hashlib.sha256(file_path.encode('utf-8')).hexdigest()
+
 class DatabaseManager:
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
@@ -68,10 +74,58 @@ class DatabaseManager:
                     file_type VARCHAR(50) NOT NULL,
                     file_size INT NOT NULL,
                     upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+                    content_hash CHAR(64) NULL,
+                    collection VARCHAR(20) NOT NULL DEFAULT 'documents',
+                    chunk_ids MEDIUMTEXT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                    INDEX idx_content_hash (content_hash, collection)
+                )
+            """)
+            
+            # Documents tables created before upload deduplication lack the fingerprint columns
+            cursor.execute("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'documents'
+            """)
+            if 'content_hash' not in {row['COLUMN_NAME'] for row in cursor.fetchall()}:
+                cursor.execute("""
+                    ALTER TABLE documents
+                        ADD COLUMN content_hash CHAR(64) NULL,
+                        ADD COLUMN collection VARCHAR(20) NOT NULL DEFAULT 'documents',
+                        ADD COLUMN chunk_ids MEDIUMTEXT NULL,
+                        ADD INDEX idx_content_hash (content_hash, collection)
+                """)
+            
+            # Create code_manifest table (indexed files per uploaded archive, for incremental re-indexing)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS code_manifest (
+                    session_id VARCHAR(100) NOT NULL,
+                    archive VARCHAR(255) NOT NULL,
+                    path_hash CHAR(64) NOT NULL,
+                    file_path TEXT NOT NULL,
+                    content_hash CHAR(64) NOT NULL,
+                    chunk_ids MEDIUMTEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    PRIMARY KEY (session_id, archive, path_hash)
                 )
             """)
             
+            # Manifests created where the old (session_id, archive, file_path) key fit (not utf8mb4) are re-keyed
+            cursor.execute("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'code_manifest'
+            """)
+            if 'path_hash' not in {row['COLUMN_NAME'] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE code_manifest ADD COLUMN path_hash CHAR(64) NULL AFTER archive")
+                cursor.execute("UPDATE code_manifest SET path_hash = SHA2(CONVERT(file_path USING utf8mb4), 256)")
+                cursor.execute("""
+                    ALTER TABLE code_manifest
+                        DROP PRIMARY KEY,
+                        MODIFY path_hash CHAR(64) NOT NULL,
+                        MODIFY file_path TEXT NOT NULL,
+                        ADD PRIMARY KEY (session_id, archive, path_hash)
+                """)
+            
             connection.commit()
             print("Database tables initialized successfully")
             
@@ -174,16 +228,18 @@ class DatabaseManager:
             if connection:
                 connection.close()
     
-    def save_document(self, user_id, session_id, filename, file_type, file_size):
-        """Save document metadata to database"""
+    def save_document(self, user_id, session_id, filename, file_type, file_size,
+                      content_hash=None, collection='documents', chunk_ids=None):
+        """Save document metadata, and the file's fingerprint and stored chunk ids for upload deduplication"""
         try:
             connection = self.get_connection()
             cursor = connection.cursor()
             
             cursor.execute("""
-                INSERT INTO documents (user_id, session_id, filename, file_type, file_size)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (user_id, session_id, filename, file_type, file_size))
+                INSERT INTO documents (user_id, session_id, filename, file_type, file_size, content_hash, collection, chunk_ids)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, (user_id, session_id, filename, file_type, file_size, content_hash, collection,
+                  json.dumps(chunk_ids) if chunk_ids is not None else None))
             
             connection.commit()
             return cursor.lastrowid
@@ -194,3 +250,116 @@ class DatabaseManager:
         finally:
             if connection:
                 connection.close()
+    
+    def find_document_by_hash(self, content_hash, collection='documents', user_id=None):
+        """Most recent upload of a file with this fingerprint, in any session (of user_id's, if given):
+        {'session_id', 'filename', 'chunk_ids'}"""
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            user_filter = "AND user_id = %s" if user_id is not None else ""
+            params = (content_hash, collection) if user_id is None else (content_hash, collection, user_id)
+            cursor.execute(f"""
+                SELECT session_id, filename, chunk_ids
+                FROM documents
+                WHERE content_hash = %s AND collection = %s AND chunk_ids IS NOT NULL {user_filter}
+                ORDER BY id DESC
+                LIMIT 1
+            """, params)
+            
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                'session_id': row['session_id'],
+                'filename': row['filename'],
+                'chunk_ids': json.loads(row['chunk_ids'])
+            }
+            
+        except Exception as e:
+            print(f"Error finding document by hash: {str(e)}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+    
+    def get_session_user_id(self, session_id):
+        """Find the user that owns a chat session"""
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            cursor.execute("""
+                SELECT user_id FROM chat_history WHERE session_id = %s
+                UNION
+                SELECT user_id FROM documents WHERE session_id = %s
+                LIMIT 1
+            """, (session_id, session_id))
+            
+            row = cursor.fetchone()
+            return row['user_id'] if row else None
+            
+        except Exception as e:
+            print(f"Error getting session owner: {str(e)}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+    
+    def get_code_manifest(self, session_id, archive):
+        """Get {file_path: {'content_hash', 'chunk_ids'}} for an archive indexed in a session"""
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            cursor.execute("""
+                SELECT file_path, content_hash, chunk_ids
+                FROM code_manifest
+                WHERE session_id = %s AND archive = %s
+            """, (session_id, archive))
+            
+            return {
+                row['file_path']: {
+                    'content_hash': row['content_hash'],
+                    'chunk_ids': json.loads(row['chunk_ids'])
+                }
+                for row in cursor.fetchall()
+            }
+            
+        except Exception as e:
+            print(f"Error getting code manifest: {str(e)}")
+            return {}
+        finally:
+            if connection:
+                connection.close()
+    
+    def update_code_manifest(self, session_id, archive, entries, removed_paths):
+        """Upsert manifest entries ({file_path: {'content_hash', 'chunk_ids'}}) and drop removed files"""
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            if entries:
+                cursor.executemany("""
+                    REPLACE INTO code_manifest (session_id, archive, path_hash, file_path, content_hash, chunk_ids)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, [
+                    (session_id, archive, path_hash(file_path), file_path, entry['content_hash'], json.dumps(entry['chunk_ids']))
+                    for file_path, entry in entries.items()
+                ])
+            
+            if removed_paths:
+                cursor.executemany("""
+                    DELETE FROM code_manifest
+                    WHERE session_id = %s AND archive = %s AND path_hash = %s
+                """, [(session_id, archive, path_hash(file_path)) for file_path in removed_paths])
+            
+            connection.commit()
+            
+        except Exception as e:
+            print(f"Error updating code manifest: {str(e)}")
+            raise
+        finally:
+            if connection:
+                connection.close()
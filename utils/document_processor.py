@@ -1,49 +1,66 @@
 import os
+import hashlib
+import threading
+from functools import lru_cache
 import nltk
-from docx import Document
 import re
-import numpy as np
 from config.settings import Config
-from utils.nomic_embeddings import NomicEmbeddings
+from utils.nomic_embeddings import NomicEmbeddings, EmbeddingAPIError
+from utils.embedding_cache import get_embedding_cache
+from utils.embedding_executor import get_embedding_executor
+from utils.chunking import chunk_text_spans
+from utils.docx_stream import iter_docx_blocks
 
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
+from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
 
-class DocumentProcessor:
+_NON_LETTERS = re.compile(r'[^a-zA-Z\s]')
+
+# Once only letters and whitespace are left, word_tokenize reduces to a whitespace
+# split plus these Treebank contraction splits
+_TREEBANK_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na')
+}
+
+def is_content_error(error):
+    """Whether an embedding request failed because of the texts sent, so splitting the batch can help"""
+    # Transient failures (429, 5xx, timeouts) were already retried by the executor; splitting only multiplies them
+    return isinstance(error, EmbeddingAPIError) and not error.is_transient
+
+def chunk_id(source, chunk_index, text):
+    """Deterministic primary key for a chunk from its source, position and content"""
+    content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{source}\0{chunk_index}\0{content_hash}".encode('utf-8')).hexdigest()
+
+class TextProcessor:
+    """NLTK text extraction, preprocessing and chunking, without an embedding client (safe for worker processes)"""
     def __init__(self):
         self.stop_words = set(stopwords.words('english'))
         self.lemmatizer = WordNetLemmatizer()
-        
-        # Initialize Nomic embeddings
-        try:
-            self.embeddings = NomicEmbeddings()
-            print("✅ Document processor initialized with Nomic API embeddings")
-        except Exception as e:
-            print(f"❌ Failed to initialize Nomic embeddings: {e}")
-            raise
-
-    def normalize_embedding(self, embedding):
-        norm = np.linalg.norm(embedding)
-        return (embedding / norm).tolist() if norm else embedding
+        # Vocabulary is Zipfian, so a bounded memo of word -> lemma (or None) absorbs most lookups
+        self._index_word = lru_cache(maxsize=Config.LEMMA_CACHE_SIZE)(self._index_word_uncached)
 
     def extract_text_from_docx(self, file_path):
-        """Extract text from DOCX file"""
+        """Extract the paragraphs and table cells of a DOCX file (path, bytes or stream)"""
         try:
-            doc = Document(file_path)
-            text = []
-
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text.append(paragraph.text.strip())
-
-            return text
+            return list(iter_docx_blocks(file_path))
         except Exception as e:
             print(f"Error extracting text from DOCX: {str(e)}")
             return []
 
     def preprocess_text(self, text):
         """Preprocess text using NLTK"""
+        if Config.FAST_PREPROCESS:
+            return self._preprocess_fast(text)
+        return self._preprocess_nltk(text)
+
+    def _preprocess_nltk(self, text):
         try:
             text = text.lower()
             text = re.sub(r'[^a-zA-Z\s]', '', text)
@@ -59,59 +76,207 @@ class DocumentProcessor:
             print(f"Error preprocessing text: {str(e)}")
             return text
 
-    def chunk_text(self, text, max_chunk_size=500):
-        """Split text into chunks"""
+    def _preprocess_fast(self, text):
+        """Same output as _preprocess_nltk without Punkt/Treebank tokenisation or repeated lemma lookups"""
         try:
-            sentences = sent_tokenize(text)
-            chunks = []
-            current_chunk = ""
-
-            for sentence in sentences:
-                if len(current_chunk) + len(sentence) <= max_chunk_size:
-                    current_chunk += " " + sentence
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = sentence
-
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-
-            return chunks
+            processed_words = []
+            for word in _NON_LETTERS.sub('', text.lower()).split():
+                for part in _TREEBANK_SPLITS.get(word, (word,)):
+                    lemma = self._index_word(part)
+                    if lemma is not None:
+                        processed_words.append(lemma)
+
+            return ' '.join(processed_words)
         except Exception as e:
-            print(f"Error chunking text: {str(e)}")
-            return [text]
+            print(f"Error preprocessing text: {str(e)}")
+            return text
+
+    def _index_word_uncached(self, word):
+        if word in self.stop_words or len(word) <= 2:
+            return None
+        return self.lemmatizer.lemmatize(word)
+
+    def chunk_text(self, text, max_tokens=None, overlap_tokens=None):
+        """Split text into sentence-aligned chunks of at most max_tokens, overlapping by overlap_tokens"""
+        return [text[start:end] for start, end in chunk_text_spans(text, max_tokens, overlap_tokens)]
 
-    def process_document(self, file_path):
+    def iter_section_chunks(self, sections, file_ext=None):
+        """Chunk sections of paragraphs; each chunk references its own span in the section text"""
+        for paragraphs in sections:
+            source_text = "\n\n".join(paragraphs)
+            offset = 0
+            for paragraph in paragraphs:
+                start = offset
+                offset += len(paragraph) + 2
+                # Chunk the original paragraph so each chunk references exactly the text it came from
+                for chunk_start, chunk_end in chunk_text_spans(paragraph):
+                    chunk = self.preprocess_text(paragraph[chunk_start:chunk_end])
+                    if chunk.strip():
+                        chunk_data = {
+                            'text': chunk,
+                            'source_text': source_text,
+                            'source_start': start + chunk_start,
+                            'source_end': start + chunk_end
+                        }
+                        if file_ext:
+                            chunk_data['file_type'] = file_ext
+                        yield chunk_data
+
+class DocumentProcessor(TextProcessor):
+    def __init__(self):
+        super().__init__()
+        
+        self.embedding_cache = get_embedding_cache()
+        
+        # Initialize Nomic embeddings
+        try:
+            self.embeddings = NomicEmbeddings()
+            self.embedding_executor = get_embedding_executor(self.embeddings)
+            print("✅ Document processor initialized with Nomic API embeddings")
+        except Exception as e:
+            print(f"❌ Failed to initialize Nomic embeddings: {e}")
+            raise
+
+    def process_document(self, file_path, existing=None):
         """Process document and return chunks with embeddings"""
         try:
             paragraphs = self.extract_text_from_docx(file_path)
-            processed_chunks = []
+            # Chunks reference their paragraph's span in the full document text
+            processed_chunks = list(self.iter_section_chunks([paragraphs]))
 
-            for paragraph in paragraphs:
-                if paragraph.strip():
-                    processed_text = self.preprocess_text(paragraph)
-                    chunks = self.chunk_text(processed_text)
-
-                    for chunk in chunks:
-                        if chunk.strip():
-                            embedding = self.get_embedding(chunk)
-                            if embedding:
-                                processed_chunks.append({
-                                    'text': chunk,
-                                    'original_text': paragraph,
-                                    'embedding': embedding
-                                })
-
-            return processed_chunks
+            return self.embed_chunks(processed_chunks, existing)
         except Exception as e:
             print(f"Error processing document: {str(e)}")
             return []
 
+    def embed_chunks(self, chunks, existing=None):
+        """Attach embeddings to chunk dicts in batches, dropping chunks that could not be embedded"""
+        # existing(chunks) assigns chunk ids and returns those already stored, which skip embedding
+        stored_ids = existing(chunks) if existing and chunks else set()
+        new_chunks = []
+        for chunk in chunks:
+            if chunk.get('id') in stored_ids:
+                chunk['duplicate'] = True
+            else:
+                new_chunks.append(chunk)
+
+        if stored_ids:
+            print(f"♻️ Skipping {len(chunks) - len(new_chunks)} chunks that are already stored")
+
+        embeddings = self.get_embeddings([chunk['text'] for chunk in new_chunks])
+
+        embedded_chunks = []
+        for chunk, embedding in zip(new_chunks, embeddings):
+            if embedding:
+                chunk['embedding'] = embedding
+                embedded_chunks.append(chunk)
+
+        if len(embedded_chunks) < len(new_chunks):
+            print(f"⚠️ Dropped {len(new_chunks) - len(embedded_chunks)} chunks that could not be embedded")
+
+        return [chunk for chunk in chunks if chunk.get('duplicate') or 'embedding' in chunk]
+
     def get_embedding(self, text):
-        """Get embedding for text using Nomic API"""
+        """Get embedding for text using Nomic API; None if the API is unavailable"""
         try:
-            return self.embeddings.embed_query(text)
+            return self.get_embeddings([text])[0]
         except Exception as e:
             print(f"Error getting embedding: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def get_embeddings(self, texts):
+        """Get embeddings for many texts, serving cached ones and batching the rest.
+
+        A batch rejected for its content is split to isolate the bad texts (their embeddings are None);
+        an outage that outlasts the executor's retries is raised instead.
+        """
+        if self.embedding_cache:
+            embeddings = self.embedding_cache.get_many(texts, self.embeddings.model, Config.EMBEDDING_DIMENSION)
+        else:
+            embeddings = [None] * len(texts)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(texts[i], []).append(i)
+
+        if not missing:
+            return embeddings
+
+        missing_texts = list(missing)
+        batches = list(self._iter_embedding_batches(missing_texts))
+        results = self.embedding_executor.map([[missing_texts[i] for i in batch] for batch in batches])
+
+        fetched = [None] * len(missing_texts)
+        error = None
+        for batch, batch_embeddings in zip(batches, results):
+            if isinstance(batch_embeddings, Exception):
+                print(f"Error getting embeddings: {str(batch_embeddings)}")
+                if not is_content_error(batch_embeddings):
+                    error = error or batch_embeddings
+                    continue
+                batch_embeddings = self._split_and_embed([missing_texts[i] for i in batch])
+            for i, embedding in zip(batch, batch_embeddings):
+                fetched[i] = embedding
+
+        # Keep what was embedded, so a retry after an outage only pays for the rest
+        if self.embedding_cache:
+            self.embedding_cache.put_many(missing_texts, fetched, self.embeddings.model, Config.EMBEDDING_DIMENSION)
+        if error:
+            raise error
+
+        for text, embedding in zip(missing_texts, fetched):
+            for i in missing[text]:
+                embeddings[i] = embedding
+
+        return embeddings
+
+    def _iter_embedding_batches(self, texts):
+        """Group text indices into batches bounded by chunk count and total characters"""
+        batch = []
+        batch_chars = 0
+
+        for i, text in enumerate(texts):
+            if batch and (len(batch) >= Config.EMBEDDING_BATCH_SIZE or
+                          batch_chars + len(text) > Config.EMBEDDING_BATCH_MAX_CHARS):
+                yield batch
+                batch = []
+                batch_chars = 0
+
+            batch.append(i)
+            batch_chars += len(text)
+
+        if batch:
+            yield batch
+
+    def _embed_batch(self, texts):
+        """Embed one batch, splitting it in half and retrying if the API rejects its content"""
+        try:
+            return self.embedding_executor.embed(texts)
+        except EmbeddingAPIError as e:
+            if not is_content_error(e):
+                raise
+            print(f"Error getting embeddings: {str(e)}")
+            return self._split_and_embed(texts)
+
+    def _split_and_embed(self, texts):
+        """Retry a failed batch as two halves so one bad chunk doesn't lose the whole batch"""
+        if len(texts) == 1:
+            return [None]
+
+        mid = len(texts) // 2
+        return self._embed_batch(texts[:mid]) + self._embed_batch(texts[mid:])
+
+_shared_processor = None
+_shared_processor_lock = threading.Lock()
+
+def get_shared_document_processor():
+    """Get the process-wide document processor, used for ingestion and query embedding"""
+    global _shared_processor
+    with _shared_processor_lock:
+        if _shared_processor is None:
+            # Imported here: the enhanced processor builds on this module
+            from utils.enhanced_document_processor import EnhancedDocumentProcessor
+            _shared_processor = EnhancedDocumentProcessor()
+        return _shared_processor
@@ -0,0 +1,114 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from utils.upload_streams import open_source
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+# Run content and its text, as python-docx renders it
+_RUN_TEXT = {
+    _W + 'tab': '\t',
+    _W + 'ptab': '\t',
+    _W + 'cr': '\n',
+    _W + 'noBreakHyphen': '-'
+}
+
+def main_document_part(zip_ref):
+    """Name of the main document part (normally word/document.xml) from the package relationships"""
+    try:
+        with zip_ref.open('_rels/.rels') as f:
+            for relationship in ET.parse(f).getroot().iter(_RELS):
+                if relationship.get('Type') == _OFFICE_DOCUMENT:
+                    return posixpath.normpath(relationship.get('Target').lstrip('/'))
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+class DocxBlocks:
+    """Paragraphs and table cells of a DOCX (path, bytes or stream), in document order, read incrementally.
+
+    document.xml is parsed as it is decompressed and finished elements are dropped, so memory stays
+    flat however long the document is. bytes_read / total_bytes track progress through the XML.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.bytes_read = 0
+        self.total_bytes = 0
+
+    def __iter__(self):
+        with open_source(self.source) as f, zipfile.ZipFile(f) as zip_ref:
+            part = main_document_part(zip_ref)
+            self.total_bytes = zip_ref.getinfo(part).file_size
+            with zip_ref.open(part) as xml_file:
+                yield from _iter_document_blocks(_CountingReader(xml_file, self))
+
+def iter_docx_blocks(source):
+    """Yield the text of each paragraph and table cell of a DOCX in document order"""
+    return iter(DocxBlocks(source))
+
+class _CountingReader:
+    def __init__(self, f, blocks):
+        self._f = f
+        self._blocks = blocks
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self._blocks.bytes_read += len(data)
+        return data
+
+def _iter_document_blocks(xml_file):
+    tags = []         # Open element tags
+    paragraphs = []   # Text pieces of each open paragraph (text boxes nest paragraphs in paragraphs)
+    containers = []   # Open table cells (lists of their paragraphs) and other paragraph containers (None)
+    skip_depth = 0    # Inside mc:Fallback, which repeats the mc:Choice content
+    body = None
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            tags.append(tag)
+            if tag == _MC_FALLBACK or skip_depth:
+                skip_depth += 1
+            elif tag == _W + 'p':
+                paragraphs.append([])
+            elif tag == _W + 'tc':
+                containers.append([])
+            elif tag == _W + 'txbxContent':
+                containers.append(None)
+            elif tag == _W + 'body':
+                body = elem
+            continue
+
+        tags.pop()
+        parent = tags[-1] if tags else None
+        if skip_depth:
+            skip_depth -= 1
+        elif tag == _W + 'p':
+            text = ''.join(paragraphs.pop()).strip()
+            if containers and containers[-1] is not None:
+                containers[-1].append(text)
+            elif text:
+                yield text
+        elif tag == _W + 'tc':
+            text = '\n'.join(para for para in containers.pop() if para)
+            if text:
+                yield text
+        elif tag == _W + 'txbxContent':
+            containers.pop()
+        elif paragraphs and parent == _W + 'r':
+            if tag == _W + 't':
+                paragraphs[-1].append(elem.text or '')
+            elif tag == _W + 'br':
+                # Page and column breaks have no text equivalent
+                if elem.get(_W + 'type', 'textWrapping') == 'textWrapping':
+                    paragraphs[-1].append('\n')
+            elif tag in _RUN_TEXT:
+                paragraphs[-1].append(_RUN_TEXT[tag])
+
+        if parent == _W + 'body':
+            # Drop finished top-level paragraphs and tables
+            body.clear()
@@ -0,0 +1,183 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from config.settings import Config
+
+class EmbeddingCache:
+    """Content-addressed embedding cache with an in-memory LRU tier and a SQLite tier"""
+
+    def __init__(self, db_path=None, memory_items=None, max_disk_rows=None):
+        self.db_path = db_path or Config.EMBEDDING_CACHE_PATH
+        self.memory_items = memory_items if memory_items is not None else Config.EMBEDDING_CACHE_MEMORY_ITEMS
+        self.max_disk_rows = max_disk_rows if max_disk_rows is not None else Config.EMBEDDING_CACHE_MAX_ROWS
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats_counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._disk_rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(text, model, dimension):
+        """Build the cache key for a text under a given model and dimension"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{model}:{dimension}:{digest}"
+
+    def get_many(self, texts, model, dimension):
+        """Look up embeddings for texts, returning None for each miss"""
+        keys = [self.make_key(text, model, dimension) for text in texts]
+        results = [None] * len(texts)
+        disk_lookups = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[i] = self._memory[key]
+                    self.stats_counters['memory_hits'] += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups:
+                found = self._read_disk(list(disk_lookups))
+                for key, indices in disk_lookups.items():
+                    vector = found.get(key)
+                    if vector is None:
+                        self.stats_counters['misses'] += len(indices)
+                        continue
+                    self._remember(key, vector)
+                    self.stats_counters['disk_hits'] += len(indices)
+                    for i in indices:
+                        results[i] = vector
+
+        return results
+
+    def put_many(self, texts, embeddings, model, dimension):
+        """Store embeddings for texts in both tiers"""
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                if not embedding:
+                    continue
+                key = self.make_key(text, model, dimension)
+                self._remember(key, list(embedding))
+                rows.append((key, np.asarray(embedding, dtype=np.float32).tobytes(), now))
+
+            if not rows:
+                return
+
+            try:
+                cursor = self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+                self._disk_rows += max(cursor.rowcount, 0)
+                self._evict_disk()
+            except Exception as e:
+                print(f"Error writing embedding cache: {str(e)}")
+
+    def stats(self):
+        """Get hit/miss/eviction counters and tier sizes"""
+        with self._lock:
+            stats = dict(self.stats_counters)
+            stats.update({
+                'memory_items': len(self._memory),
+                'memory_budget': self.memory_items,
+                'disk_rows': self._disk_rows,
+                'disk_budget': self.max_disk_rows
+            })
+            return stats
+
+    def _remember(self, key, vector):
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.stats_counters['memory_evictions'] += 1
+
+    def _read_disk(self, keys):
+        """Read vectors for keys from SQLite and refresh their access time"""
+        found = {}
+        try:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        except Exception as e:
+            print(f"Error reading embedding cache: {str(e)}")
+        return found
+
+    def _evict_disk(self):
+        """Drop least recently used rows once the disk tier exceeds its budget"""
+        if self._disk_rows <= self.max_disk_rows:
+            return
+
+        # Evict down to 90% of the budget so we don't evict on every insert
+        excess = self._disk_rows - int(self.max_disk_rows * 0.9)
+        cursor = self._conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+            )
+        """, (excess,))
+        self._conn.commit()
+        self._disk_rows -= cursor.rowcount
+        self.stats_counters['disk_evictions'] += cursor.rowcount
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache():
+    """Get the process-wide embedding cache, or None when caching is disabled"""
+    global _cache
+    if not Config.EMBEDDING_CACHE_ENABLED:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = EmbeddingCache()
+                print(f"✅ Embedding cache ready at {_cache.db_path}")
+            except Exception as e:
+                print(f"❌ Failed to initialize embedding cache: {e}")
+                return None
+        return _cache
@@ -0,0 +1,119 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+from utils.nomic_embeddings import EmbeddingAPIError
+
+class TokenBucket:
+    """Token bucket that slows down when the API signals rate limiting"""
+
+    def __init__(self, rate, capacity=None, min_rate=0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttle(self, retry_after=None):
+        """Halve the request rate and honour Retry-After after a 429"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def reward(self):
+        """Creep back towards the configured rate after a successful request"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class EmbeddingExecutor:
+    """Bounded-concurrency embedding worker pool with rate-limit-aware retries"""
+
+    def __init__(self, embeddings, max_workers=None, rate=None, max_retries=None,
+                 base_delay=0.5, max_delay=30.0):
+        self.embeddings = embeddings
+        self.max_workers = max_workers or Config.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = max_retries if max_retries is not None else Config.EMBEDDING_MAX_RETRIES
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate or Config.EMBEDDING_RATE_LIMIT)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+
+    def submit(self, texts):
+        """Submit a batch of texts, returning a future for its embeddings"""
+        return self.pool.submit(self.embed, list(texts))
+
+    def map(self, batches):
+        """Embed many batches concurrently; results keep input order and failed batches yield their error"""
+        futures = [self.submit(batch) for batch in batches]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def embed(self, texts):
+        """Embed one batch in the calling thread, retrying transient failures"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                embeddings = self.embeddings.request_embeddings(texts)
+                self.bucket.reward()
+                return embeddings
+            except EmbeddingAPIError as e:
+                if not e.is_transient or attempt >= self.max_retries:
+                    raise
+
+                if e.status_code == 429:
+                    self.bucket.throttle(e.retry_after)
+
+                delay = self._backoff_delay(attempt, e.retry_after)
+                print(f"⚠️ Embedding request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and release the worker threads"""
+        self.pool.shutdown(wait=wait)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with full jitter, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_embedding_executor(embeddings):
+    """Get the process-wide embedding executor so all callers share one rate limit"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = EmbeddingExecutor(embeddings)
+        return _executor
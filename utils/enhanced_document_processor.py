@@ -3,7 +3,15 @@ import fitz  # PyMuPDF for PDF processing
 from docx import Document
 from pathlib import Path
 import mimetypes
+from itertools import chain, islice
 from utils.document_processor import DocumentProcessor
+from utils.docx_stream import DocxBlocks
+from utils.ingestion_pipeline import IngestionPipeline, batched
+from utils.parallel_parsing import (
+    SharedBuffer, chunk_pdf_pages, chunk_paragraphs, iter_parallel, iter_pdf_page_paragraphs, open_pdf,
+    split_ranges, use_parse_pool
+)
+from utils.upload_streams import read_source_bytes, read_source_text
 from config.settings import Config
 
 class EnhancedDocumentProcessor(DocumentProcessor):
@@ -28,81 +36,155 @@ class EnhancedDocumentProcessor(DocumentProcessor):
         else:
             print("⚠️ Nomic API Key: Not configured (using default)")
     
-    def process_document(self, file_path):
-        """Process document based on file extension"""
+    def process_document(self, source, existing=None, filename=None):
+        """Process a document (path, bytes or binary stream) based on its file extension"""
         try:
-            file_ext = Path(file_path).suffix.lower()
+            file_ext = self._file_extension(source, filename)
             
             if file_ext not in self.supported_formats:
                 raise ValueError(f"Unsupported file format: {file_ext}")
             
-            # Extract text using appropriate method
-            text_content = self.supported_formats[file_ext](file_path)
+            processed_chunks = list(self._number_chunks(self._iter_chunk_lists(source, file_ext)))
             
-            if not text_content:
+            if not processed_chunks:
                 raise ValueError("No text content extracted from document")
             
-            # Process text into chunks with embeddings
-            processed_chunks = []
-            
-            for paragraph in text_content:
-                if paragraph.strip():
-                    processed_text = self.preprocess_text(paragraph)
-                    chunks = self.chunk_text(processed_text)
-                    
-                    for chunk in chunks:
-                        if chunk.strip():
-                            embedding = self.get_embedding(chunk)
-                            if embedding:
-                                processed_chunks.append({
-                                    'text': chunk,
-                                    'original_text': paragraph,
-                                    'file_type': file_ext,
-                                    'embedding': embedding
-                                })
-            
-            return processed_chunks
+            return self.embed_chunks(processed_chunks, existing)
             
         except Exception as e:
             print(f"Error processing document: {str(e)}")
             return []
     
-    def _process_pdf(self, file_path):
+    def ingest_document(self, source, store, existing=None, progress=None, filename=None):
+        """Stream a document (path, bytes or binary stream) through extraction, chunking, embedding
+        and store(chunks); returns the chunk count"""
+        file_ext = self._file_extension(source, filename)
+        if file_ext not in self.supported_formats:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        report = progress or (lambda **counters: None)
+        
+        def batch_chunks(chunk_lists):
+            return batched(self._number_chunks(chunk_lists), Config.INGEST_BATCH_CHUNKS)
+        
+        def embed_batches(batches):
+            for batch in batches:
+                yield self.embed_chunks(batch, existing)
+        
+        def store_batches(batches):
+            stored = 0
+            for batch in batches:
+                if batch and not store(batch):
+                    raise RuntimeError("Failed to store document chunks in vector database")
+                stored += len(batch)
+                report(chunks_done=stored)
+                yield len(batch)
+        
+        # Pages are chunked, embedded and stored while later pages are still being parsed
+        pipeline = IngestionPipeline([batch_chunks, embed_batches, store_batches], name="ingest")
+        return sum(pipeline.run(self._iter_chunk_lists(source, file_ext, report)))
+    
+    def _file_extension(self, source, filename=None):
+        """Lower-case extension of the uploaded filename, or of the source path"""
+        return Path(filename or source).suffix.lower()
+    
+    def _iter_chunk_lists(self, source, file_ext, report=None):
+        """Yield a document's chunks as lists, in document order, parsing large documents in worker processes"""
+        report = report or (lambda **counters: None)
+        if file_ext == '.pdf':
+            if not isinstance(source, (str, os.PathLike)):
+                source = read_source_bytes(source)
+            doc = open_pdf(source)
+            page_count = len(doc)
+            report(unit='pages', total=page_count)
+            if use_parse_pool(page_count, Config.PARSE_PARALLEL_MIN_PAGES):
+                doc.close()
+                ranges = split_ranges(page_count, Config.PARSE_PAGES_PER_TASK)
+                if isinstance(source, bytes):
+                    # Workers read in-memory uploads from shared memory rather than a file
+                    with SharedBuffer(source) as shared:
+                        yield from self._iter_pdf_page_ranges(shared.ref, ranges, file_ext, report)
+                else:
+                    yield from self._iter_pdf_page_ranges(source, ranges, file_ext, report)
+                return
+            
+            try:
+                for page_num, paragraphs in enumerate(iter_pdf_page_paragraphs(doc, 0, page_count), 1):
+                    yield list(self.iter_section_chunks([paragraphs], file_ext))
+                    report(done=page_num)
+            finally:
+                doc.close()
+            return
+        
+        if file_ext == '.docx':
+            yield from self._iter_docx_chunk_lists(source, file_ext, report)
+            return
+        
+        paragraphs = self.supported_formats[file_ext](source)
+        report(unit='paragraphs', total=len(paragraphs))
+        if use_parse_pool(len(paragraphs), Config.PARSE_PARALLEL_MIN_PARAGRAPHS):
+            ranges = split_ranges(len(paragraphs), Config.PARSE_PARAGRAPHS_PER_TASK)
+            results = iter_parallel(chunk_paragraphs, [(paragraphs[start:end], file_ext) for start, end in ranges])
+            for (start, end), chunks in zip(ranges, results):
+                yield chunks
+                report(done=end)
+        elif paragraphs:
+            yield list(self.iter_section_chunks([paragraphs], file_ext))
+            report(done=len(paragraphs))
+    
+    def _iter_pdf_page_ranges(self, source, ranges, file_ext, report):
+        """Chunk page ranges of a PDF in the parse pool, yielding each range's chunks in order"""
+        results = iter_parallel(chunk_pdf_pages, [(source, start, end, file_ext) for start, end in ranges])
+        for (start, end), chunks in zip(ranges, results):
+            yield chunks
+            report(done=end)
+    
+    def _iter_docx_chunk_lists(self, source, file_ext, report):
+        """Chunk a DOCX as its paragraphs and table cells stream out of document.xml, a group at a time"""
+        blocks = DocxBlocks(source)
+        block_iter = iter(blocks)
+        # Only look far enough ahead to tell whether the document is big enough for the parse pool
+        head = list(islice(block_iter, Config.PARSE_PARALLEL_MIN_PARAGRAPHS))
+        groups = batched(chain(head, block_iter), Config.PARSE_PARAGRAPHS_PER_TASK)
+        report(unit='bytes', total=blocks.total_bytes)
+        if use_parse_pool(len(head), Config.PARSE_PARALLEL_MIN_PARAGRAPHS):
+            chunk_lists = iter_parallel(chunk_paragraphs, ((group, file_ext) for group in groups))
+        else:
+            chunk_lists = (list(self.iter_section_chunks([group], file_ext)) for group in groups)
+        for chunks in chunk_lists:
+            yield chunks
+            report(done=blocks.bytes_read)
+    
+    def _number_chunks(self, chunk_lists):
+        """Flatten chunk lists in order, giving each chunk its position in the document"""
+        chunk_index = 0
+        for chunks in chunk_lists:
+            for chunk in chunks:
+                chunk['chunk_index'] = chunk_index
+                chunk_index += 1
+                yield chunk
+    
+    def _process_pdf(self, source):
         """Extract text from PDF using PyMuPDF"""
         try:
-            doc = fitz.open(file_path)
-            text_content = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                
-                if text.strip():
-                    # Split by paragraphs (double newlines)
-                    paragraphs = text.split('\n\n')
-                    for para in paragraphs:
-                        if para.strip():
-                            text_content.append(para.strip())
-            
-            doc.close()
-            return text_content
-            
+            return [para for page in self._iter_pdf_pages(source) for para in page]
         except Exception as e:
             print(f"Error processing PDF: {str(e)}")
             return []
+    
+    def _iter_pdf_pages(self, source):
+        """Yield the paragraphs of each PDF page, loading one page at a time"""
+        doc = open_pdf(source)
+        try:
+            yield from iter_pdf_page_paragraphs(doc, 0, len(doc))
         finally:
             # Ensure document is properly closed
-            try:
-                if 'doc' in locals():
-                    doc.close()
-            except:
-                pass
+            doc.close()
     
-    def _process_docx(self, file_path):
+    def _process_docx(self, source):
         """Extract text from DOCX file"""
-        return self.extract_text_from_docx(file_path)
+        return self.extract_text_from_docx(source)
     
-    def _process_doc(self, file_path):
+    def _process_doc(self, source):
         """Extract text from DOC file (legacy format)"""
         try:
             # For .doc files, we'd need python-docx2txt or similar
@@ -113,11 +195,10 @@ class EnhancedDocumentProcessor(DocumentProcessor):
             print(f"Error processing DOC: {str(e)}")
             return []
     
-    def _process_txt(self, file_path):
+    def _process_txt(self, source):
         """Extract text from plain text file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = read_source_text(source)
             
             # Split by paragraphs
             paragraphs = content.split('\n\n')
@@ -127,11 +208,10 @@ class EnhancedDocumentProcessor(DocumentProcessor):
             print(f"Error processing TXT: {str(e)}")
             return []
     
-    def _process_markdown(self, file_path):
+    def _process_markdown(self, source):
         """Extract text from Markdown file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = read_source_text(source)
             
             # Remove markdown formatting (basic)
             import re
@@ -151,7 +231,7 @@ class EnhancedDocumentProcessor(DocumentProcessor):
             print(f"Error processing Markdown: {str(e)}")
             return []
     
-    def _process_rtf(self, file_path):
+    def _process_rtf(self, source):
         """Extract text from RTF file"""
         try:
             # RTF processing would require striprtf or similar library
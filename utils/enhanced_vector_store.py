@@ -1,14 +1,29 @@
 import os
-import uuid
 import re
+import json
 from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType, utility
+from config.settings import Config
+from utils.collection_registry import get_collection_registry
+from utils.insert_buffer import get_insert_buffer
+from utils.index_policy import get_index_manager
+from utils.collection_residency import get_residency_manager
+from utils.lexical_index import get_lexical_index_registry, hybrid_search, merge_query_results
+from utils.document_processor import get_shared_document_processor, chunk_id
+from utils.blob_store import get_blob_store, store_chunk_sources, attach_original_text, chunk_original_text
 
 class EnhancedVectorStore:
     """Enhanced vector store with support for different content types"""
     
-    def __init__(self):
+    def __init__(self, storage_mode=None):
         self.host = os.getenv('MILVUS_HOST', 'localhost')
         self.port = os.getenv('MILVUS_PORT', '19530')
+        self.partitioned = (storage_mode or Config.VECTOR_STORAGE_MODE) == 'partitioned'
+        self.registry = get_collection_registry()
+        self.insert_buffer = get_insert_buffer()
+        self.index_manager = get_index_manager()
+        self.residency = get_residency_manager()
+        self.lexical = get_lexical_index_registry()
+        self.blob_store = get_blob_store()
         self.connect_to_milvus()
     
     def connect_to_milvus(self):
@@ -25,17 +40,89 @@ class EnhancedVectorStore:
     
     def _format_collection_name(self, session_id, content_type="general"):
         """Format collection name with content type"""
+        if self.partitioned:
+            return f"{content_type}_{Config.SHARED_COLLECTION_SUFFIX}"
         safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
         return f"{content_type}_{safe_id}"
     
+    def _session_filter(self, session_id):
+        """Filter expression selecting one session's rows in a shared collection"""
+        if not self.partitioned:
+            return ""
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        return f'session_id == "{safe_id}"'
+    
+    def _lexical_key(self, collection_name, session_id):
+        """Key of the lexical index covering one session's rows"""
+        if not self.partitioned:
+            return collection_name
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        return f"{collection_name}/{safe_id}"
+    
+    def _metadata_fields(self, content_type):
+        """Scalar fields returned with search results"""
+        if content_type == "code":
+            return ["file_path", "file_type", "chunk_index"]
+        return ["filename", "file_type"]
+    
+    def _source_fields(self, collection, include_original=False):
+        """Fields locating a row's original text (blob references, or inline text in older collections)"""
+        field_names = {field.name for field in collection.schema.fields}
+        if "blob_id" in field_names:
+            return ["blob_id", "blob_start", "blob_end"]
+        return ["original_text"] if include_original and "original_text" in field_names else []
+    
+    def _build_columns(self, collection, session_id, user_id, chunks, columns):
+        """Complete per-field columns for a batch of chunks and order them like the collection schema"""
+        fields = collection.schema.fields
+        field_names = [field.name for field in fields]
+        
+        if "blob_id" in field_names:
+            references = store_chunk_sources(self.blob_store, chunks)
+            columns["blob_id"] = [blob_id for blob_id, _, _ in references]
+            columns["blob_start"] = [start for _, start, _ in references]
+            columns["blob_end"] = [end for _, _, end in references]
+        
+        if "original_text" in field_names:
+            # Collections created before the blob store keep the text inline
+            max_length = next(field.params.get("max_length", 10000) for field in fields if field.name == "original_text")
+            columns["original_text"] = [chunk_original_text(chunk)[:max_length] for chunk in chunks]
+        
+        if self.partitioned:
+            safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+            columns["session_id"] = [safe_id] * len(chunks)
+            columns["user_id"] = [str(user_id or '')] * len(chunks)
+        
+        return [columns[name] for name in field_names]
+    
+    def _lexical_rows(self, columns, fields):
+        """Rows for the lexical index (no embeddings or original text)"""
+        fields = [field for field in fields if field in columns]
+        return [
+            {field: columns[field][i] for field in fields}
+            for i in range(len(columns["id"]))
+        ]
+    
+    def _tenant_fields(self):
+        """Partition-key fields added to shared collection schemas"""
+        if not self.partitioned:
+            return []
+        return [
+            FieldSchema(name="session_id", dtype=DataType.VARCHAR, max_length=100, is_partition_key=True),
+            FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=64)
+        ]
+    
     def create_document_collection_schema(self):
         """Schema for document collections"""
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=100, is_primary=True),
             FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=5000),
-            FieldSchema(name="original_text", dtype=DataType.VARCHAR, max_length=10000),
+            FieldSchema(name="blob_id", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(name="blob_start", dtype=DataType.INT64),
+            FieldSchema(name="blob_end", dtype=DataType.INT64),
             FieldSchema(name="filename", dtype=DataType.VARCHAR, max_length=255),
             FieldSchema(name="file_type", dtype=DataType.VARCHAR, max_length=50),
+            *self._tenant_fields(),
             FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=768)
         ]
         return CollectionSchema(fields=fields, description="Document embeddings collection")
@@ -45,10 +132,13 @@ class EnhancedVectorStore:
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=100, is_primary=True),
             FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=5000),
-            FieldSchema(name="original_text", dtype=DataType.VARCHAR, max_length=20000),
+            FieldSchema(name="blob_id", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(name="blob_start", dtype=DataType.INT64),
+            FieldSchema(name="blob_end", dtype=DataType.INT64),
             FieldSchema(name="file_path", dtype=DataType.VARCHAR, max_length=500),
             FieldSchema(name="file_type", dtype=DataType.VARCHAR, max_length=50),
             FieldSchema(name="chunk_index", dtype=DataType.INT64),
+            *self._tenant_fields(),
             FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=768)
         ]
         return CollectionSchema(fields=fields, description="Code embeddings collection")
@@ -57,23 +147,23 @@ class EnhancedVectorStore:
         """Create collection based on content type"""
         try:
             collection_name = self._format_collection_name(session_id, content_type)
-            if utility.has_collection(collection_name):
-                return Collection(collection_name)
+            collection = self.registry.get(collection_name)
+            if collection is not None:
+                return collection
             
             if content_type == "code":
                 schema = self.create_code_collection_schema()
             else:
                 schema = self.create_document_collection_schema()
             
-            collection = Collection(collection_name, schema)
+            if self.partitioned:
+                collection = Collection(collection_name, schema, num_partitions=Config.SHARED_COLLECTION_PARTITIONS)
+            else:
+                collection = Collection(collection_name, schema)
             
-            index_params = {
-                "index_type": "IVF_FLAT",
-                "metric_type": "COSINE",
-                "params": {"nlist": 1024}
-            }
-            collection.create_index(field_name="embedding", index_params=index_params)
-            return collection
+            # Start with an index suited to an empty collection; it's rebuilt as the collection grows
+            self.index_manager.create_index(collection)
+            return self.registry.register(collection_name, collection)
             
         except Exception as e:
             print(f"❌ Error creating collection: {str(e)}")
@@ -83,145 +173,358 @@ class EnhancedVectorStore:
         """Check if collection exists"""
         try:
             collection_name = self._format_collection_name(session_id, content_type)
-            return utility.has_collection(collection_name)
+            if not self.partitioned:
+                return self.registry.get(collection_name) is not None
+            
+            # A shared collection only "exists" for sessions that have rows in it; querying needs it loaded
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return False
+                self.insert_buffer.flush(collection_name)
+                rows = collection.query(expr=self._session_filter(session_id), output_fields=["id"], limit=1)
+                return len(rows) > 0
         except Exception as e:
             print(f"❌ Error checking collection existence: {str(e)}")
             return False
     
-    def add_documents(self, session_id, documents, filename, content_type="documents"):
+    def assign_chunk_ids(self, session_id, chunks, filename=None):
+        """Give chunks deterministic ids from (session, source file, chunk index, content)"""
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        for i, chunk in enumerate(chunks):
+            source = chunk.get('file_path') or filename or ''
+            if chunk.get('archive'):
+                source = f"{chunk['archive']}/{source}"
+            chunk['id'] = chunk_id(f"{safe_id}/{source}", chunk.get('chunk_index', i), chunk['text'])
+        return chunks
+    
+    def existing_chunk_ids(self, session_id, chunks, content_type="documents", filename=None):
+        """Assign chunk ids and return the ones already stored, so they can skip embedding"""
+        self.assign_chunk_ids(session_id, chunks, filename)
+        collection_name = self._format_collection_name(session_id, content_type)
+        try:
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return set()
+                
+                self.insert_buffer.flush(collection_name)
+                
+                ids = [chunk['id'] for chunk in chunks]
+                existing = set()
+                for start in range(0, len(ids), 1000):
+                    batch = ids[start:start + 1000]
+                    rows = collection.query(
+                        expr=f"id in {json.dumps(batch)}",
+                        output_fields=["id"],
+                        consistency_level="Session"
+                    )
+                    existing.update(row['id'] for row in rows)
+                return existing
+        except Exception as e:
+            print(f"❌ Error looking up existing chunks: {str(e)}")
+            return set()
+    
+    def get_chunks(self, session_id, chunk_ids, content_type="documents"):
+        """Stored rows (with embeddings and source references) for chunk ids; ids that are gone are left out"""
+        collection_name = self._format_collection_name(session_id, content_type)
+        try:
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return {}
+                
+                self.insert_buffer.flush(collection_name)
+                
+                session_filter = self._session_filter(session_id)
+                output_fields = ["id", "text", *self._metadata_fields(content_type),
+                                 *self._source_fields(collection, include_original=True), "embedding"]
+                rows = {}
+                chunk_ids = list(chunk_ids)
+                for start in range(0, len(chunk_ids), 1000):
+                    expr = f"id in {json.dumps(chunk_ids[start:start + 1000])}"
+                    for row in collection.query(
+                        expr=f"{session_filter} and {expr}" if session_filter else expr,
+                        output_fields=output_fields,
+                        consistency_level="Session"
+                    ):
+                        row['embedding'] = list(row['embedding'])
+                        rows[row['id']] = row
+                return rows
+        except Exception as e:
+            print(f"❌ Error reading stored chunks: {str(e)}")
+            return {}
+    
+    def add_documents(self, session_id, documents, filename, content_type="documents", user_id=None):
         """Add documents to collection"""
         try:
+            documents = [doc for doc in documents if not doc.get('duplicate')]
+            if not documents:
+                print(f"♻️ All chunks of {filename} are already stored")
+                return True
+            
             collection = self.create_collection(session_id, content_type)
+            self.assign_chunk_ids(session_id, [doc for doc in documents if 'id' not in doc], filename)
             
-            ids = []
-            texts = []
-            original_texts = []
-            filenames = []
-            file_types = []
-            embeddings = []
-            
-            for doc in documents:
-                ids.append(str(uuid.uuid4()))
-                texts.append(doc['text'])
-                original_texts.append(doc['original_text'])
-                filenames.append(filename)
-                file_types.append(doc.get('file_type', ''))
-                embeddings.append(doc['embedding'])
-            
-            data = [ids, texts, original_texts, filenames, file_types, embeddings]
-            collection.insert(data)
-            collection.flush()
-            collection.load()
-            
-            print(f"✅ Added {len(documents)} documents to {content_type} collection")
+            columns = {
+                'id': [doc['id'] for doc in documents],
+                'text': [doc['text'] for doc in documents],
+                'filename': [filename] * len(documents),
+                'file_type': [doc.get('file_type', '') for doc in documents],
+                'embedding': [doc['embedding'] for doc in documents]
+            }
+            data = self._build_columns(collection, session_id, user_id, documents, columns)
+            self.insert_buffer.add(collection, data)
+            self.index_manager.note_insert(collection, len(documents))
+            self.lexical.add_rows(
+                self._lexical_key(collection.name, session_id),
+                self._lexical_rows(columns, ["id", "text", *self._metadata_fields(content_type), *self._source_fields(collection)])
+            )
+            
+            print(f"✅ Queued {len(documents)} documents for {content_type} collection")
             return True
             
         except Exception as e:
             print(f"❌ Error adding documents: {str(e)}")
             return False
     
-    def add_code_chunks(self, session_id, code_chunks):
+    def add_code_chunks(self, session_id, code_chunks, user_id=None):
         """Add code chunks to collection"""
         try:
+            code_chunks = [chunk for chunk in code_chunks if not chunk.get('duplicate')]
+            if not code_chunks:
+                print("♻️ All code chunks are already stored")
+                return True
+            
             collection = self.create_collection(session_id, "code")
+            self.assign_chunk_ids(session_id, [chunk for chunk in code_chunks if 'id' not in chunk])
             
-            ids = []
-            texts = []
-            original_texts = []
-            file_paths = []
-            file_types = []
-            chunk_indices = []
-            embeddings = []
-            
-            for chunk in code_chunks:
-                ids.append(str(uuid.uuid4()))
-                texts.append(chunk['text'])
-                original_texts.append(chunk['original_text'])
-                file_paths.append(chunk['file_path'])
-                file_types.append(chunk['file_type'])
-                chunk_indices.append(chunk['chunk_index'])
-                embeddings.append(chunk['embedding'])
-            
-            data = [ids, texts, original_texts, file_paths, file_types, chunk_indices, embeddings]
-            collection.insert(data)
-            collection.flush()
-            collection.load()
-            
-            print(f"✅ Added {len(code_chunks)} code chunks to collection")
+            columns = {
+                'id': [chunk['id'] for chunk in code_chunks],
+                'text': [chunk['text'] for chunk in code_chunks],
+                'file_path': [chunk['file_path'] for chunk in code_chunks],
+                'file_type': [chunk['file_type'] for chunk in code_chunks],
+                'chunk_index': [chunk['chunk_index'] for chunk in code_chunks],
+                'embedding': [chunk['embedding'] for chunk in code_chunks]
+            }
+            data = self._build_columns(collection, session_id, user_id, code_chunks, columns)
+            self.insert_buffer.add(collection, data)
+            self.index_manager.note_insert(collection, len(code_chunks))
+            self.lexical.add_rows(
+                self._lexical_key(collection.name, session_id),
+                self._lexical_rows(columns, ["id", "text", *self._metadata_fields("code"), *self._source_fields(collection)])
+            )
+            
+            print(f"✅ Queued {len(code_chunks)} code chunks for collection")
             return True
             
         except Exception as e:
             print(f"❌ Error adding code chunks: {str(e)}")
             return False
     
-    def search_documents(self, session_id, query_text, content_type="documents", top_k=5):
-        """Search documents in collection"""
+    def search_documents(self, session_id, query_text, content_type="documents", top_k=5, search_mode=None,
+                         include_original=False, query_embedding=None):
+        """Search documents in collection ('vector', 'lexical' or 'hybrid' mode)"""
+        collection_name = self._format_collection_name(session_id, content_type)
+        search_mode = search_mode or Config.SEARCH_MODE
         try:
-            collection_name = self._format_collection_name(session_id, content_type)
-            if not utility.has_collection(collection_name):
-                return []
-            
-            collection = Collection(collection_name)
-            collection.load()
-            
-            from utils.document_processor import DocumentProcessor
-            doc_processor = DocumentProcessor()
-            query_embedding = doc_processor.get_embedding(query_text)
-            
-            if not query_embedding:
-                return []
-            
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
-            
-            if content_type == "code":
-                output_fields = ["text", "original_text", "file_path", "file_type", "chunk_index"]
-            else:
-                output_fields = ["text", "original_text", "filename", "file_type"]
-            
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=top_k,
-                output_fields=output_fields
-            )
-            
-            documents = []
-            for result in results[0]:
-                doc_data = {
-                    'text': result.entity.get('text'),
-                    'original_text': result.entity.get('original_text'),
-                    'score': result.score,
-                    'content_type': content_type
-                }
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return []
                 
-                if content_type == "code":
-                    doc_data.update({
-                        'file_path': result.entity.get('file_path'),
-                        'file_type': result.entity.get('file_type'),
-                        'chunk_index': result.entity.get('chunk_index')
-                    })
+                # Make rows buffered by this process visible to the search
+                self.insert_buffer.flush(collection_name)
+                
+                if search_mode == "lexical":
+                    documents = self._lexical_search(collection, session_id, query_text, content_type, top_k)
+                elif search_mode == "hybrid":
+                    documents = hybrid_search(
+                        lambda k: self._vector_search(collection, session_id, query_text, content_type, k, include_original,
+                                                      query_embedding),
+                        lambda k: self._lexical_search(collection, session_id, query_text, content_type, k),
+                        top_k
+                    )
                 else:
-                    doc_data.update({
-                        'filename': result.entity.get('filename'),
-                        'file_type': result.entity.get('file_type')
-                    })
+                    documents = self._vector_search(collection, session_id, query_text, content_type, top_k, include_original,
+                                                    query_embedding)
                 
-                documents.append(doc_data)
-            
-            return documents
+                # Original text lives in the blob store and is only read when asked for
+                if include_original:
+                    attach_original_text(self.blob_store, documents)
+                return documents
             
         except Exception as e:
             print(f"❌ Error searching documents: {str(e)}")
+            self.registry.invalidate(collection_name)
             return []
     
+    def _vector_search(self, collection, session_id, query_text, content_type, top_k, include_original=False,
+                       query_embedding=None):
+        """Dense search over the collection's embeddings"""
+        if query_embedding is None:
+            query_embedding = get_shared_document_processor().get_embedding(query_text)
+        
+        if not query_embedding:
+            return []
+        
+        search_params = self.index_manager.search_params(collection, top_k)
+        output_fields = ["text", *self._metadata_fields(content_type), *self._source_fields(collection, include_original)]
+        
+        results = collection.search(
+            data=[query_embedding],
+            anns_field="embedding",
+            param=search_params,
+            limit=top_k,
+            expr=self._session_filter(session_id) or None,
+            output_fields=output_fields,
+            consistency_level="Session"
+        )
+        
+        return self._format_hits(results[0], content_type, output_fields)
+    
+    def _format_hits(self, hits, content_type, output_fields):
+        """Turn Milvus search hits into result dicts"""
+        documents = []
+        for result in hits:
+            doc_data = {
+                'id': result.id,
+                'score': result.score,
+                'content_type': content_type
+            }
+            for field in output_fields:
+                doc_data[field] = result.entity.get(field)
+            documents.append(doc_data)
+        
+        return documents
+    
+    def fetch_original_text(self, results):
+        """Load original text for search results that were returned without it"""
+        return attach_original_text(self.blob_store, results)
+    
+    def search_many(self, session_id, queries, content_type="documents", top_k=5, merge=False, include_original=False):
+        """Search several queries with one embedding batch and one search call; merge=True de-duplicates them"""
+        collection_name = self._format_collection_name(session_id, content_type)
+        per_query = [[] for _ in queries]
+        try:
+            with self.registry.using(collection_name) as collection:
+                if collection is None or not queries:
+                    return merge_query_results(per_query, top_k) if merge else per_query
+                
+                self.insert_buffer.flush(collection_name)
+                
+                embeddings = get_shared_document_processor().get_embeddings(list(queries))
+                embedded = [i for i, embedding in enumerate(embeddings) if embedding]
+                
+                if embedded:
+                    output_fields = ["text", *self._metadata_fields(content_type), *self._source_fields(collection, include_original)]
+                    results = collection.search(
+                        data=[embeddings[i] for i in embedded],
+                        anns_field="embedding",
+                        param=self.index_manager.search_params(collection, top_k),
+                        limit=top_k,
+                        expr=self._session_filter(session_id) or None,
+                        output_fields=output_fields,
+                        consistency_level="Session"
+                    )
+                    for i, hits in zip(embedded, results):
+                        per_query[i] = self._format_hits(hits, content_type, output_fields)
+                    
+                    if include_original:
+                        attach_original_text(self.blob_store, [doc for hits in per_query for doc in hits])
+            
+        except Exception as e:
+            print(f"❌ Error searching documents: {str(e)}")
+            self.registry.invalidate(collection_name)
+        
+        return merge_query_results(per_query, top_k) if merge else per_query
+    
+    def _lexical_search(self, collection, session_id, query_text, content_type, top_k):
+        """BM25 search over the collection's chunk text"""
+        # Document chunks are indexed preprocessed (code verbatim), so the query has to be too
+        if content_type != "code":
+            query_text = get_shared_document_processor().preprocess_text(query_text)
+        
+        index = self.lexical.get(
+            self._lexical_key(collection.name, session_id),
+            lambda: self._iter_lexical_rows(collection, session_id, content_type)
+        )
+        
+        documents = []
+        for score, row in index.search(query_text, top_k):
+            doc_data = dict(row)
+            doc_data.update({'score': score, 'content_type': content_type})
+            documents.append(doc_data)
+        
+        return documents
+    
+    def _iter_lexical_rows(self, collection, session_id, content_type):
+        """Stream a session's stored rows to build its lexical index"""
+        iterator = collection.query_iterator(
+            batch_size=1000,
+            expr=self._session_filter(session_id),
+            output_fields=["id", "text", *self._metadata_fields(content_type), *self._source_fields(collection)],
+            consistency_level="Session"
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            iterator.close()
+    
+    def delete_chunks(self, session_id, chunk_ids, content_type="code"):
+        """Delete chunks by id (e.g. those of files removed from a re-uploaded archive)"""
+        if not chunk_ids:
+            return True
+        collection_name = self._format_collection_name(session_id, content_type)
+        try:
+            collection = self.registry.get(collection_name)
+            if collection is None:
+                return True
+            
+            # Insert buffered rows first so none of the deleted ids are inserted afterwards
+            self.insert_buffer.flush(collection_name)
+            chunk_ids = list(chunk_ids)
+            for start in range(0, len(chunk_ids), 1000):
+                collection.delete(f"id in {json.dumps(chunk_ids[start:start + 1000])}")
+            self.lexical.remove_ids(self._lexical_key(collection_name, session_id), chunk_ids)
+            
+            print(f"🧹 Deleted {len(chunk_ids)} chunks from {collection_name}")
+            return True
+        except Exception as e:
+            print(f"❌ Error deleting chunks: {str(e)}")
+            return False
+    
+    def flush(self, session_id, content_type="general"):
+        """Insert rows still buffered for a collection so searches can see them;
+        raises InsertFailedError if some of its rows could not be inserted"""
+        collection_name = self._format_collection_name(session_id, content_type)
+        self.insert_buffer.flush(collection_name)
+        self.insert_buffer.raise_failures(collection_name)
+    
+    def sync(self, session_id, content_type="general"):
+        """Insert buffered rows and persist them in Milvus for read-after-write from other clients"""
+        self.insert_buffer.sync(self._format_collection_name(session_id, content_type))
+    
     def delete_collection(self, session_id, content_type="general"):
-        """Delete collection"""
+        """Delete collection (or the session's rows in a shared collection)"""
         try:
             collection_name = self._format_collection_name(session_id, content_type)
+            if self.partitioned:
+                # Deleting by session filter (not primary key) needs the collection loaded
+                with self.registry.using(collection_name) as collection:
+                    if collection is None:
+                        return True
+                    # Insert buffered rows first so none of the session's rows survive the delete
+                    self.insert_buffer.flush(collection_name)
+                    collection.delete(self._session_filter(session_id))
+                    self.lexical.invalidate(self._lexical_key(collection_name, session_id))
+                    print(f"🧹 Deleted {content_type} rows for session {session_id} from {collection_name}")
+                return True
+            
+            self.insert_buffer.discard(collection_name)
+            self.registry.invalidate(collection_name)
+            self.index_manager.forget(collection_name)
+            self.lexical.invalidate(collection_name)
             if utility.has_collection(collection_name):
                 utility.drop_collection(collection_name)
                 print(f"🧹 Deleted {content_type} collection {collection_name}")
@@ -234,16 +537,26 @@ class EnhancedVectorStore:
         """Get collection statistics"""
         try:
             collection_name = self._format_collection_name(session_id, content_type)
-            if not utility.has_collection(collection_name):
+            collection = self.registry.get(collection_name)
+            if collection is None:
                 return None
             
-            collection = Collection(collection_name)
-            collection.load()
+            if self.partitioned:
+                # Counting a session's rows is a query, which needs the collection loaded
+                with self.registry.using(collection_name) as loaded:
+                    self.insert_buffer.flush(collection_name)
+                    counts = loaded.query(expr=self._session_filter(session_id), output_fields=["count(*)"])
+                num_entities = counts[0]["count(*)"] if counts else 0
+            else:
+                num_entities = collection.num_entities
             
             return {
                 'name': collection_name,
                 'content_type': content_type,
-                'num_entities': collection.num_entities,
+                'storage_mode': 'partitioned' if self.partitioned else 'per_session',
+                'num_entities': num_entities,
+                'pending_rows': self.insert_buffer.pending_rows(collection_name),
+                **self.index_manager.describe(collection),
                 'description': collection.description
             }
         except Exception as e:
@@ -1,27 +1,30 @@
+import io
 import os
 import base64
 import requests
 from PIL import Image
 from dotenv import load_dotenv
 from openai import OpenAI
+from utils.upload_streams import read_source_bytes
 
 load_dotenv()
 
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, openai_client=None):
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
         self.llm_server_url = os.getenv('LLM_SERVER_URL', 'http://localhost:8000/v1/chat/completions')
         self.llm_model_path = os.getenv('LLM_MODEL_PATH', '/root/.cache/huggingface/')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.openai_client = OpenAI(api_key=self.openai_api_key) if self.openai_api_key else None
+        if openai_client is None and self.openai_api_key:
+            openai_client = OpenAI(api_key=self.openai_api_key)
+        self.openai_client = openai_client
 
     def is_supported_format(self, filename):
         return any(filename.lower().endswith(fmt) for fmt in self.supported_formats)
 
-    def image_to_base64(self, image_path):
+    def image_to_base64(self, image):
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
+            return base64.b64encode(read_source_bytes(image)).decode('utf-8')
         except Exception as e:
             print(f"Error converting image to base64: {str(e)}")
             return None
@@ -38,23 +41,24 @@ class ImageProcessor:
             print(f"Error resizing image: {str(e)}")
             return False
 
-    def get_image_info(self, image_path):
+    def get_image_info(self, image):
         try:
-            with Image.open(image_path) as img:
+            data = read_source_bytes(image)
+            with Image.open(io.BytesIO(data)) as img:
                 return {
                     'width': img.width,
                     'height': img.height,
                     'format': img.format,
                     'mode': img.mode,
-                    'size_kb': os.path.getsize(image_path) // 1024
+                    'size_kb': len(data) // 1024
                 }
         except Exception as e:
             print(f"Error getting image info: {str(e)}")
             return None
 
-    def describe_image(self, image_path):
+    def describe_image(self, image):
         try:
-            info = self.get_image_info(image_path)
+            info = self.get_image_info(image)
             if not info:
                 return "Unable to analyze image."
 
@@ -85,14 +89,18 @@ class ImageProcessor:
             print(f"Error describing image: {str(e)}")
             return "Unable to analyze the uploaded image."
 
-    def analyze_with_ai(self, image_path):
-        """Try local LLM for image analysis; fall back to OpenAI GPT-4o vision or basic metadata description"""
+    def analyze_with_ai(self, image, filename=None):
+        """Try local LLM for image analysis; fall back to OpenAI GPT-4o vision or basic metadata description.
+
+        image is a path, bytes or binary stream; filename gives the extension when it is not a path.
+        """
         try:
-            base64_image = self.image_to_base64(image_path)
+            ext = os.path.splitext(filename or image)[1].lower()
+            image = read_source_bytes(image)  # Read once for the request and the metadata fallback
+            base64_image = self.image_to_base64(image)
             if not base64_image:
                 return "Could not convert image to base64."
 
-            ext = os.path.splitext(image_path)[1].lower()
             mime_type = "image/png" if ext == ".png" else "image/jpeg"
             image_url_data = f"data:{mime_type};base64,{base64_image}"
 
@@ -142,8 +150,8 @@ class ImageProcessor:
                 except Exception as e:
                     print(f"[OpenAI Vision] Error: {str(e)}")
 
-            return "No vision model available. Showing basic metadata:\n" + self.describe_image(image_path)
+            return "No vision model available. Showing basic metadata:\n" + self.describe_image(image)
 
         except Exception as e:
             print(f"[AI Vision Error] {str(e)}")
-            return "Error analyzing image.\n" + self.describe_image(image_path)
+            return "Error analyzing image.\n" + self.describe_image(image)
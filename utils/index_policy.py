@@ -0,0 +1,213 @@
+import json
+import math
+import threading
+from pymilvus import utility
+from config.settings import Config
+from utils.collection_registry import get_collection_registry
+from utils.insert_buffer import get_insert_buffer
+
+class IndexPolicy:
+    """Choose a vector index and its search parameters from a collection's row count"""
+
+    def __init__(self, flat_max_rows=None, hnsw_min_rows=None, metric_type="COSINE"):
+        self.flat_max_rows = flat_max_rows if flat_max_rows is not None else Config.INDEX_FLAT_MAX_ROWS
+        self.hnsw_min_rows = hnsw_min_rows if hnsw_min_rows is not None else Config.INDEX_HNSW_MIN_ROWS
+        self.metric_type = metric_type
+
+    def index_type(self, row_count):
+        """Index family suited to a collection of this size"""
+        if row_count < self.flat_max_rows:
+            return "FLAT"
+        if row_count < self.hnsw_min_rows:
+            return "IVF_FLAT"
+        return "HNSW"
+
+    def index_params(self, row_count):
+        """Build index parameters for a collection of this size"""
+        index_type = self.index_type(row_count)
+
+        if index_type == "FLAT":
+            params = {}
+        elif index_type == "IVF_FLAT":
+            params = {"nlist": self.ivf_nlist(row_count)}
+        else:
+            params = {"M": 16 if row_count < 2000000 else 32, "efConstruction": 200}
+
+        return {
+            "index_type": index_type,
+            "metric_type": self.metric_type,
+            "params": params
+        }
+
+    def ivf_nlist(self, row_count):
+        """IVF cluster count for a collection of this size"""
+        # ~4*sqrt(n) clusters keeps lists a few hundred vectors long
+        return min(65536, max(64, int(4 * math.sqrt(row_count))))
+
+    def search_params(self, index_params, top_k):
+        """Build search parameters matching an index"""
+        index_type = index_params.get("index_type", "FLAT")
+        params = index_params.get("params", {})
+
+        if index_type.startswith("IVF"):
+            nlist = int(params.get("nlist", 1024))
+            search = {"nprobe": min(nlist, max(8, nlist // 16))}
+        elif index_type == "HNSW":
+            search = {"ef": max(64, top_k * 4)}
+        else:
+            search = {}
+
+        return {"metric_type": self.metric_type, "params": search}
+
+class IndexManager:
+    """Track collection sizes and rebuild indexes in the background when they outgrow them"""
+
+    def __init__(self, registry, insert_buffer, policy=None):
+        self.registry = registry
+        self.insert_buffer = insert_buffer
+        self.policy = policy or IndexPolicy()
+        self._rows = {}
+        self._indexes = {}
+        self._rebuilding = set()
+        self._lock = threading.Lock()
+
+    def create_index(self, collection, row_count=0):
+        """Create the initial index for a new collection"""
+        index_params = self.policy.index_params(row_count)
+        collection.create_index(field_name="embedding", index_params=index_params)
+        with self._lock:
+            self._rows[collection.name] = row_count
+            self._indexes[collection.name] = index_params
+        return index_params
+
+    def current_index(self, collection):
+        """Get the index parameters a collection is using"""
+        with self._lock:
+            index_params = self._indexes.get(collection.name)
+        if index_params is not None:
+            return index_params
+
+        index_params = {"index_type": "FLAT", "metric_type": self.policy.metric_type, "params": {}}
+        for index in collection.indexes:
+            if index.field_name == "embedding":
+                index_params = dict(index.params)
+                if isinstance(index_params.get("params"), str):
+                    try:
+                        index_params["params"] = json.loads(index_params["params"])
+                    except ValueError:
+                        index_params["params"] = {}
+                break
+
+        with self._lock:
+            self._indexes.setdefault(collection.name, index_params)
+        return index_params
+
+    def search_params(self, collection, top_k):
+        """Search parameters derived from the collection's current index"""
+        return self.policy.search_params(self.current_index(collection), top_k)
+
+    def note_insert(self, collection, row_count):
+        """Count inserted rows and start a rebuild once the index no longer suits the collection's size"""
+        name = collection.name
+        with self._lock:
+            tracked = name in self._rows
+        # The first count covers the rows just buffered, along with any stored before this process started
+        # (rows Milvus hasn't sealed yet are left out rather than forcing a seal to count them)
+        stored = None if tracked else collection.num_entities + self.insert_buffer.pending_rows(name)
+
+        with self._lock:
+            if name in self._rows:
+                self._rows[name] += row_count
+            else:
+                self._rows[name] = stored
+            total = self._rows[name]
+
+        if not self._needs_rebuild(self.current_index(collection), total):
+            return
+
+        with self._lock:
+            if name in self._rebuilding:
+                return
+            self._rebuilding.add(name)
+
+        threading.Thread(
+            target=self._rebuild,
+            args=(collection, total),
+            name=f"index-rebuild-{name}",
+            daemon=True
+        ).start()
+
+    def describe(self, collection):
+        """Index details for collection stats"""
+        index_params = self.current_index(collection)
+        with self._lock:
+            return {
+                'index_type': index_params.get("index_type"),
+                'index_params': index_params.get("params", {}),
+                'tracked_rows': self._rows.get(collection.name),
+                'rebuilding': collection.name in self._rebuilding
+            }
+
+    def forget(self, collection_name):
+        """Drop tracked state for a deleted collection"""
+        with self._lock:
+            self._rows.pop(collection_name, None)
+            self._indexes.pop(collection_name, None)
+
+    def _needs_rebuild(self, current, row_count):
+        """Whether the index is a smaller family than row_count calls for, or sized for a very different count;
+        sizes have to be off by 2x so a growing collection isn't rebuilt on every insert"""
+        order = ["FLAT", "IVF_FLAT", "HNSW"]
+        current_type = current.get("index_type")
+        if current_type not in order:
+            return True
+
+        target = self.policy.index_params(row_count)
+        if order.index(target["index_type"]) > order.index(current_type):
+            return True
+
+        params = current.get("params") or {}
+        if current_type == "IVF_FLAT":
+            # Covers legacy nlist=1024 indexes on small collections (rebuilt as FLAT) and lists grown too long
+            nlist = int(params.get("nlist") or 0)
+            ideal = self.policy.ivf_nlist(row_count)
+            return not ideal / 2 < nlist < ideal * 2
+        if current_type == "HNSW" and target["index_type"] == "HNSW":
+            return int(params.get("M") or 0) < target["params"]["M"]
+        return False
+
+    def _rebuild(self, collection, row_count):
+        name = collection.name
+        index_params = self.policy.index_params(row_count)
+        try:
+            # Seal buffered rows so the new index covers them
+            self.insert_buffer.sync(name)
+
+            # Waits for searches holding the collection; new ones wait and reload once the new index is ready
+            with self.registry.exclusive(name):
+                collection.release()
+                collection.drop_index()
+                collection.create_index(field_name="embedding", index_params=index_params)
+                utility.wait_for_index_building_complete(name)
+                with self._lock:
+                    self._indexes[name] = index_params
+
+            print(f"🔧 Rebuilt index for {name}: {index_params['index_type']} {index_params['params']} ({row_count} rows)")
+        except Exception as e:
+            print(f"❌ Error rebuilding index for {name}: {str(e)}")
+            with self._lock:
+                self._indexes.pop(name, None)
+        finally:
+            with self._lock:
+                self._rebuilding.discard(name)
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_index_manager():
+    """Get the process-wide index manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IndexManager(get_collection_registry(), get_insert_buffer())
+        return _manager
@@ -0,0 +1,205 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    """Raised inside a job's work once the job has been cancelled"""
+
+class JobQueueFull(Exception):
+    """Raised when too many ingestion jobs are already queued or running"""
+
+class IngestionJob:
+    """State and progress of one background ingestion"""
+
+    def __init__(self, user_id, session_id, job_type, name, cleanup=None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.session_id = session_id
+        self.type = job_type
+        self.name = name
+        self.cleanup = cleanup
+        self.future = None
+
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # 'done' and 'total' count the job's unit of work (pages, chunks) and drive the ETA
+        self.counters = {'unit': 'chunks', 'done': 0, 'total': 0, 'files_done': 0, 'files_total': 0, 'chunks_done': 0}
+        self.result = None
+        self.error = None
+
+        self.version = 0
+        self._cancelled = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def progress(self, **counters):
+        """Update progress counters; raises JobCancelled once the job has been cancelled"""
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Ingestion job {self.id} was cancelled")
+        with self._changed:
+            self.counters.update(counters)
+            self._bump()
+
+    def cancel(self):
+        """Ask the job to stop at its next progress update; returns False if it already finished"""
+        with self._changed:
+            if self.finished:
+                return False
+            self._cancelled.set()
+            if self.status == 'queued':
+                self._finish('cancelled')
+            return True
+
+    def wait_for_change(self, version, timeout):
+        """Block until the job changes past `version` (or timeout) and return the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def snapshot(self):
+        """JSON-serialisable status, with throughput and ETA"""
+        with self._changed:
+            counters = dict(self.counters)
+            now = time.time()
+            elapsed = ((self.finished_at or now) - self.started_at) if self.started_at else 0.0
+            done, total = counters['done'], counters['total']
+
+            eta = None
+            if self.status == 'running' and done and total > done:
+                eta = round(elapsed / done * (total - done), 1)
+
+            return {
+                'job_id': self.id,
+                'type': self.type,
+                'name': self.name,
+                'status': self.status,
+                **counters,
+                'progress': round(min(done / total, 1.0), 4) if total else (1.0 if self.status == 'succeeded' else 0.0),
+                'elapsed_seconds': round(elapsed, 1),
+                'chunks_per_second': round(counters['chunks_done'] / elapsed, 2) if elapsed else 0.0,
+                'eta_seconds': eta,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at
+            }
+
+    def _start(self):
+        with self._changed:
+            if self.status != 'queued':
+                return False
+            self.status = 'running'
+            self.started_at = time.time()
+            self._bump()
+            return True
+
+    def _finish(self, status, result=None, error=None):
+        with self._changed:
+            if self.finished:
+                return
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self._bump()
+
+    def _bump(self):
+        self.version += 1
+        self._changed.notify_all()
+
+class IngestionJobManager:
+    """Runs ingestion jobs on a bounded worker pool and keeps their state for status queries"""
+
+    def __init__(self, max_workers=None, max_jobs=None, retention=None):
+        self.max_workers = max_workers or Config.INGEST_JOB_WORKERS
+        self.max_jobs = max_jobs or Config.INGEST_JOB_QUEUE_SIZE
+        self.retention = retention if retention is not None else Config.INGEST_JOB_RETENTION
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, session_id, job_type, name, work, cleanup=None):
+        """Queue work(job) -> result dict on the pool; raises JobQueueFull when the queue is at capacity"""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if not job.finished)
+            if active >= self.max_jobs:
+                raise JobQueueFull(f"Too many uploads in progress ({active}); please try again shortly")
+            job = IngestionJob(user_id, session_id, job_type, name, cleanup)
+            self._jobs[job.id] = job
+
+        job.future = self._pool.submit(self._run, job, work)
+        print(f"📥 Queued {job_type} ingestion job {job.id} for {name}")
+        return job
+
+    def get(self, job_id, user_id):
+        """A job by id, if it belongs to the user"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job and job.user_id == user_id else None
+
+    def list_jobs(self, user_id, session_id=None):
+        """The user's jobs, newest first"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values()
+                    if job.user_id == user_id and (session_id is None or job.session_id == session_id)]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id, user_id):
+        """Cancel a queued or running job; returns the job, or None if not found"""
+        job = self.get(job_id, user_id)
+        if job is None:
+            return None
+        if job.cancel() and job.future and job.future.cancel():
+            # It never reached a worker, so clean up here
+            self._cleanup(job)
+        return job
+
+    def _run(self, job, work):
+        try:
+            if not job._start():
+                return  # Cancelled while queued
+            result = work(job)
+            job._finish('succeeded', result=result)
+            print(f"✅ Ingestion job {job.id} finished")
+        except JobCancelled:
+            job._finish('cancelled')
+            print(f"🧹 Ingestion job {job.id} cancelled")
+        except Exception as e:
+            print(f"❌ Ingestion job {job.id} failed: {str(e)}")
+            job._finish('failed', error=str(e))
+        finally:
+            self._cleanup(job)
+
+    def _cleanup(self, job):
+        cleanup, job.cleanup = job.cleanup, None
+        if cleanup:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"⚠️ Cleanup for ingestion job {job.id} failed: {str(e)}")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_ingestion_job_manager():
+    """Get the process-wide ingestion job manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IngestionJobManager()
+        return _manager
@@ -0,0 +1,94 @@
+import queue
+import threading
+from config.settings import Config
+
+_DONE = object()
+
+class PipelineStopped(Exception):
+    """Raised inside stage threads when another stage has failed or the consumer went away"""
+
+class IngestionPipeline:
+    """Runs a generator through generator stages, each on its own thread, connected by bounded queues"""
+
+    def __init__(self, stages, queue_depth=None, name="ingest"):
+        self.stages = stages
+        self.queue_depth = queue_depth or Config.INGEST_QUEUE_DEPTH
+        self.name = name
+        self._stopped = threading.Event()
+        self._error = None
+
+    def run(self, source):
+        """Feed source through every stage and yield what the last stage produces"""
+        # At most queue_depth items wait between two stages, so memory is bounded
+        # by the queue depth rather than by how much the source produces
+        queues = [queue.Queue(maxsize=self.queue_depth) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._work, args=(lambda _: source, None, queues[0]), name=f"{self.name}-source", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._work,
+                args=(stage, queues[i], queues[i + 1]),
+                name=f"{self.name}-{getattr(stage, '__name__', i)}",
+                daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in self._drain(queues[-1]):
+                yield item
+        except PipelineStopped:
+            pass
+        finally:
+            # Unblock every stage if the consumer stopped early or a stage failed
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _work(self, stage, in_queue, out_queue):
+        try:
+            for result in stage(self._drain(in_queue) if in_queue else None):
+                self._put(out_queue, result)
+            self._put(out_queue, _DONE)
+        except PipelineStopped:
+            pass
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+                print(f"❌ {self.name} pipeline stage failed: {str(e)}")
+            self._stopped.set()
+
+    def _drain(self, in_queue):
+        while True:
+            try:
+                item = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise PipelineStopped()
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _put(self, out_queue, item):
+        while True:
+            if self._stopped.is_set():
+                raise PipelineStopped()
+            try:
+                out_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+def batched(items, batch_size):
+    """Group an iterable into lists of up to batch_size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
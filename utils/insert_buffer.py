@@ -0,0 +1,273 @@
+import time
+import atexit
+import threading
+from config.settings import Config
+
+class InsertFailedError(Exception):
+    """Raised when buffered rows of a collection were dropped after repeated insert failures"""
+
+class InsertBuffer:
+    """Write-behind buffer that groups rows per collection into large Milvus inserts"""
+
+    def __init__(self, max_rows=None, max_age=None, max_attempts=None):
+        self.max_rows = max_rows or Config.INSERT_BUFFER_MAX_ROWS
+        self.max_age = max_age if max_age is not None else Config.INSERT_BUFFER_MAX_AGE
+        self.max_attempts = max_attempts or Config.INSERT_BUFFER_MAX_ATTEMPTS
+        self._pending = {}
+        # collection name -> {'rows', 'ids', 'error'} of rows dropped after max_attempts
+        self._failed = {}
+        # collection name -> entries taken from _pending whose insert hasn't finished
+        self._inflight = {}
+        # collection name -> collection with rows inserted since the last sync
+        self._unsealed = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+
+        self._worker = threading.Thread(target=self._flush_aged_loop, name="insert-buffer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def add(self, collection, columns):
+        """Queue column-ordered row data (primary key first) for a collection"""
+        row_count = len(columns[0]) if columns else 0
+        if not row_count:
+            return 0
+
+        with self._lock:
+            entry = self._pending.get(collection.name)
+            if entry is None:
+                entry = self._pending[collection.name] = {
+                    'collection': collection,
+                    'columns': [[] for _ in columns],
+                    'ids': set(),
+                    'rows': 0,
+                    'attempts': 0,
+                    'since': time.monotonic(),
+                    'retry_at': 0.0
+                }
+
+            # Rows already waiting under the same primary key would only be upserted twice
+            keep = [i for i, row_id in enumerate(columns[0]) if row_id not in entry['ids']]
+            if len(keep) < row_count:
+                columns = [[values[i] for i in keep] for values in columns]
+                row_count = len(keep)
+            entry['ids'].update(columns[0])
+
+            for buffered, values in zip(entry['columns'], columns):
+                buffered.extend(values)
+            entry['rows'] += row_count
+            full = entry['rows'] >= self.max_rows
+
+        if full:
+            try:
+                self.flush(collection.name)
+            except Exception:
+                pass  # Already logged; rows stay queued for the background flusher
+        return row_count
+
+    def flush(self, collection_name=None):
+        """Insert pending rows for one collection (or all) without sealing segments,
+        and wait for inserts other threads already started"""
+        # Inserted rows land in growing segments that loaded collections already
+        # search, and Milvus seals them on its own schedule instead of per upload
+        while True:
+            self._insert_all(self._take(collection_name))
+            if not self._wait_inflight(collection_name):
+                return
+
+    def sync(self, collection_name=None):
+        """Insert pending rows and force Milvus to persist them (read-after-write across clients);
+        raises InsertFailedError if rows of the collection had to be dropped"""
+        self.flush(collection_name)
+        with self._lock:
+            if collection_name is not None:
+                unsealed = [self._unsealed.pop(collection_name)] if collection_name in self._unsealed else []
+            else:
+                unsealed, self._unsealed = list(self._unsealed.values()), {}
+        for collection in unsealed:
+            collection.flush()
+        self.raise_failures(collection_name)
+
+    def raise_failures(self, collection_name=None):
+        """Raise InsertFailedError for rows dropped since the last check, so the caller can report them"""
+        with self._lock:
+            if collection_name is not None:
+                failures = {collection_name: self._failed.pop(collection_name)} if collection_name in self._failed else {}
+            else:
+                failures, self._failed = self._failed, {}
+        if failures:
+            raise InsertFailedError("; ".join(
+                f"{failure['rows']} rows could not be inserted into {name}: {failure['error']}"
+                for name, failure in failures.items()
+            ))
+
+    def failed_rows(self, collection_name):
+        """Count rows of a collection dropped after repeated insert failures and not yet reported"""
+        with self._lock:
+            failure = self._failed.get(collection_name)
+            return failure['rows'] if failure else 0
+
+    def discard(self, collection_name):
+        """Drop pending rows for a collection that is being deleted"""
+        with self._lock:
+            self._pending.pop(collection_name, None)
+            self._failed.pop(collection_name, None)
+            self._unsealed.pop(collection_name, None)
+
+    def pending_rows(self, collection_name=None):
+        """Count buffered rows for one collection (or all)"""
+        with self._lock:
+            if collection_name is not None:
+                entry = self._pending.get(collection_name)
+                return entry['rows'] if entry else 0
+            return sum(entry['rows'] for entry in self._pending.values())
+
+    def close(self):
+        """Stop the background flusher and insert everything still pending"""
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Error flushing insert buffer on shutdown: {str(e)}")
+
+    def _take(self, collection_name=None):
+        """Remove pending entries and mark them in flight until _insert_all finishes them"""
+        with self._lock:
+            if collection_name is not None:
+                entry = self._pending.pop(collection_name, None)
+                entries = [entry] if entry else []
+            else:
+                entries = list(self._pending.values())
+                self._pending.clear()
+            for entry in entries:
+                name = entry['collection'].name
+                self._inflight[name] = self._inflight.get(name, 0) + 1
+            return entries
+
+    def _insert_all(self, entries):
+        """Insert taken entries; after a failure the rest go back to the queue untried"""
+        error = None
+        for entry in entries:
+            try:
+                if error is None:
+                    self._insert(entry)
+                else:
+                    self._requeue(entry['collection'], entry['columns'], entry['attempts'])
+            except Exception as e:
+                error = e
+            finally:
+                with self._idle:
+                    name = entry['collection'].name
+                    self._inflight[name] -= 1
+                    if not self._inflight[name]:
+                        del self._inflight[name]
+                    self._idle.notify_all()
+        if error is not None:
+            raise error
+
+    def _wait_inflight(self, collection_name=None):
+        """Wait for inserts in flight on other threads; True if any failed and left rows to retry"""
+        with self._idle:
+            waited = False
+            while self._inflight.get(collection_name) if collection_name is not None else self._inflight:
+                waited = True
+                self._idle.wait()
+            if collection_name is not None:
+                return waited and collection_name in self._pending
+            return waited and bool(self._pending)
+
+    def _insert(self, entry):
+        """Insert a buffered entry in max_rows slices, requeueing rows that fail until max_attempts"""
+        collection = entry['collection']
+        columns = entry['columns']
+        with self._lock:
+            self._unsealed[collection.name] = collection
+
+        for start in range(0, entry['rows'], self.max_rows):
+            data = [values[start:start + self.max_rows] for values in columns]
+            try:
+                # Upsert so re-ingesting chunks with deterministic ids replaces instead of duplicating
+                collection.upsert(data)
+            except Exception as e:
+                print(f"❌ Error inserting buffered rows into {collection.name}: {str(e)}")
+                attempts = entry['attempts'] + 1
+                if attempts < self.max_attempts:
+                    self._requeue(collection, [values[start:] for values in columns], attempts)
+                    raise
+                # Out of attempts: insert what can be inserted so one bad row doesn't block the rest
+                self._insert_isolating(collection, data)
+
+        print(f"✅ Inserted buffered rows into {collection.name}")
+
+    def _insert_isolating(self, collection, data):
+        """Insert rows in halves down to single rows, dropping (and recording) the rows that still fail"""
+        try:
+            collection.upsert(data)
+            return
+        except Exception as e:
+            if len(data[0]) == 1:
+                self._record_failure(collection.name, data[0], e)
+                return
+        mid = len(data[0]) // 2
+        self._insert_isolating(collection, [values[:mid] for values in data])
+        self._insert_isolating(collection, [values[mid:] for values in data])
+
+    def _record_failure(self, collection_name, ids, error):
+        print(f"🧹 Dropping {len(ids)} rows that could not be inserted into {collection_name} "
+              f"after {self.max_attempts} attempts: {str(error)}")
+        with self._lock:
+            failure = self._failed.setdefault(collection_name, {'rows': 0, 'ids': [], 'error': ''})
+            failure['rows'] += len(ids)
+            failure['ids'].extend(ids)
+            failure['error'] = str(error)
+
+    def _requeue(self, collection, columns, attempts):
+        with self._lock:
+            entry = self._pending.get(collection.name)
+            if entry is None:
+                self._pending[collection.name] = {
+                    'collection': collection,
+                    'columns': columns,
+                    'ids': set(columns[0]),
+                    'rows': len(columns[0]),
+                    'attempts': attempts,
+                    'since': time.monotonic(),
+                    'retry_at': 0.0
+                }
+                entry = self._pending[collection.name]
+            else:
+                for buffered, values in zip(entry['columns'], columns):
+                    buffered[:0] = values
+                entry['ids'].update(columns[0])
+                entry['rows'] += len(columns[0])
+                entry['attempts'] = max(entry['attempts'], attempts)
+            if attempts:
+                # Back off so a short outage doesn't use up every attempt within seconds
+                entry['retry_at'] = time.monotonic() + self.max_age * 2 ** attempts
+
+    def _flush_aged_loop(self):
+        interval = max(self.max_age / 2, 0.1)
+        while not self._stopped.wait(interval):
+            now = time.monotonic()
+            with self._lock:
+                aged = [
+                    name for name, entry in self._pending.items()
+                    if now - entry['since'] >= self.max_age and now >= entry['retry_at']
+                ]
+            for name in aged:
+                try:
+                    self.flush(name)
+                except Exception:
+                    pass  # Already logged; rows stay queued for the next pass
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_insert_buffer():
+    """Get the process-wide insert buffer"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = InsertBuffer()
+        return _buffer
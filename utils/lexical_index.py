@@ -0,0 +1,209 @@
+import re
+import math
+import threading
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import Config
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+def tokenize(text):
+    """Lowercase word tokens, keeping identifiers whole and also adding their parts"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text or ''):
+        tokens.append(token.lower())
+        parts = [part.lower() for piece in token.split('_') for part in CAMEL_CASE_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class BM25Index:
+    """Incremental BM25 index over chunk text"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.doc_lengths = {}
+        self.documents = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def add(self, doc_id, text, metadata):
+        """Index a chunk, replacing any earlier version with the same id"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in terms.items():
+                self.postings[term][doc_id] = frequency
+            length = sum(terms.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+            self.documents[doc_id] = metadata
+
+    def remove(self, doc_id):
+        """Remove a chunk from the index"""
+        with self._lock:
+            if doc_id not in self.doc_lengths:
+                return
+            for term in tokenize(self.documents[doc_id].get('text', '')):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            self.documents.pop(doc_id, None)
+
+    def search(self, query_text, top_k=5):
+        """Top-k chunks by BM25 score as (score, metadata) pairs"""
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+
+            average_length = self.total_length / doc_count
+            scores = defaultdict(float)
+            for term in set(tokenize(query_text)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / average_length
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [(score, self.documents[doc_id]) for doc_id, score in ranked]
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+class LexicalIndexRegistry:
+    """Process-wide BM25 indexes keyed by collection, built lazily and updated on insert"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._ready = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Get the index for a key, building it from loader() (an iterable of rows) on first use"""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                # Register before loading so rows inserted meanwhile are not lost
+                index = self._indexes[key] = BM25Index()
+                ready = self._ready[key] = threading.Event()
+                build = True
+            else:
+                ready = self._ready[key]
+                build = False
+
+        if build:
+            try:
+                for row in loader():
+                    index.add(row['id'], row.get('text', ''), row)
+            except Exception as e:
+                print(f"❌ Error building lexical index for {key}: {str(e)}")
+                self.invalidate(key)
+            finally:
+                ready.set()
+        else:
+            ready.wait()
+
+        return index
+
+    def add_rows(self, key, rows):
+        """Index newly inserted rows if the key's index has been built"""
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is None:
+            return
+        for row in rows:
+            index.add(row['id'], row.get('text', ''), row)
+
+    def remove_ids(self, key, doc_ids):
+        """Remove rows from the key's index if it has been built"""
+        with self._lock:
+            index = self._indexes.get(key)
+        if index is None:
+            return
+        for doc_id in doc_ids:
+            index.remove(doc_id)
+
+    def invalidate(self, key):
+        """Forget an index (after the collection is dropped)"""
+        with self._lock:
+            self._indexes.pop(key, None)
+            self._ready.pop(key, None)
+
+    def evict(self, collection_name):
+        """Forget a collection's indexes (every session's, for a shared collection) when it leaves memory;
+        they are rebuilt on next search"""
+        prefix = f"{collection_name}/"
+        with self._lock:
+            for key in [key for key in self._indexes if key == collection_name or key.startswith(prefix)]:
+                self._indexes.pop(key, None)
+                self._ready.pop(key, None)
+
+def reciprocal_rank_fusion(result_lists, top_k, k=60):
+    """Fuse ranked result lists by reciprocal rank, keyed on each result's 'id'"""
+    fused = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            entry = fused.get(result['id'])
+            if entry is None:
+                entry = fused[result['id']] = {'result': dict(result), 'score': 0.0}
+            else:
+                # Prefer the copy with more fields (vector hits carry everything)
+                for key, value in result.items():
+                    entry['result'].setdefault(key, value)
+            entry['score'] += 1.0 / (k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)[:top_k]
+    fused_results = []
+    for entry in ranked:
+        result = entry['result']
+        result['score'] = entry['score']
+        fused_results.append(result)
+    return fused_results
+
+def merge_query_results(result_lists, top_k=None):
+    """De-duplicate results of several queries by id, keeping each chunk's best score"""
+    merged = {}
+    for query_index, results in enumerate(result_lists):
+        for result in results:
+            entry = merged.get(result['id'])
+            if entry is None:
+                entry = merged[result['id']] = dict(result, matched_queries=[])
+            elif result['score'] > entry['score']:
+                entry.update(result, matched_queries=entry['matched_queries'])
+            entry['matched_queries'].append(query_index)
+
+    ranked = sorted(merged.values(), key=lambda entry: entry['score'], reverse=True)
+    return ranked[:top_k] if top_k else ranked
+
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+def hybrid_search(vector_search, lexical_search, top_k):
+    """Run vector and lexical searches concurrently and fuse them with reciprocal rank fusion"""
+    depth = top_k * Config.HYBRID_CANDIDATE_MULTIPLIER
+    vector_future = _search_pool.submit(vector_search, depth)
+    lexical_future = _search_pool.submit(lexical_search, depth)
+
+    vector_results = vector_future.result()
+    lexical_results = lexical_future.result()
+    for result in vector_results:
+        result['vector_score'] = result.get('score')
+    for result in lexical_results:
+        result['lexical_score'] = result.get('score')
+
+    return reciprocal_rank_fusion([vector_results, lexical_results], top_k, k=Config.HYBRID_RRF_K)
+
+_registry = LexicalIndexRegistry()
+
+def get_lexical_index_registry():
+    """Get the process-wide lexical index registry"""
+    return _registry
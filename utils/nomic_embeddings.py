@@ -1,21 +1,61 @@
 import os
+import threading
 import requests
 import numpy as np
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from config.settings import Config
 
+class EmbeddingAPIError(Exception):
+    """Raised when the embedding API rejects or fails a request"""
+    
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @property
+    def is_transient(self):
+        """Whether retrying the same request may succeed"""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
 class NomicEmbeddings:
     """Nomic API-based embeddings service"""
     
     def __init__(self):
         self.api_key = Config.NOMIC_API_KEY
-        self.base_url = "https://api-atlas.nomic.ai/v1/embedding/text"
+        self.base_url = Config.NOMIC_API_URL
         self.model = Config.NOMIC_MODEL_NAME
+        # EmbeddingExecutor calls in from several worker threads, and requests.Session isn't thread-safe
+        self._local = threading.local()
         
         if not self.api_key:
             raise ValueError("NOMIC_API_KEY is required for embeddings")
         
         print(f"✅ Nomic Embeddings initialized with model: {self.model}")
     
+    @property
+    def session(self):
+        """HTTP session for the calling thread, kept so its connections are reused"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
     def embed_query(self, text):
         """Get embedding for a single text query"""
         return self.embed_documents([text])[0]
@@ -23,44 +63,58 @@ class NomicEmbeddings:
     def embed_documents(self, texts):
         """Get embeddings for multiple documents"""
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'model': self.model,
-                'texts': texts
-            }
-            
-            response = requests.post(
+            return self.request_embeddings(texts)
+        except Exception as e:
+            print(f"Error calling Nomic API: {str(e)}")
+            return []
+    
+    def request_embeddings(self, texts):
+        """Get normalized embeddings for texts, raising EmbeddingAPIError on failure"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        payload = {
+            'model': self.model,
+            'texts': texts
+        }
+        
+        try:
+            response = self.session.post(
                 self.base_url,
                 json=payload,
                 headers=headers,
                 timeout=30
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                embeddings = data.get('embeddings', [])
-                
-                # Normalize embeddings
-                normalized_embeddings = []
-                for embedding in embeddings:
-                    norm = np.linalg.norm(embedding)
-                    if norm > 0:
-                        normalized_embeddings.append((np.array(embedding) / norm).tolist())
-                    else:
-                        normalized_embeddings.append(embedding)
-                
-                return normalized_embeddings
+        except requests.RequestException as e:
+            raise EmbeddingAPIError(f"Nomic API request failed: {str(e)}")
+        
+        if response.status_code != 200:
+            raise EmbeddingAPIError(
+                f"Nomic API error: {response.status_code} - {response.text[:200]}",
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get('Retry-After'))
+            )
+        
+        embeddings = response.json().get('embeddings', [])
+        if len(embeddings) != len(texts):
+            # Not transient: the same batch gets the same answer, but its halves may not
+            raise EmbeddingAPIError(
+                f"Nomic API returned {len(embeddings)} embeddings for {len(texts)} texts",
+                status_code=response.status_code
+            )
+        
+        # Normalize embeddings
+        normalized_embeddings = []
+        for embedding in embeddings:
+            norm = np.linalg.norm(embedding)
+            if norm > 0:
+                normalized_embeddings.append((np.array(embedding) / norm).tolist())
             else:
-                print(f"Nomic API error: {response.status_code} - {response.text}")
-                return []
-                
-        except Exception as e:
-            print(f"Error calling Nomic API: {str(e)}")
-            return []
+                normalized_embeddings.append(embedding)
+        
+        return normalized_embeddings
     
     def test_connection(self):
         """Test Nomic API connection"""
@@ -0,0 +1,512 @@
+import os
+import re
+import json
+import shutil
+import threading
+import numpy as np
+from config.settings import Config
+from utils.document_processor import get_shared_document_processor, chunk_id
+from utils.blob_store import get_blob_store, store_chunk_sources, attach_original_text
+from utils.lexical_index import get_lexical_index_registry, hybrid_search, merge_query_results
+
+class NumpyCollection:
+    """One collection stored as memory-mapped float32 segments with JSONL metadata sidecars"""
+
+    def __init__(self, path, dimension):
+        self.path = path
+        self.dimension = dimension
+        self._segments = None
+        self._ids = set()
+        self._next_segment = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def exists(self):
+        return os.path.isdir(self.path)
+
+    def segments(self):
+        """Snapshot of (segment_id, vectors, metadata) triples, loading them on first use"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._segments)
+
+    def count(self):
+        return sum(len(metadata) for _, _, metadata in self.segments())
+
+    def existing_ids(self, ids):
+        """Subset of ids already stored"""
+        with self._lock:
+            self._ensure_loaded()
+            return {row_id for row_id in ids if row_id in self._ids}
+
+    def get(self, ids):
+        """Stored rows by id as {id: (metadata, vector)}; unknown ids are left out"""
+        ids = set(ids)
+        found = {}
+        for _, vectors, metadata in self.segments():
+            for i, row in enumerate(metadata):
+                if row['id'] in ids:
+                    found[row['id']] = (row, np.asarray(vectors[i]))
+        return found
+
+    def append(self, metadata, vectors):
+        """Write rows as a new sealed segment, compacting once there are too many segments"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            self._ensure_loaded()
+
+            # Ids are content-derived, so a row with a stored id is already present unchanged
+            keep = [i for i, row in enumerate(metadata) if row['id'] not in self._ids]
+            if not keep:
+                return 0
+            if len(keep) < len(metadata):
+                metadata = [metadata[i] for i in keep]
+                vectors = vectors[keep]
+
+            self._segments.append(self._write_segment(self._next_segment, metadata, vectors))
+            self._ids.update(row['id'] for row in metadata)
+            self._next_segment += 1
+
+            if len(self._segments) > Config.NUMPY_MAX_SEGMENTS:
+                self._compact()
+
+            return len(metadata)
+
+    def search(self, query_vector, top_k):
+        """Top-k rows by cosine similarity as (score, metadata) pairs"""
+        return self.search_many([query_vector], top_k)[0]
+
+    def search_many(self, query_vectors, top_k):
+        """Top-k rows for each query, scoring all queries against a segment in one matrix product"""
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1)
+
+        candidates = [[] for _ in range(len(queries))]
+        for _, vectors, metadata in self.segments():
+            if not len(metadata):
+                continue
+            scores = vectors @ queries.T
+            k = min(top_k, len(metadata))
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+            for q in range(len(queries)):
+                candidates[q].extend((float(scores[i, q]), metadata[i]) for i in top[:, q])
+
+        for query_candidates in candidates:
+            query_candidates.sort(key=lambda item: item[0], reverse=True)
+            del query_candidates[top_k:]
+        return candidates
+
+    def delete(self, ids):
+        """Remove rows by id, rewriting only the segments that contain them"""
+        ids = set(ids)
+        with self._lock:
+            self._ensure_loaded()
+            if not ids & self._ids:
+                return 0
+
+            removed = 0
+            segments = []
+            for segment_id, vectors, metadata in self._segments:
+                keep = [i for i, row in enumerate(metadata) if row['id'] not in ids]
+                if len(keep) == len(metadata):
+                    segments.append((segment_id, vectors, metadata))
+                    continue
+
+                removed += len(metadata) - len(keep)
+                if keep:
+                    segments.append(self._write_segment(
+                        self._next_segment, [metadata[i] for i in keep], np.asarray(vectors)[keep]
+                    ))
+                    self._next_segment += 1
+                self._remove_segment_files(segment_id)
+
+            self._segments = segments
+            self._ids -= ids
+            return removed
+
+    def drop(self):
+        with self._lock:
+            self._segments = []
+            self._ids = set()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def _ensure_loaded(self):
+        if self._segments is not None:
+            return
+
+        self._segments = []
+        if not os.path.isdir(self.path):
+            return
+
+        segment_ids = sorted(
+            int(name[4:-4]) for name in os.listdir(self.path)
+            if re.match(r'^seg_\d+\.npy$', name)
+        )
+        for segment_id in segment_ids:
+            self._segments.append(self._read_segment(segment_id))
+            self._ids.update(row['id'] for row in self._segments[-1][2])
+        self._next_segment = segment_ids[-1] + 1 if segment_ids else 0
+
+    def _segment_paths(self, segment_id):
+        base = os.path.join(self.path, f"seg_{segment_id:06d}")
+        return f"{base}.npy", f"{base}.jsonl"
+
+    def _read_segment(self, segment_id):
+        vector_path, metadata_path = self._segment_paths(segment_id)
+        vectors = np.load(vector_path, mmap_mode='r')
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = [json.loads(line) for line in f if line.strip()]
+        return segment_id, vectors, metadata
+
+    def _write_segment(self, segment_id, metadata, vectors):
+        vector_path, metadata_path = self._segment_paths(segment_id)
+
+        # Write the sidecar first and the vectors last so a segment only appears once complete
+        with open(metadata_path + '.tmp', 'w', encoding='utf-8') as f:
+            for row in metadata:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        os.replace(metadata_path + '.tmp', metadata_path)
+
+        with open(vector_path + '.tmp', 'wb') as f:
+            np.save(f, vectors)
+        os.replace(vector_path + '.tmp', vector_path)
+
+        return segment_id, np.load(vector_path, mmap_mode='r'), list(metadata)
+
+    def _compact(self):
+        """Merge all segments into one"""
+        metadata = [row for _, _, rows in self._segments for row in rows]
+        vectors = np.concatenate([np.asarray(vectors) for _, vectors, _ in self._segments])
+        old_ids = [segment_id for segment_id, _, _ in self._segments]
+
+        merged = self._write_segment(self._next_segment, metadata, vectors)
+        self._next_segment += 1
+        self._segments = [merged]
+
+        for segment_id in old_ids:
+            self._remove_segment_files(segment_id)
+
+    def _remove_segment_files(self, segment_id):
+        for path in self._segment_paths(segment_id):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except PermissionError:
+                # Windows keeps memory-mapped files locked while a search still holds them
+                print(f"Warning: Could not delete replaced segment {path}")
+
+class NumpyVectorStore:
+    """Embedded vector store with the EnhancedVectorStore interface, backed by NumPy segments"""
+
+    def __init__(self, root=None, dimension=None):
+        self.root = root or Config.NUMPY_VECTOR_FOLDER
+        self.dimension = dimension or Config.EMBEDDING_DIMENSION
+        self._collections = {}
+        self._lock = threading.Lock()
+        self.lexical = get_lexical_index_registry()
+        self.blob_store = get_blob_store()
+        os.makedirs(self.root, exist_ok=True)
+        print(f"✅ Using embedded NumPy vector store at {self.root}")
+
+    def _format_collection_name(self, session_id, content_type="general"):
+        """Format collection name with content type"""
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        return f"{content_type}_{safe_id}"
+
+    def _get_collection(self, collection_name):
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection = NumpyCollection(os.path.join(self.root, collection_name), self.dimension)
+                self._collections[collection_name] = collection
+            return collection
+
+    def create_collection(self, session_id, content_type="general"):
+        """Create collection based on content type"""
+        return self._open_collection(session_id, content_type)
+
+    def _open_collection(self, session_id, content_type):
+        collection = self._get_collection(self._format_collection_name(session_id, content_type))
+        os.makedirs(collection.path, exist_ok=True)
+        return collection
+
+    def collection_exists(self, session_id, content_type="general"):
+        """Check if collection exists"""
+        return self._get_collection(self._format_collection_name(session_id, content_type)).exists()
+
+    def assign_chunk_ids(self, session_id, chunks, filename=None):
+        """Give chunks deterministic ids from (session, source file, chunk index, content)"""
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        for i, chunk in enumerate(chunks):
+            source = chunk.get('file_path') or filename or ''
+            if chunk.get('archive'):
+                source = f"{chunk['archive']}/{source}"
+            chunk['id'] = chunk_id(f"{safe_id}/{source}", chunk.get('chunk_index', i), chunk['text'])
+        return chunks
+
+    def existing_chunk_ids(self, session_id, chunks, content_type="documents", filename=None):
+        """Assign chunk ids and return the ones already stored, so they can skip embedding"""
+        self.assign_chunk_ids(session_id, chunks, filename)
+        collection = self._get_collection(self._format_collection_name(session_id, content_type))
+        if not collection.exists():
+            return set()
+        return collection.existing_ids([chunk['id'] for chunk in chunks])
+
+    def get_chunks(self, session_id, chunk_ids, content_type="documents"):
+        """Stored rows (with embeddings and source references) for chunk ids; ids that are gone are left out"""
+        collection = self._get_collection(self._format_collection_name(session_id, content_type))
+        if not collection.exists():
+            return {}
+        return {
+            row_id: {**row, 'embedding': vector.tolist()}
+            for row_id, (row, vector) in collection.get(chunk_ids).items()
+        }
+
+    def add_documents(self, session_id, documents, filename, content_type="documents", user_id=None):
+        """Add documents to collection"""
+        try:
+            documents = [doc for doc in documents if not doc.get('duplicate')]
+            if not documents:
+                print(f"♻️ All chunks of {filename} are already stored")
+                return True
+
+            collection = self._open_collection(session_id, content_type)
+            self.assign_chunk_ids(session_id, [doc for doc in documents if 'id' not in doc], filename)
+
+            metadata = []
+            for doc, (blob_id, start, end) in zip(documents, store_chunk_sources(self.blob_store, documents)):
+                metadata.append({
+                    'id': doc['id'],
+                    'text': doc['text'],
+                    'blob_id': blob_id,
+                    'blob_start': start,
+                    'blob_end': end,
+                    'filename': filename,
+                    'file_type': doc.get('file_type', '')
+                })
+
+            added = collection.append(metadata, [doc['embedding'] for doc in documents])
+            self.lexical.add_rows(collection.path, metadata)
+            print(f"✅ Added {added} documents to {content_type} collection")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error adding documents: {str(e)}")
+            return False
+
+    def add_code_chunks(self, session_id, code_chunks, user_id=None):
+        """Add code chunks to collection"""
+        try:
+            code_chunks = [chunk for chunk in code_chunks if not chunk.get('duplicate')]
+            if not code_chunks:
+                print("♻️ All code chunks are already stored")
+                return True
+
+            collection = self._open_collection(session_id, "code")
+            self.assign_chunk_ids(session_id, [chunk for chunk in code_chunks if 'id' not in chunk])
+
+            metadata = []
+            for chunk, (blob_id, start, end) in zip(code_chunks, store_chunk_sources(self.blob_store, code_chunks)):
+                metadata.append({
+                    'id': chunk['id'],
+                    'text': chunk['text'],
+                    'blob_id': blob_id,
+                    'blob_start': start,
+                    'blob_end': end,
+                    'file_path': chunk['file_path'],
+                    'file_type': chunk['file_type'],
+                    'chunk_index': chunk['chunk_index']
+                })
+
+            added = collection.append(metadata, [chunk['embedding'] for chunk in code_chunks])
+            self.lexical.add_rows(collection.path, metadata)
+            print(f"✅ Added {added} code chunks to collection")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error adding code chunks: {str(e)}")
+            return False
+
+    def search_documents(self, session_id, query_text, content_type="documents", top_k=5, search_mode=None,
+                         include_original=False, query_embedding=None):
+        """Search documents in collection ('vector', 'lexical' or 'hybrid' mode)"""
+        search_mode = search_mode or Config.SEARCH_MODE
+        try:
+            collection = self._get_collection(self._format_collection_name(session_id, content_type))
+            if not collection.exists():
+                return []
+
+            if search_mode == "lexical":
+                documents = self._lexical_search(collection, query_text, content_type, top_k)
+            elif search_mode == "hybrid":
+                documents = hybrid_search(
+                    lambda k: self._vector_search(collection, query_text, content_type, k, query_embedding),
+                    lambda k: self._lexical_search(collection, query_text, content_type, k),
+                    top_k
+                )
+            else:
+                documents = self._vector_search(collection, query_text, content_type, top_k, query_embedding)
+
+            if include_original:
+                attach_original_text(self.blob_store, documents)
+            return documents
+
+        except Exception as e:
+            print(f"❌ Error searching documents: {str(e)}")
+            return []
+
+    def search_many(self, session_id, queries, content_type="documents", top_k=5, merge=False, include_original=False):
+        """Search several queries with one embedding batch and one scoring pass; merge=True de-duplicates them"""
+        per_query = [[] for _ in queries]
+        try:
+            collection = self._get_collection(self._format_collection_name(session_id, content_type))
+            if collection.exists() and queries:
+                embeddings = get_shared_document_processor().get_embeddings(list(queries))
+                embedded = [i for i, embedding in enumerate(embeddings) if embedding]
+                if embedded:
+                    hits = collection.search_many([embeddings[i] for i in embedded], top_k)
+                    for i, query_hits in zip(embedded, hits):
+                        per_query[i] = self._format_results(query_hits, content_type)
+                    if include_original:
+                        attach_original_text(self.blob_store, [doc for results in per_query for doc in results])
+
+        except Exception as e:
+            print(f"❌ Error searching documents: {str(e)}")
+
+        return merge_query_results(per_query, top_k) if merge else per_query
+
+    def _vector_search(self, collection, query_text, content_type, top_k, query_embedding=None):
+        if query_embedding is None:
+            query_embedding = get_shared_document_processor().get_embedding(query_text)
+        if not query_embedding:
+            return []
+        return self._format_results(collection.search(query_embedding, top_k), content_type)
+
+    def _lexical_search(self, collection, query_text, content_type, top_k):
+        # Document chunks are indexed preprocessed (code verbatim), so the query has to be too
+        if content_type != "code":
+            query_text = get_shared_document_processor().preprocess_text(query_text)
+
+        index = self.lexical.get(
+            collection.path,
+            lambda: (row for _, _, rows in collection.segments() for row in rows)
+        )
+        return self._format_results(index.search(query_text, top_k), content_type)
+
+    def _format_results(self, hits, content_type):
+        documents = []
+        for score, row in hits:
+            doc_data = dict(row)
+            doc_data.update({'score': score, 'content_type': content_type})
+            documents.append(doc_data)
+        return documents
+
+    def delete_chunks(self, session_id, chunk_ids, content_type="code"):
+        """Delete chunks by id (e.g. those of files removed from a re-uploaded archive)"""
+        if not chunk_ids:
+            return True
+        try:
+            collection = self._get_collection(self._format_collection_name(session_id, content_type))
+            if collection.exists():
+                removed = collection.delete(chunk_ids)
+                self.lexical.remove_ids(collection.path, chunk_ids)
+                print(f"🧹 Deleted {removed} chunks from {collection.name}")
+            return True
+        except Exception as e:
+            print(f"❌ Error deleting chunks: {str(e)}")
+            return False
+
+    def fetch_original_text(self, results):
+        """Load original text for search results that were returned without it"""
+        return attach_original_text(self.blob_store, results)
+
+    def flush(self, session_id, content_type="general"):
+        """Rows are written as sealed segments on insert, so there is nothing to flush"""
+
+    def sync(self, session_id, content_type="general"):
+        """Rows are written as sealed segments on insert, so there is nothing to sync"""
+
+    def delete_collection(self, session_id, content_type="general"):
+        """Delete collection"""
+        try:
+            collection_name = self._format_collection_name(session_id, content_type)
+            collection = self._get_collection(collection_name)
+            if collection.exists():
+                collection.drop()
+                print(f"🧹 Deleted {content_type} collection {collection_name}")
+            with self._lock:
+                self._collections.pop(collection_name, None)
+            self.lexical.invalidate(collection.path)
+            return True
+        except Exception as e:
+            print(f"❌ Error deleting collection: {str(e)}")
+            return False
+
+    def get_collection_stats(self, session_id, content_type="general"):
+        """Get collection statistics"""
+        try:
+            collection_name = self._format_collection_name(session_id, content_type)
+            collection = self._get_collection(collection_name)
+            if not collection.exists():
+                return None
+
+            return {
+                'name': collection_name,
+                'content_type': content_type,
+                'storage_mode': 'numpy',
+                'num_entities': collection.count(),
+                'segments': len(collection.segments()),
+                'index_type': 'FLAT',
+                'description': f"{content_type} embeddings (embedded NumPy backend)"
+            }
+        except Exception as e:
+            print(f"❌ Error getting collection stats: {str(e)}")
+            return None
+
+class NumpySessionVectorStore(NumpyVectorStore):
+    """NumPy-backed replacement for the legacy per-session VectorStore (sess_ collections)"""
+
+    def create_collection(self, session_id):
+        return super().create_collection(session_id, "sess")
+
+    def collection_exists(self, session_id):
+        return super().collection_exists(session_id, "sess")
+
+    def existing_chunk_ids(self, session_id, chunks, filename=None):
+        return super().existing_chunk_ids(session_id, chunks, "sess", filename)
+
+    def add_documents(self, session_id, documents, filename, user_id=None):
+        return super().add_documents(session_id, documents, filename, "sess", user_id)
+
+    def search_documents(self, session_id, query_text, top_k=5, include_original=False, query_embedding=None):
+        return super().search_documents(session_id, query_text, "sess", top_k, include_original=include_original,
+                                        query_embedding=query_embedding)
+
+    def search_many(self, session_id, queries, top_k=5, merge=False, include_original=False):
+        return super().search_many(session_id, queries, "sess", top_k, merge=merge, include_original=include_original)
+
+    def get_chunks(self, session_id, chunk_ids):
+        return super().get_chunks(session_id, chunk_ids, "sess")
+
+    def delete_chunks(self, session_id, chunk_ids):
+        return super().delete_chunks(session_id, chunk_ids, "sess")
+
+    def flush(self, session_id):
+        pass
+
+    def sync(self, session_id):
+        pass
+
+    def delete_collection(self, session_id):
+        return super().delete_collection(session_id, "sess")
+
+    def get_collection_stats(self, session_id):
+        return super().get_collection_stats(session_id, "sess")
@@ -0,0 +1,128 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF for PDF processing
+from config.settings import Config
+from utils.document_processor import TextProcessor
+from utils.upload_streams import read_source_bytes
+
+# Worker-local text processor, created on first use inside each worker process
+_text_processor = None
+
+def _get_text_processor():
+    global _text_processor
+    if _text_processor is None:
+        _text_processor = TextProcessor()
+    return _text_processor
+
+# Name and size of a shared memory block holding a document, passed to workers instead of a file path
+SharedRef = namedtuple('SharedRef', ['name', 'size'])
+
+class SharedBuffer:
+    """Document bytes placed in shared memory, so workers can parse an in-memory upload without a temp file"""
+
+    def __init__(self, data):
+        self._shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        self._shm.buf[:len(data)] = data
+        self.ref = SharedRef(self._shm.name, len(data))
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_pdf(source):
+    """Open a PDF from a path, bytes, binary stream or SharedRef"""
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    if isinstance(source, SharedRef):
+        shm = shared_memory.SharedMemory(name=source.name)
+        try:
+            data = bytes(shm.buf[:source.size])
+        finally:
+            shm.close()
+        return fitz.open(stream=data, filetype='pdf')
+    return fitz.open(stream=read_source_bytes(source), filetype='pdf')
+
+def iter_pdf_page_paragraphs(doc, start, end):
+    """Yield the paragraphs of pages [start, end) of an open PDF, one page at a time (empty pages give [])"""
+    for page_num in range(start, end):
+        text = doc.load_page(page_num).get_text()
+        # Split by paragraphs (double newlines)
+        yield [para.strip() for para in text.split('\n\n') if para.strip()]
+
+def chunk_pdf_pages(source, start, end, file_ext='.pdf'):
+    """Worker task: extract, preprocess and chunk pages [start, end) of a PDF (a path or SharedRef)"""
+    doc = open_pdf(source)
+    try:
+        sections = list(iter_pdf_page_paragraphs(doc, start, end))
+    finally:
+        doc.close()
+    return list(_get_text_processor().iter_section_chunks(sections, file_ext))
+
+def chunk_paragraphs(paragraphs, file_ext=None):
+    """Worker task: preprocess and chunk a range of paragraphs as one section"""
+    return list(_get_text_processor().iter_section_chunks([paragraphs], file_ext))
+
+def split_ranges(total, size):
+    """Split range(total) into contiguous (start, end) ranges of up to `size` items"""
+    size = max(1, size)
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+def use_parse_pool(size, min_size):
+    """Whether work of this size is worth shipping to worker processes"""
+    return Config.PARSE_WORKERS > 1 and size >= min_size
+
+def iter_parallel(fn, task_args):
+    """Run fn over task argument tuples in the parse pool and yield results in task order"""
+    pool = get_parse_pool()
+    # Bound work in flight so results do not pile up faster than the caller consumes them
+    max_in_flight = Config.PARSE_WORKERS * 2
+    pending = deque()
+
+    try:
+        for args in task_args:
+            pending.append(pool.submit(fn, *args))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool for the next upload
+        _discard_parse_pool(pool)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Get the process-wide parsing pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn rather than fork: the web process already runs threads (embedding, insert buffer)
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            print(f"✅ Parse pool started with {Config.PARSE_WORKERS} worker processes")
+        return _pool
+
+def _discard_parse_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,62 @@
+import hashlib
+from config.settings import Config
+from utils.upload_streams import open_source
+
+# Row fields carried over when chunks are copied into another session; ids are re-derived there
+_COPIED_FIELDS = ('text', 'file_type', 'file_path', 'chunk_index', 'blob_id', 'blob_start', 'blob_end', 'original_text', 'embedding')
+
+def file_fingerprint(source, block_size=1024 * 1024):
+    """SHA-256 of a file's bytes (path, bytes or binary stream), read in blocks"""
+    digest = hashlib.sha256()
+    with open_source(source) as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def copy_stored_chunks(vector_store, session_id, chunk_ids, content_type="documents"):
+    """Already-embedded chunks of another session, in chunk_ids order; None if any of them is gone"""
+    rows = vector_store.get_chunks(session_id, chunk_ids, content_type)
+    if not chunk_ids or len(rows) < len(set(chunk_ids)):
+        return None
+    return [
+        {field: rows[row_id][field] for field in _COPIED_FIELDS if rows[row_id].get(field) is not None}
+        for row_id in chunk_ids
+    ]
+
+def find_reusable_upload(db_manager, fingerprint, collection, user_id):
+    """Earlier upload of an identical file whose chunks this user may reuse: one of their own, or anyone's
+    with UPLOAD_DEDUP_ACROSS_USERS (which lets a user learn that someone else uploaded the same file)"""
+    if not Config.UPLOAD_DEDUP_ENABLED:
+        return None
+    if Config.UPLOAD_DEDUP_ACROSS_USERS:
+        return db_manager.find_document_by_hash(fingerprint, collection)
+    if user_id is None:
+        return None
+    return db_manager.find_document_by_hash(fingerprint, collection, user_id=user_id)
+
+def attach_uploaded_document(vector_store, db_manager, fingerprint, session_id, filename, user_id=None, progress=None):
+    """Add the chunks of an identical, already ingested file to a session without re-parsing or re-embedding.
+
+    Returns the new chunk ids, or None when no usable earlier upload exists.
+    """
+    source = find_reusable_upload(db_manager, fingerprint, 'documents', user_id)
+    if not source:
+        return None
+    chunks = copy_stored_chunks(vector_store, source['session_id'], source['chunk_ids'], "documents")
+    if chunks is None:
+        print(f"⚠️ Earlier upload of {filename} is no longer stored; ingesting it again")
+        return None
+
+    for chunk_index, chunk in enumerate(chunks):
+        chunk['chunk_index'] = chunk_index
+    stored_ids = vector_store.existing_chunk_ids(session_id, chunks, "documents", filename)
+    for chunk in chunks:
+        if chunk['id'] in stored_ids:
+            chunk['duplicate'] = True
+
+    if not vector_store.add_documents(session_id, chunks, filename, "documents", user_id=user_id):
+        raise RuntimeError("Failed to store document chunks in vector database")
+    if progress:
+        progress(unit='chunks', total=len(chunks), done=len(chunks), chunks_done=len(chunks))
+    print(f"♻️ Reused {len(chunks)} chunks of {source['filename']} (session {source['session_id']}) for {filename}")
+    return [chunk['id'] for chunk in chunks]
@@ -0,0 +1,57 @@
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from flask import Request
+from config.settings import Config
+
+class SpooledUploadRequest(Request):
+    """Request that keeps uploaded files in memory up to UPLOAD_SPOOL_MAX_MEMORY, then in an anonymous spool file"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spool_file()
+
+def spool_file():
+    """Readable and writable binary buffer, in memory until it outgrows UPLOAD_SPOOL_MAX_MEMORY"""
+    return tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_MAX_MEMORY, mode='rb+')
+
+def detach_upload_stream(file):
+    """Take an uploaded file's stream away from the request so it outlives it; the caller must close it"""
+    # Werkzeug closes the request's file streams once the response is sent
+    stream, file.stream = file.stream, io.BytesIO()
+    stream.seek(0)
+    return stream
+
+@contextmanager
+def open_source(source):
+    """Binary file object for a path, bytes or seekable binary stream, positioned at the start"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        # Streams stay open for the caller; leave them rewound for the next reader
+        source.seek(0)
+        try:
+            yield source
+        finally:
+            source.seek(0)
+
+def read_source_bytes(source):
+    """Whole content of a path, bytes or binary stream"""
+    if isinstance(source, bytes):
+        return source
+    with open_source(source) as f:
+        return f.read()
+
+def read_source_text(source, encoding='utf-8'):
+    """Whole content of a path, bytes or binary stream, decoded"""
+    return read_source_bytes(source).decode(encoding)
+
+def source_size(source):
+    """Size in bytes of a path, bytes or binary stream"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    with open_source(source) as f:
+        return f.seek(0, io.SEEK_END)
@@ -1,12 +1,26 @@
 import os
-import uuid
 import re
+import json
 from pymilvus import connections, Collection, CollectionSchema, FieldSchema, DataType, utility
+from config.settings import Config
+from .collection_registry import get_collection_registry
+from .insert_buffer import get_insert_buffer
+from .index_policy import get_index_manager
+from .collection_residency import get_residency_manager
+from .document_processor import get_shared_document_processor, chunk_id
+from .blob_store import get_blob_store, store_chunk_sources, attach_original_text, chunk_original_text
+from .lexical_index import merge_query_results
 
 class VectorStore:
-    def __init__(self):
+    def __init__(self, storage_mode=None):
         self.host = os.getenv('MILVUS_HOST', 'localhost')
         self.port = os.getenv('MILVUS_PORT', '19530')
+        self.partitioned = (storage_mode or Config.VECTOR_STORAGE_MODE) == 'partitioned'
+        self.registry = get_collection_registry()
+        self.insert_buffer = get_insert_buffer()
+        self.index_manager = get_index_manager()
+        self.residency = get_residency_manager()
+        self.blob_store = get_blob_store()
         self.connect_to_milvus()
 
     def connect_to_milvus(self):
@@ -22,35 +36,56 @@ class VectorStore:
             raise
 
     def _format_collection_name(self, session_id):
+        if self.partitioned:
+            return f"sess_{Config.SHARED_COLLECTION_SUFFIX}"
         safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
         return f"sess_{safe_id}"
 
+    def _session_filter(self, session_id):
+        if not self.partitioned:
+            return ""
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        return f'session_id == "{safe_id}"'
+
     def create_collection_schema(self):
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=100, is_primary=True),
             FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=5000),
-            FieldSchema(name="original_text", dtype=DataType.VARCHAR, max_length=10000),
-            FieldSchema(name="filename", dtype=DataType.VARCHAR, max_length=255),
-            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=768)
+            FieldSchema(name="blob_id", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(name="blob_start", dtype=DataType.INT64),
+            FieldSchema(name="blob_end", dtype=DataType.INT64),
+            FieldSchema(name="filename", dtype=DataType.VARCHAR, max_length=255)
         ]
+        if self.partitioned:
+            fields += [
+                FieldSchema(name="session_id", dtype=DataType.VARCHAR, max_length=100, is_partition_key=True),
+                FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=64)
+            ]
+        fields.append(FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=768))
         return CollectionSchema(fields=fields, description="Document embeddings collection")
 
+    def _source_fields(self, collection, include_original=False):
+        field_names = {field.name for field in collection.schema.fields}
+        if "blob_id" in field_names:
+            return ["blob_id", "blob_start", "blob_end"]
+        return ["original_text"] if include_original and "original_text" in field_names else []
+
     def create_collection(self, session_id):
         try:
             collection_name = self._format_collection_name(session_id)
-            if utility.has_collection(collection_name):
-                return Collection(collection_name)
+            collection = self.registry.get(collection_name)
+            if collection is not None:
+                return collection
 
             schema = self.create_collection_schema()
-            collection = Collection(collection_name, schema)
+            if self.partitioned:
+                collection = Collection(collection_name, schema, num_partitions=Config.SHARED_COLLECTION_PARTITIONS)
+            else:
+                collection = Collection(collection_name, schema)
 
-            index_params = {
-                "index_type": "IVF_FLAT",
-                "metric_type": "COSINE",
-                "params": {"nlist": 1024}
-            }
-            collection.create_index(field_name="embedding", index_params=index_params)
-            return collection
+            # Start with an index suited to an empty collection; it's rebuilt as the collection grows
+            self.index_manager.create_index(collection)
+            return self.registry.register(collection_name, collection)
         except Exception as e:
             print(f"❌ Error creating collection: {str(e)}")
             raise
@@ -58,86 +93,208 @@ class VectorStore:
     def collection_exists(self, session_id):
         try:
             collection_name = self._format_collection_name(session_id)
-            return utility.has_collection(collection_name)
+            if not self.partitioned:
+                return self.registry.get(collection_name) is not None
+
+            # A shared collection only "exists" for sessions that have rows in it; querying needs it loaded
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return False
+                self.insert_buffer.flush(collection_name)
+                rows = collection.query(expr=self._session_filter(session_id), output_fields=["id"], limit=1)
+                return len(rows) > 0
         except Exception as e:
             print(f"❌ Error checking collection existence: {str(e)}")
             return False
 
-    def add_documents(self, session_id, documents, filename):
+    def assign_chunk_ids(self, session_id, chunks, filename=None):
+        safe_id = re.sub(r'[^a-zA-Z0-9_]', '', session_id)
+        for i, chunk in enumerate(chunks):
+            chunk['id'] = chunk_id(f"{safe_id}/{filename or ''}", i, chunk['text'])
+        return chunks
+
+    def existing_chunk_ids(self, session_id, chunks, filename=None):
+        """Assign chunk ids and return the ones already stored, so they can skip embedding"""
+        self.assign_chunk_ids(session_id, chunks, filename)
+        collection_name = self._format_collection_name(session_id)
+        try:
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return set()
+
+                self.insert_buffer.flush(collection_name)
+
+                ids = [chunk['id'] for chunk in chunks]
+                existing = set()
+                for start in range(0, len(ids), 1000):
+                    rows = collection.query(
+                        expr=f"id in {json.dumps(ids[start:start + 1000])}",
+                        output_fields=["id"],
+                        consistency_level="Session"
+                    )
+                    existing.update(row['id'] for row in rows)
+                return existing
+        except Exception as e:
+            print(f"❌ Error looking up existing chunks: {str(e)}")
+            return set()
+
+    def add_documents(self, session_id, documents, filename, user_id=None):
         try:
             collection_name = self._format_collection_name(session_id)
+            documents = [doc for doc in documents if not doc.get('duplicate')]
+            if not documents:
+                print(f"♻️ All chunks of {filename} are already stored in {collection_name}")
+                return True
+
             collection = self.create_collection(session_id)
+            self.assign_chunk_ids(session_id, [doc for doc in documents if 'id' not in doc], filename)
+
+            columns = {
+                'id': [doc['id'] for doc in documents],
+                'text': [doc['text'] for doc in documents],
+                'filename': [filename] * len(documents),
+                'embedding': [doc['embedding'] for doc in documents]
+            }
+            field_names = [field.name for field in collection.schema.fields]
+            if "blob_id" in field_names:
+                references = store_chunk_sources(self.blob_store, documents)
+                columns['blob_id'] = [blob_id for blob_id, _, _ in references]
+                columns['blob_start'] = [start for _, start, _ in references]
+                columns['blob_end'] = [end for _, _, end in references]
+            else:
+                # Collections created before the blob store keep the text inline
+                columns['original_text'] = [chunk_original_text(doc)[:10000] for doc in documents]
+            if self.partitioned:
+                columns['session_id'] = [re.sub(r'[^a-zA-Z0-9_]', '', session_id)] * len(documents)
+                columns['user_id'] = [str(user_id or '')] * len(documents)
+
+            data = [columns[name] for name in field_names]
+            self.insert_buffer.add(collection, data)
+            self.index_manager.note_insert(collection, len(documents))
 
-            ids = []
-            texts = []
-            original_texts = []
-            filenames = []
-            embeddings = []
-
-            for doc in documents:
-                ids.append(str(uuid.uuid4()))
-                texts.append(doc['text'])
-                original_texts.append(doc['original_text'])
-                filenames.append(filename)
-                embeddings.append(doc['embedding'])
-
-            data = [ids, texts, original_texts, filenames, embeddings]
-            collection.insert(data)
-            collection.flush()
-            collection.load()
-
-            print(f"✅ Added {len(documents)} documents to collection {collection_name}")
+            print(f"✅ Queued {len(documents)} documents for collection {collection_name}")
             return True
         except Exception as e:
             print(f"❌ Error adding documents: {str(e)}")
             return False
 
-    def search_documents(self, session_id, query_text, top_k=5):
+    def search_documents(self, session_id, query_text, top_k=5, include_original=False, query_embedding=None):
+        collection_name = self._format_collection_name(session_id)
         try:
-            collection_name = self._format_collection_name(session_id)
-            if not utility.has_collection(collection_name):
-                return []
+            with self.registry.using(collection_name) as collection:
+                if collection is None:
+                    return []
 
-            collection = Collection(collection_name)
-            collection.load()
+                # Make rows buffered by this process visible to the search
+                self.insert_buffer.flush(collection_name)
 
-            from .document_processor import DocumentProcessor
-            doc_processor = DocumentProcessor()
-            query_embedding = doc_processor.get_embedding(query_text)
+                if query_embedding is None:
+                    query_embedding = get_shared_document_processor().get_embedding(query_text)
 
-            if not query_embedding:
-                return []
+                if not query_embedding:
+                    return []
 
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"nprobe": 10}
-            }
+                search_params = self.index_manager.search_params(collection, top_k)
+                output_fields = ["text", "filename", *self._source_fields(collection, include_original)]
 
-            results = collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=top_k,
-                output_fields=["text", "original_text", "filename"]
-            )
+                results = collection.search(
+                    data=[query_embedding],
+                    anns_field="embedding",
+                    param=search_params,
+                    limit=top_k,
+                    expr=self._session_filter(session_id) or None,
+                    output_fields=output_fields,
+                    consistency_level="Session"
+                )
 
-            documents = []
-            for result in results[0]:
-                documents.append({
-                    'text': result.entity.get('text'),
-                    'original_text': result.entity.get('original_text'),
-                    'filename': result.entity.get('filename'),
-                    'score': result.score
-                })
+                documents = self._format_hits(results[0], output_fields)
 
-            return documents
+                # Original text lives in the blob store and is only read when asked for
+                if include_original:
+                    attach_original_text(self.blob_store, documents)
+                return documents
         except Exception as e:
             print(f"❌ Error searching documents: {str(e)}")
+            self.registry.invalidate(collection_name)
             return []
 
+    def search_many(self, session_id, queries, top_k=5, merge=False, include_original=False):
+        """Search several queries with one embedding batch and one search call; merge=True de-duplicates them"""
+        collection_name = self._format_collection_name(session_id)
+        per_query = [[] for _ in queries]
+        try:
+            with self.registry.using(collection_name) as collection:
+                if collection is None or not queries:
+                    return merge_query_results(per_query, top_k) if merge else per_query
+
+                self.insert_buffer.flush(collection_name)
+
+                embeddings = get_shared_document_processor().get_embeddings(list(queries))
+                embedded = [i for i, embedding in enumerate(embeddings) if embedding]
+
+                if embedded:
+                    output_fields = ["text", "filename", *self._source_fields(collection, include_original)]
+                    results = collection.search(
+                        data=[embeddings[i] for i in embedded],
+                        anns_field="embedding",
+                        param=self.index_manager.search_params(collection, top_k),
+                        limit=top_k,
+                        expr=self._session_filter(session_id) or None,
+                        output_fields=output_fields,
+                        consistency_level="Session"
+                    )
+                    for i, hits in zip(embedded, results):
+                        per_query[i] = self._format_hits(hits, output_fields)
+
+                    if include_original:
+                        attach_original_text(self.blob_store, [doc for hits in per_query for doc in hits])
+        except Exception as e:
+            print(f"❌ Error searching documents: {str(e)}")
+            self.registry.invalidate(collection_name)
+
+        return merge_query_results(per_query, top_k) if merge else per_query
+
+    def _format_hits(self, hits, output_fields):
+        """Turn Milvus search hits into result dicts"""
+        documents = []
+        for result in hits:
+            doc_data = {'id': result.id, 'score': result.score}
+            for field in output_fields:
+                doc_data[field] = result.entity.get(field)
+            documents.append(doc_data)
+        return documents
+
+    def fetch_original_text(self, results):
+        """Load original text for search results that were returned without it"""
+        return attach_original_text(self.blob_store, results)
+
+    def flush(self, session_id):
+        """Insert rows still buffered for a collection so searches can see them;
+        raises InsertFailedError if some of its rows could not be inserted"""
+        collection_name = self._format_collection_name(session_id)
+        self.insert_buffer.flush(collection_name)
+        self.insert_buffer.raise_failures(collection_name)
+
+    def sync(self, session_id):
+        """Insert buffered rows and persist them in Milvus for read-after-write from other clients"""
+        self.insert_buffer.sync(self._format_collection_name(session_id))
+
     def delete_collection(self, session_id):
         try:
             collection_name = self._format_collection_name(session_id)
+            if self.partitioned:
+                # Deleting by session filter (not primary key) needs the collection loaded
+                with self.registry.using(collection_name) as collection:
+                    if collection is None:
+                        return True
+                    self.insert_buffer.flush(collection_name)
+                    collection.delete(self._session_filter(session_id))
+                    print(f"🧹 Deleted rows for session {session_id} from {collection_name}")
+                return True
+
+            self.insert_buffer.discard(collection_name)
+            self.registry.invalidate(collection_name)
+            self.index_manager.forget(collection_name)
             if utility.has_collection(collection_name):
                 utility.drop_collection(collection_name)
                 print(f"🧹 Deleted collection {collection_name}")
@@ -149,15 +306,24 @@ class VectorStore:
     def get_collection_stats(self, session_id):
         try:
             collection_name = self._format_collection_name(session_id)
-            if not utility.has_collection(collection_name):
+            collection = self.registry.get(collection_name)
+            if collection is None:
                 return None
 
-            collection = Collection(collection_name)
-            collection.load()
+            if self.partitioned:
+                # Counting a session's rows is a query, which needs the collection loaded
+                with self.registry.using(collection_name) as loaded:
+                    self.insert_buffer.flush(collection_name)
+                    counts = loaded.query(expr=self._session_filter(session_id), output_fields=["count(*)"])
+                num_entities = counts[0]["count(*)"] if counts else 0
+            else:
+                num_entities = collection.num_entities
 
             return {
                 'name': collection_name,
-                'num_entities': collection.num_entities,
+                'num_entities': num_entities,
+                'pending_rows': self.insert_buffer.pending_rows(collection_name),
+                **self.index_manager.describe(collection),
                 'description': collection.description
             }
         except Exception as e:
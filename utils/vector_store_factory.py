@@ -0,0 +1,20 @@
+from config.settings import Config
+
+def create_vector_store():
+    """Build the configured content-typed vector store (documents_/code_ collections)"""
+    if Config.VECTOR_BACKEND == 'numpy':
+        from utils.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore()
+
+    # Imported lazily so the NumPy backend works without pymilvus or a Milvus server
+    from utils.enhanced_vector_store import EnhancedVectorStore
+    return EnhancedVectorStore()
+
+def create_session_vector_store():
+    """Build the configured legacy per-session vector store (sess_ collections)"""
+    if Config.VECTOR_BACKEND == 'numpy':
+        from utils.numpy_vector_store import NumpySessionVectorStore
+        return NumpySessionVectorStore()
+
+    from utils.vector_store import VectorStore
+    return VectorStore()